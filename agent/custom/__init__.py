@@ -1,2 +1,9 @@
-from .action import *
-from .reco import *
+from .registry import *
+
+__all__ = [
+    "CUSTOM_RECOGNITIONS",
+    "CUSTOM_ACTIONS",
+    "load_custom_class",
+    "register_all",
+    "reset_module",
+]
@@ -1,17 +1,16 @@
+import io
 import os
 import json
 from datetime import datetime
 
-from PIL import Image
-from maa.agent.agent_server import AgentServer
 from maa.custom_action import CustomAction
 from maa.context import Context
 
-from utils import logger
+from utils import logger, is_enabled
+from utils.tracing import tracer
 from custom.reco import Count
 
 
-@AgentServer.custom_action("Screenshot")
 class Screenshot(CustomAction):
     """
     自定义截图动作，保存当前屏幕截图到指定目录。
@@ -46,18 +45,30 @@ class Screenshot(CustomAction):
             rgb_array = screen_array
             logger.warning("当前截图并非三通道")
 
+        # PIL 只在截图时使用，延迟导入以加快 agent 启动
+        from PIL import Image
+
         img = Image.fromarray(rgb_array)
 
         save_dir = json.loads(argv.custom_action_param)["save_dir"]
         os.makedirs(save_dir, exist_ok=True)
         now = datetime.now()
-        img.save(f"{save_dir}/{self._get_format_timestamp(now)}.png")
-        logger.info(f"截图保存至 {save_dir}/{self._get_format_timestamp(now)}.png")
-
-        task_detail = context.tasker.get_task_detail(argv.task_detail.task_id)
-        logger.debug(
-            f"task_id: {task_detail.task_id}, task_entry: {task_detail.entry}, status: {task_detail.status._status}"
-        )
+        save_path = f"{save_dir}/{self._get_format_timestamp(now)}.png"
+
+        # 编码和写文件分开，便于在 trace 中区分两者的耗时
+        with tracer.span("screenshot_encode", cat="screenshot"):
+            buffer = io.BytesIO()
+            img.save(buffer, format="PNG")
+        with tracer.span("screenshot_write", cat="screenshot", path=save_path):
+            with open(save_path, "wb") as f:
+                f.write(buffer.getbuffer())
+        logger.info(f"截图保存至 {save_path}")
+
+        if is_enabled("DEBUG"):
+            task_detail = context.tasker.get_task_detail(argv.task_detail.task_id)
+            logger.debug(
+                f"task_id: {task_detail.task_id}, task_entry: {task_detail.entry}, status: {task_detail.status._status}"
+            )
 
         return CustomAction.RunResult(success=True)
 
@@ -70,7 +81,6 @@ class Screenshot(CustomAction):
         return f"{date}-{time}.{milliseconds}"
 
 
-@AgentServer.custom_action("DisableNode")
 class DisableNode(CustomAction):
     """
     将特定 node 设置为 disable 状态 。
@@ -94,7 +104,6 @@ class DisableNode(CustomAction):
         return CustomAction.RunResult(success=True)
 
 
-@AgentServer.custom_action("NodeOverride")
 class NodeOverride(CustomAction):
     """
     在 node 中执行 pipeline_override 。
@@ -118,13 +127,13 @@ class NodeOverride(CustomAction):
             logger.warning("No ppover")
             return CustomAction.RunResult(success=True)
 
-        logger.debug(f"NodeOverride: {ppover}")
+        if is_enabled("DEBUG"):
+            logger.debug(f"NodeOverride: {ppover}")
         context.override_pipeline(ppover)
 
         return CustomAction.RunResult(success=True)
 
 
-@AgentServer.custom_action("ResetCount")
 class ResetCount(CustomAction):
     """
     重置计数器。
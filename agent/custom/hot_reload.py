@@ -0,0 +1,225 @@
+"""
+开发模式下的 custom 模块热重载
+
+监听 agent/custom 目录（Linux 使用 inotify，其它系统轮询修改时间），
+只重新加载发生变化且已被导入的模块，并重置 registry 中对应的代理，
+下次框架调用时即使用新的类，无需重启 agent。
+
+类属性中的可变容器（如 Count.record）在重载后沿用原对象，尽量保留运行状态。
+"""
+
+import os
+import sys
+import time
+import struct
+import inspect
+import importlib
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable
+
+from utils import logger
+
+from .registry import reset_module
+
+CUSTOM_DIR = Path(__file__).resolve().parent
+AGENT_DIR = CUSTOM_DIR.parent
+
+# 修改后无法热重载的模块
+_NOT_RELOADABLE = {
+    "custom",
+    "custom.registry",
+    "custom.instrument",
+    "custom.recorder",
+    "custom.hot_reload",
+}
+
+# 多次写入同一文件时合并为一次重载
+_DEBOUNCE_SECONDS = 0.3
+_POLL_INTERVAL = 1.0
+
+
+def _module_name(path: Path) -> str:
+    relative = path.resolve().relative_to(AGENT_DIR).with_suffix("")
+    parts = list(relative.parts)
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def _snapshot_class_state(module) -> Dict[str, Dict[str, object]]:
+    """记录模块中各个类的可变类属性"""
+    state = {}
+    for class_name, cls in vars(module).items():
+        if not inspect.isclass(cls) or cls.__module__ != module.__name__:
+            continue
+        attrs = {
+            attr: value
+            for attr, value in vars(cls).items()
+            if not attr.startswith("__") and isinstance(value, (dict, list, set))
+        }
+        if attrs:
+            state[class_name] = attrs
+    return state
+
+
+def _restore_class_state(module, state: Dict[str, Dict[str, object]]) -> None:
+    for class_name, attrs in state.items():
+        cls = getattr(module, class_name, None)
+        if not inspect.isclass(cls):
+            continue
+        for attr, value in attrs.items():
+            if isinstance(getattr(cls, attr, None), type(value)):
+                setattr(cls, attr, value)
+                logger.debug(f"保留类属性 {class_name}.{attr}")
+
+
+def reload_module(module_name: str) -> bool:
+    """重新加载模块及其所在包，并重置使用该模块的代理"""
+    if module_name in _NOT_RELOADABLE:
+        logger.warning(f"{module_name} 已修改，需要重启 agent 才能生效")
+        return False
+
+    module = sys.modules.get(module_name)
+    if module is None:
+        # 尚未导入过，下次调用时自然会加载新代码
+        return False
+
+    try:
+        state = _snapshot_class_state(module)
+        module = importlib.reload(module)
+        _restore_class_state(module, state)
+
+        # 重新执行包的 __init__，更新其中 from .xxx import * 导入的名称
+        package_name = module_name.rpartition(".")[0]
+        while package_name and package_name not in _NOT_RELOADABLE:
+            package = sys.modules.get(package_name)
+            if package is not None:
+                importlib.reload(package)
+            package_name = package_name.rpartition(".")[0]
+    except Exception:
+        logger.exception(f"热重载 {module_name} 失败，继续使用旧代码")
+        return False
+
+    names = reset_module(module_name)
+    logger.info(f"已热重载 {module_name}: {names}")
+    return True
+
+
+def _iter_sources() -> Iterable[Path]:
+    return CUSTOM_DIR.rglob("*.py")
+
+
+def _poll_changes(on_change: Callable[[set], None], stop: threading.Event):
+    """轮询文件修改时间"""
+    mtimes = {path: path.stat().st_mtime_ns for path in _iter_sources()}
+    while not stop.wait(_POLL_INTERVAL):
+        changed = set()
+        for path in _iter_sources():
+            try:
+                mtime = path.stat().st_mtime_ns
+            except OSError:
+                continue
+            if mtimes.get(path) != mtime:
+                mtimes[path] = mtime
+                changed.add(path)
+        if changed:
+            on_change(changed)
+
+
+# inotify 事件标志
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _inotify_changes(on_change: Callable[[set], None], stop: threading.Event):
+    """使用 inotify 监听文件变化，不可用时抛出 OSError"""
+    import ctypes
+    import ctypes.util
+    import select
+
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    fd = libc.inotify_init1(os.O_NONBLOCK)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+
+    try:
+        watch_dirs = {}
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        directories = [CUSTOM_DIR, *(p for p in CUSTOM_DIR.rglob("*") if p.is_dir())]
+        for directory in directories:
+            if directory.name == "__pycache__":
+                continue
+            wd = libc.inotify_add_watch(fd, str(directory).encode(), mask)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"无法监听 {directory}")
+            watch_dirs[wd] = directory
+
+        logger.debug(f"inotify 监听 {len(watch_dirs)} 个目录")
+
+        pending = set()
+        deadline = None
+        while not stop.is_set():
+            if deadline is None:
+                timeout = _POLL_INTERVAL
+            else:
+                timeout = max(0, deadline - time.monotonic())
+            readable, _, _ = select.select([fd], [], [], timeout)
+            if readable:
+                data = os.read(fd, 64 * 1024)
+                offset = 0
+                while offset < len(data):
+                    wd, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                    offset += _EVENT_HEADER.size
+                    name = data[offset : offset + length].rstrip(b"\0").decode()
+                    offset += length
+                    if name.endswith(".py") and wd in watch_dirs:
+                        pending.add(watch_dirs[wd] / name)
+                if pending and deadline is None:
+                    deadline = time.monotonic() + _DEBOUNCE_SECONDS
+            elif pending and deadline is not None and time.monotonic() >= deadline:
+                on_change(pending)
+                pending = set()
+                deadline = None
+    finally:
+        os.close(fd)
+
+
+class HotReloader:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _on_change(self, paths: set):
+        for path in sorted(paths):
+            if not path.exists():
+                continue
+            reload_module(_module_name(path))
+
+    def _run(self):
+        if sys.platform.startswith("linux"):
+            try:
+                _inotify_changes(self._on_change, self._stop)
+                return
+            except OSError as e:
+                logger.warning(f"inotify 不可用，改为轮询文件变化: {e}")
+        _poll_changes(self._on_change, self._stop)
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="custom-hot-reload", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"已开启 custom 热重载，监听目录: {CUSTOM_DIR}")
+
+    def stop(self):
+        self._stop.set()
+
+
+def start_hot_reload() -> HotReloader:
+    reloader = HotReloader()
+    reloader.start()
+    return reloader
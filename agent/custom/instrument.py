@@ -0,0 +1,112 @@
+"""
+custom 调用统计与追踪
+
+registry 中的代理通过 @instrumented 装饰 analyze / run，
+按名称记录调用次数、命中率、异常次数和延迟直方图（见 utils.stats），
+开启 MAA_AGENT_TRACE 时同时记录 trace 事件（见 utils.tracing）。
+传给 custom 的 context 会被包装一层，用于统计在 context.run_recognition 中的耗时，
+从而区分框架识别耗时和我们自己的 Python 代码耗时。
+"""
+
+import functools
+from time import perf_counter
+
+from utils.stats import stats
+from utils.tracing import tracer
+
+
+class InstrumentedTasker:
+    """追踪 get_task_detail 的 Tasker 包装"""
+
+    def __init__(self, tasker):
+        self._tasker = tasker
+
+    def get_task_detail(self, task_id):
+        with tracer.span("get_task_detail", cat="framework", task_id=task_id):
+            return self._tasker.get_task_detail(task_id)
+
+    def __getattr__(self, name):
+        return getattr(self._tasker, name)
+
+
+class InstrumentedContext:
+    """记录 run_recognition 耗时的 Context 包装，其余属性直接转发给原对象"""
+
+    def __init__(self, context):
+        self._context = context
+        self.inner_seconds = 0.0
+        if tracer.enabled:
+            self.tasker = InstrumentedTasker(context.tasker)
+
+    def run_recognition(self, entry, *args, **kwargs):
+        start = perf_counter()
+        try:
+            with tracer.span("run_recognition", cat="framework", entry=entry) as span:
+                reco_detail = self._context.run_recognition(entry, *args, **kwargs)
+                span.args["hit"] = (
+                    reco_detail is not None and reco_detail.box is not None
+                )
+                return reco_detail
+        finally:
+            self.inner_seconds += perf_counter() - start
+
+    def override_pipeline(self, *args, **kwargs):
+        with tracer.span("override_pipeline", cat="framework"):
+            return self._context.override_pipeline(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._context, name)
+
+
+def _is_hit(kind: str, result) -> bool:
+    if kind == "recognition":
+        # AnalyzeResult 的 box 为空，或直接返回 None 时视为未命中
+        return result is not None and getattr(result, "box", result) is not None
+    return bool(getattr(result, "success", result))
+
+
+def instrumented(kind: str):
+    """
+    统计被装饰方法的调用，被装饰对象需有 name 属性:
+
+        @instrumented("recognition")
+        def analyze(self, context, argv): ...
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, context, argv):
+            if not stats.enabled and not tracer.enabled:
+                return func(self, context, argv)
+
+            context = InstrumentedContext(context)
+            span = tracer.span(
+                self.name,
+                cat=kind,
+                task_id=argv.task_detail.task_id,
+                node=argv.node_name,
+            )
+            start = perf_counter()
+            hit = False
+            error = True
+            try:
+                with span:
+                    result = func(self, context, argv)
+                    hit = _is_hit(kind, result)
+                    span.args["hit"] = hit
+                error = False
+                return result
+            finally:
+                if stats.enabled:
+                    stats.record(
+                        self.name,
+                        kind,
+                        perf_counter() - start,
+                        context.inner_seconds,
+                        hit=hit,
+                        error=error,
+                    )
+
+        return wrapper
+
+    return decorator
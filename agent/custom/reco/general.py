@@ -4,14 +4,13 @@ import json
 import random
 from typing import Any, Dict, List, Union, Optional
 
-from maa.agent.agent_server import AgentServer
 from maa.custom_recognition import CustomRecognition
 from maa.context import Context
 from maa.define import RectType
-from utils.logger import logger
+from utils.logger import logger, is_enabled
+from utils.metrics import MetricFamily, register_collector
 
 
-@AgentServer.custom_recognition("MultiRecognition")
 class MultiRecognition(CustomRecognition):
     """
     多算法组合识别。
@@ -86,9 +85,10 @@ class MultiRecognition(CustomRecognition):
                 index_key = f"${i}"
 
                 reco_detail = context.run_recognition(node_name, argv.image)
-                logger.debug(
-                    f"{node_name}({index_key}): {reco_detail.box if (reco_detail is not None) else None}"
-                )
+                if is_enabled("DEBUG"):
+                    logger.debug(
+                        f"{node_name}({index_key}): {reco_detail.box if (reco_detail is not None) else None}"
+                    )
 
                 if reco_detail is not None and reco_detail.box is not None:
                     # 标准化ROI，将[0,0,0,0]转换为实际全屏坐标，其它不变
@@ -105,7 +105,8 @@ class MultiRecognition(CustomRecognition):
             # ROI计算
             final_roi = self._process_return_value(return_value, node_results)
             if final_roi:
-                logger.debug(f"MultiRecognition识别成功，返回ROI: {final_roi}")
+                if is_enabled("DEBUG"):
+                    logger.debug(f"MultiRecognition识别成功，返回ROI: {final_roi}")
                 return CustomRecognition.AnalyzeResult(
                     box=final_roi, detail="MultiRecognition"
                 )
@@ -141,7 +142,8 @@ class MultiRecognition(CustomRecognition):
         if not uncached_nodes:
             return  # 所有节点都已缓存
 
-        logger.debug(f"缓存外部节点: {uncached_nodes}")
+        if is_enabled("DEBUG"):
+            logger.debug(f"缓存外部节点: {uncached_nodes}")
 
         task_id = self._argv.task_detail.task_id
         task_detail = self._context.tasker.get_task_detail(task_id)
@@ -166,10 +168,11 @@ class MultiRecognition(CustomRecognition):
                     else:
                         self._external_roi_cache[node_detail.name] = None
 
-                    logger.debug(
-                        f"缓存外部节点 {node_detail.name}: 成功={recognition_success}, "
-                        f"ROI={self._external_roi_cache[node_detail.name]}"
-                    )
+                    if is_enabled("DEBUG"):
+                        logger.debug(
+                            f"缓存外部节点 {node_detail.name}: 成功={recognition_success}, "
+                            f"ROI={self._external_roi_cache[node_detail.name]}"
+                        )
                     uncached_nodes.remove(node_detail.name)
 
         # 对于未找到的节点，标记为失败
@@ -238,7 +241,8 @@ class MultiRecognition(CustomRecognition):
                         eval_expression = eval_expression.replace(
                             f"{{{node_name}}}", bool_value
                         )
-                        logger.debug(f"外部节点 {node_name}: {bool_value}")
+                        if is_enabled("DEBUG"):
+                            logger.debug(f"外部节点 {node_name}: {bool_value}")
 
             # 替换 $0、$1、$2... 为对应的识别结果
             for key, result in node_results.items():
@@ -249,7 +253,8 @@ class MultiRecognition(CustomRecognition):
             eval_expression = eval_expression.replace("OR", "or")
             eval_expression = eval_expression.replace("NOT", "not")
 
-            logger.debug(f"表达式转换: {expression} -> {eval_expression}")
+            if is_enabled("DEBUG"):
+                logger.debug(f"表达式转换: {expression} -> {eval_expression}")
 
             # 计算表达式
             result = eval(eval_expression)
@@ -273,7 +278,8 @@ class MultiRecognition(CustomRecognition):
                 # 直接返回坐标数组 [x, y, w, h]
                 try:
                     result = [int(x) for x in return_value]
-                    logger.debug(f"返回固定坐标: {result}")
+                    if is_enabled("DEBUG"):
+                        logger.debug(f"返回固定坐标: {result}")
                     return result
                 except (ValueError, TypeError):
                     logger.error(f"return坐标格式错误: {return_value}")
@@ -318,7 +324,8 @@ class MultiRecognition(CustomRecognition):
                 else:
                     eval_expression = eval_expression.replace(key, "[0,0,0,0]")
 
-            logger.debug(f"ROI表达式转换: {expression} -> {eval_expression}")
+            if is_enabled("DEBUG"):
+                logger.debug(f"ROI表达式转换: {expression} -> {eval_expression}")
 
             # 处理函数调用：UNION, INTERSECTION, OFFSET
             result = self._evaluate_roi_functions(eval_expression)
@@ -334,7 +341,7 @@ class MultiRecognition(CustomRecognition):
                     logger.warning(f"ROI计算结果完全超出屏幕范围: {final_roi}")
                     return None
 
-                if clipped_roi != final_roi:
+                if clipped_roi != final_roi and is_enabled("DEBUG"):
                     logger.debug(f"ROI结果裁剪: {final_roi} -> {clipped_roi}")
 
                 return clipped_roi
@@ -363,10 +370,12 @@ class MultiRecognition(CustomRecognition):
                 if roi is not None:
                     roi_str = f"[{roi[0]},{roi[1]},{roi[2]},{roi[3]}]"
                     expression = expression.replace(f"{{{node_name}}}", roi_str)
-                    logger.debug(f"{node_name} ROI: {roi_str}")
+                    if is_enabled("DEBUG"):
+                        logger.debug(f"{node_name} ROI: {roi_str}")
                 else:
                     expression = expression.replace(f"{{{node_name}}}", "[0,0,0,0]")
-                    logger.debug("{node_name} ROI: " + "[0,0,0,0]")
+                    if is_enabled("DEBUG"):
+                        logger.debug(f"{node_name} ROI: [0,0,0,0]")
 
         return expression
 
@@ -569,15 +578,15 @@ class MultiRecognition(CustomRecognition):
                 scaled_width = int(original_width * (720 / original_height))
 
             normalized_roi = [0, 0, scaled_width, scaled_height]
-            logger.debug(
-                f"全屏ROI标准化: 原始尺寸({original_width}x{original_height}) -> 缩放尺寸({scaled_width}x{scaled_height})"
-            )
+            if is_enabled("DEBUG"):
+                logger.debug(
+                    f"全屏ROI标准化: 原始尺寸({original_width}x{original_height}) -> 缩放尺寸({scaled_width}x{scaled_height})"
+                )
             return normalized_roi
 
         return roi
 
 
-@AgentServer.custom_recognition("Count")
 class Count(CustomRecognition):
     """
     节点匹配次数计数器，task_id变化时自动重置
@@ -659,9 +668,10 @@ class Count(CustomRecognition):
                 # 识别成功
                 if reco_detail is not None and reco_detail.box is not None:
                     Count.record[node_name]["count"] += 1
-                    logger.debug(
-                        f"Count识别成功: {node_name}, 当前计数: {Count.record[node_name]['count']}"
-                    )
+                    if is_enabled("DEBUG"):
+                        logger.debug(
+                            f"Count识别成功: {node_name}, 当前计数: {Count.record[node_name]['count']}"
+                        )
                     return CustomRecognition.AnalyzeResult(
                         box=reco_detail.box, detail=f"Count({node_name})"
                     )
@@ -675,3 +685,16 @@ class Count(CustomRecognition):
         except Exception as e:
             logger.error(f"Count识别失败: {e}")
             return None
+
+
+def _collect_count_metrics() -> List[MetricFamily]:
+    value = MetricFamily("count_value", "gauge", "Count 节点当前计数")
+    target = MetricFamily("count_target", "gauge", "Count 节点目标计数")
+    for node_name, record in list(Count.record.items()):
+        value.add(record["count"], node=node_name)
+        if record["target"] < sys.maxsize:
+            target.add(record["target"], node=node_name)
+    return [value, target]
+
+
+register_collector("count", _collect_count_metrics)
@@ -0,0 +1,248 @@
+"""
+custom 识别调用录制
+
+设置环境变量 MAA_AGENT_RECORD=1 后，每次自定义识别调用都会记录:
+  输入截图（zlib 压缩）、参数、节点名、调用中 run_recognition 的结果、
+  get_task_detail 返回的任务详情，以及 custom 的输出和耗时。
+按行写入 debug/recordings/{时间}_{pid}.jsonl，可用 tools/benchmark/replay.py 离线回放。
+
+压缩和写文件在后台线程中进行，队列满时丢弃该次记录，不阻塞识别。
+"""
+
+import os
+import json
+import zlib
+import time
+import queue
+import base64
+import functools
+import threading
+from pathlib import Path
+from time import perf_counter
+
+from utils.logger import logger
+from utils.metrics import MetricFamily, register_collector
+
+RECORD_ENV_KEY = "MAA_AGENT_RECORD"
+RECORD_DIR_ENV_KEY = "MAA_AGENT_RECORD_DIR"
+DEFAULT_RECORD_DIR = "debug/recordings"
+
+# 等待写入的记录数上限，每条约包含一帧截图
+_QUEUE_SIZE = 32
+
+
+def encode_image(image) -> dict:
+    if image is None:
+        return None
+    return {
+        "shape": list(image.shape),
+        "dtype": str(image.dtype),
+        "data": base64.b64encode(zlib.compress(image.tobytes(), 1)).decode("ascii"),
+    }
+
+
+def decode_image(data: dict):
+    import numpy as np
+
+    if data is None:
+        return None
+    raw = zlib.decompress(base64.b64decode(data["data"]))
+    return np.frombuffer(raw, dtype=data["dtype"]).reshape(data["shape"])
+
+
+def box_to_list(box):
+    return None if box is None else [int(v) for v in box]
+
+
+def encode_result(result) -> dict:
+    """序列化 analyze 的返回值（AnalyzeResult / 矩形 / None）"""
+    if result is None:
+        return {"box": None, "detail": None}
+    box = getattr(result, "box", result)
+    detail = getattr(result, "detail", None)
+    return {
+        "box": box_to_list(box),
+        "detail": detail if isinstance(detail, (str, type(None))) else str(detail),
+    }
+
+
+def encode_task_detail(task_detail) -> dict:
+    if task_detail is None:
+        return None
+    nodes = []
+    for node in task_detail.nodes or []:
+        recognition = node.recognition
+        box = recognition.box if recognition is not None else None
+        nodes.append({"name": node.name, "box": box_to_list(box)})
+    status = getattr(task_detail, "status", None)
+    return {
+        "task_id": task_detail.task_id,
+        "entry": task_detail.entry,
+        "status": getattr(status, "_status", None),
+        "nodes": nodes,
+    }
+
+
+class RecordingTasker:
+    """记录 get_task_detail 结果的 Tasker 包装"""
+
+    def __init__(self, tasker, calls: list):
+        self._tasker = tasker
+        self._calls = calls
+
+    def get_task_detail(self, task_id):
+        task_detail = self._tasker.get_task_detail(task_id)
+        self._calls.append(
+            {"type": "get_task_detail", "result": encode_task_detail(task_detail)}
+        )
+        return task_detail
+
+    def __getattr__(self, name):
+        return getattr(self._tasker, name)
+
+
+class RecordingContext:
+    """按调用顺序记录 run_recognition / override_pipeline / get_task_detail 的 Context 包装"""
+
+    def __init__(self, context):
+        self._context = context
+        self.calls = []
+        self.tasker = RecordingTasker(context.tasker, self.calls)
+
+    def run_recognition(self, entry, image, pipeline_override=None):
+        if pipeline_override is None:
+            reco_detail = self._context.run_recognition(entry, image)
+        else:
+            reco_detail = self._context.run_recognition(
+                entry, image, pipeline_override
+            )
+        box = reco_detail.box if reco_detail is not None else None
+        self.calls.append(
+            {"type": "run_recognition", "entry": entry, "box": box_to_list(box)}
+        )
+        return reco_detail
+
+    def override_pipeline(self, pipeline_override):
+        self.calls.append(
+            {"type": "override_pipeline", "override": pipeline_override}
+        )
+        return self._context.override_pipeline(pipeline_override)
+
+    def __getattr__(self, name):
+        return getattr(self._context, name)
+
+
+class SessionRecorder:
+    def __init__(self, record_dir):
+        record_dir = Path(record_dir)
+        record_dir.mkdir(parents=True, exist_ok=True)
+        file_name = f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.jsonl"
+        self.path = record_dir / file_name
+        self._queue = queue.Queue(maxsize=_QUEUE_SIZE)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self._thread = threading.Thread(
+            target=self._write_loop, name="custom-recorder", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"已开启识别录制，写入 {self.path}")
+
+    def submit(self, record: dict, image):
+        with self._lock:
+            self._seq += 1
+            record["seq"] = self._seq
+            # 队列已满时直接丢弃，不再复制截图
+            if self._queue.full():
+                self.dropped += 1
+                return
+        try:
+            # 框架可能复用截图内存，先复制一份再交给后台线程压缩
+            if image is not None:
+                image = image.copy()
+            self._queue.put_nowait((record, image))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _write_loop(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                record, image = item
+                record["image"] = encode_image(image)
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        if self.dropped:
+            logger.warning(f"录制队列已满，丢弃了 {self.dropped} 次调用")
+        logger.info(f"识别录制已保存至 {self.path}")
+
+
+def _collect_recorder_metrics() -> list:
+    recorder = _recorder
+    if recorder is None:
+        return []
+    return [
+        MetricFamily("recorder_queue_depth", "gauge", "等待写入的录制帧数").add(
+            recorder._queue.qsize()
+        ),
+        MetricFamily(
+            "recorder_dropped_frames_total", "counter", "队列已满而丢弃的录制帧数"
+        ).add(recorder.dropped),
+    ]
+
+
+_recorder = None
+if os.environ.get(RECORD_ENV_KEY, "") not in ("", "0"):
+    try:
+        _recorder = SessionRecorder(
+            os.environ.get(RECORD_DIR_ENV_KEY) or DEFAULT_RECORD_DIR
+        )
+        register_collector("recorder", _collect_recorder_metrics)
+    except OSError as e:
+        logger.warning(f"无法开启识别录制: {e}")
+
+
+def close_recorder():
+    """写完队列中剩余的记录，agent 关闭时调用"""
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+        _recorder = None
+
+
+def recorded(func):
+    """录制被装饰的 analyze 调用，被装饰对象需有 name 属性"""
+
+    @functools.wraps(func)
+    def wrapper(self, context, argv):
+        recorder = _recorder
+        if recorder is None:
+            return func(self, context, argv)
+
+        context = RecordingContext(context)
+        start = perf_counter()
+        result = func(self, context, argv)
+        elapsed = perf_counter() - start
+
+        record = {
+            "time": time.time(),
+            "name": self.name,
+            "node": argv.node_name,
+            "task_id": argv.task_detail.task_id,
+            "param": argv.custom_recognition_param,
+            "roi": box_to_list(argv.roi),
+            "calls": context.calls,
+            "result": encode_result(result),
+            "duration_ms": round(elapsed * 1000, 3),
+        }
+        recorder.submit(record, argv.image)
+        return result
+
+    return wrapper
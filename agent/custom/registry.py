@@ -0,0 +1,151 @@
+"""
+自定义识别/动作注册表
+
+名称与 "模块路径:类名" 一一对应。AgentServer 启动前只注册轻量代理，
+真正的模块在框架第一次调用该名称时才导入并实例化，
+避免启动时导入全部 custom 模块及其依赖（PIL 等）。
+
+新增 custom 时，在对应的表中添加一行即可，无需再使用
+@AgentServer.custom_recognition / @AgentServer.custom_action 装饰器。
+"""
+
+import importlib
+import threading
+from time import perf_counter
+from typing import Dict
+
+from maa.agent.agent_server import AgentServer
+from maa.custom_action import CustomAction
+from maa.custom_recognition import CustomRecognition
+
+from utils.logger import logger, log_context, log_duration
+
+from .instrument import instrumented
+from .recorder import recorded
+
+CUSTOM_RECOGNITIONS: Dict[str, str] = {
+    "MultiRecognition": "custom.reco.general:MultiRecognition",
+    "Count": "custom.reco.general:Count",
+}
+
+CUSTOM_ACTIONS: Dict[str, str] = {
+    "Screenshot": "custom.action.general:Screenshot",
+    "DisableNode": "custom.action.general:DisableNode",
+    "NodeOverride": "custom.action.general:NodeOverride",
+    "ResetCount": "custom.action.general:ResetCount",
+}
+
+# 已注册的代理，名称 -> 代理实例
+_proxies: Dict[str, "_LazyCustom"] = {}
+
+
+def load_custom_class(target: str) -> type:
+    """根据 "模块路径:类名" 导入并返回对应的类"""
+    module_name, _, class_name = target.partition(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)
+
+
+class _LazyCustom:
+    """首次调用时才导入并实例化目标类的代理基类"""
+
+    def _init_lazy(self, name: str, target: str):
+        self.name = name
+        self.target = target
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def _resolve(self):
+        instance = self._instance
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if self._instance is None:
+                logger.debug(f"首次调用 {self.name}，加载 {self.target}")
+                self._instance = load_custom_class(self.target)()
+            return self._instance
+
+    @property
+    def module_name(self) -> str:
+        return self.target.partition(":")[0]
+
+    def _call(self, method: str, context, argv):
+        """调用实例的方法，期间的日志附加 task_id、node，结束时记录 duration_ms"""
+        with log_context(task_id=argv.task_detail.task_id, node=argv.node_name):
+            start = perf_counter()
+            try:
+                return getattr(self._resolve(), method)(context, argv)
+            finally:
+                duration_ms = round((perf_counter() - start) * 1000, 3)
+                log_duration(f"{self.name} 耗时 {duration_ms}ms", duration_ms)
+
+    def reset(self):
+        """丢弃已创建的实例，下次调用时重新从模块中获取类并实例化"""
+        with self._lock:
+            self._instance = None
+
+
+class LazyRecognition(_LazyCustom, CustomRecognition):
+    def __init__(self, name: str, target: str):
+        super().__init__()
+        self._init_lazy(name, target)
+
+    @recorded
+    @instrumented("recognition")
+    def analyze(
+        self,
+        context,
+        argv: CustomRecognition.AnalyzeArg,
+    ):
+        return self._call("analyze", context, argv)
+
+
+class LazyAction(_LazyCustom, CustomAction):
+    def __init__(self, name: str, target: str):
+        super().__init__()
+        self._init_lazy(name, target)
+
+    @instrumented("action")
+    def run(
+        self,
+        context,
+        argv: CustomAction.RunArg,
+    ):
+        return self._call("run", context, argv)
+
+
+def register_all() -> None:
+    """向 AgentServer 注册表中所有 custom 的代理"""
+    for name, target in CUSTOM_RECOGNITIONS.items():
+        proxy = LazyRecognition(name, target)
+        if AgentServer.register_custom_recognition(name, proxy):
+            _proxies[name] = proxy
+        else:
+            logger.error(f"注册自定义识别失败: {name}")
+
+    for name, target in CUSTOM_ACTIONS.items():
+        proxy = LazyAction(name, target)
+        if AgentServer.register_custom_action(name, proxy):
+            _proxies[name] = proxy
+        else:
+            logger.error(f"注册自定义动作失败: {name}")
+
+    logger.debug(
+        f"已注册 {len(CUSTOM_RECOGNITIONS)} 个自定义识别，{len(CUSTOM_ACTIONS)} 个自定义动作"
+    )
+
+
+def reset_module(module_name: str) -> list:
+    """
+    重置来自指定模块的所有代理，使其下次调用时使用模块中最新的类。
+
+    Returns:
+        被重置的 custom 名称列表
+    """
+    names = []
+    for name, proxy in _proxies.items():
+        if proxy.module_name == module_name:
+            proxy.reset()
+            names.append(name)
+    return names
@@ -3,6 +3,8 @@
 import os
 import sys
 import json
+import hashlib
+import threading
 import subprocess
 from pathlib import Path
 
@@ -23,7 +25,28 @@ print(f"set cwd: {os.getcwd()}")
 if current_script_dir not in sys.path:
     sys.path.insert(0, current_script_dir)
 
+# 安装包中的 agent 模块可能已打包为 agent.zip
+agent_zip_path = os.path.join(current_script_dir, "agent.zip")
+if os.path.exists(agent_zip_path) and agent_zip_path not in sys.path:
+    sys.path.insert(0, agent_zip_path)
+
 from utils import logger
+from utils.logger import LOG_NAME_ENV_KEY, flush_log_throttle
+from utils.startup_timer import StartupTimer
+
+# 启动阶段耗时统计
+startup_timer = StartupTimer()
+STARTUP_TIMING_FILE = Path(project_root_dir) / "debug" / "startup_timing.jsonl"
+
+# custom 调用统计，定期及关闭时写入 debug/custom_stats/{socket_id}.json，
+# 由 supervisor 启动时为 {socket_id}_{worker 名称}.json
+CUSTOM_STATS_DIR = Path(project_root_dir) / "debug" / "custom_stats"
+CUSTOM_STATS_INTERVAL_KEY = "MAA_AGENT_STATS_INTERVAL"
+
+# agent 主动请求重启时使用的退出码（如内存超限），supervisor 重启时不计入退避
+RESTART_EXIT_CODE = 75
+# 请求重启后等待 AgentServer 关闭的最长时间，超时强制退出
+RESTART_GRACE_SECONDS = 30
 
 VENV_NAME = ".venv"  # 虚拟环境目录的名称
 VENV_DIR = Path(project_root_dir) / VENV_NAME
@@ -53,10 +76,41 @@ def _is_running_in_our_venv():
             return False
 
 
+def _can_exec_relaunch() -> bool:
+    """
+    检查是否可以用 exec 替换当前进程重新启动。
+    Windows 上的 exec 实际是新建进程后退出原进程，父进程会误以为 agent 已退出，
+    因此只在 POSIX 系统上使用；设置 MAA_AGENT_NO_EXEC=1 可强制使用子进程方式。
+    """
+    if os.environ.get("MAA_AGENT_NO_EXEC", "") not in ("", "0"):
+        return False
+    return os.name == "posix" and hasattr(os, "execv")
+
+
+def _exec_relaunch(cmd: list):
+    """
+    使用 os.execv 以虚拟环境Python替换当前进程。
+    进程号不变，信号和退出码由新解释器直接传递给父进程。
+    exec 失败时返回，由调用方回退到子进程方式。
+    """
+    # exec 会丢弃未写出的缓冲和日志队列，也不会执行 atexit，先全部刷新
+    flush_log_throttle()
+    if hasattr(logger, "complete"):
+        logger.complete()
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    try:
+        os.execv(cmd[0], cmd)
+    except OSError as e:
+        logger.warning(f"exec 重新启动失败，回退到子进程方式: {e}")
+
+
 def ensure_venv_and_relaunch_if_needed():
     """
     确保venv存在，并且如果尚未在脚本管理的venv中运行，
     则在其中重新启动脚本。支持Linux和Windows系统。
+    POSIX 系统上通过 exec 替换当前进程，其它系统回退为等待子进程退出。
     """
     logger.info(f"检测到系统: {sys.platform}。当前Python解释器: {sys.executable}")
 
@@ -68,11 +122,12 @@ def ensure_venv_and_relaunch_if_needed():
         logger.info(f"正在 {VENV_DIR} 创建虚拟环境...")
         try:
             # 使用当前运行此脚本的Python（系统/外部Python）
-            subprocess.run(
-                [sys.executable, "-m", "venv", str(VENV_DIR)],
-                check=True,
-                capture_output=True,
-            )
+            with startup_timer.phase("venv_create"):
+                subprocess.run(
+                    [sys.executable, "-m", "venv", str(VENV_DIR)],
+                    check=True,
+                    capture_output=True,
+                )
             logger.info(f"创建成功")
         except subprocess.CalledProcessError as e:
             logger.error(
@@ -106,10 +161,17 @@ def ensure_venv_and_relaunch_if_needed():
 
     logger.info(f"正在使用虚拟环境Python重新启动")
 
-    try:
-        cmd = [str(python_in_venv)] + sys.argv
-        logger.info(f"执行命令: {' '.join(cmd)}")
+    cmd = [str(python_in_venv)] + sys.argv
+    logger.info(f"执行命令: {' '.join(cmd)}")
+
+    # 重新启动前后的耗时由新进程统一记录
+    startup_timer.export_env(pending="venv_relaunch")
 
+    if _can_exec_relaunch():
+        _exec_relaunch(cmd)
+
+    # 回退：启动子进程并等待其退出
+    try:
         result = subprocess.run(
             cmd,
             cwd=os.getcwd(),
@@ -174,13 +236,16 @@ def read_pip_config() -> dict:
 ### 依赖安装相关 ###
 
 
+WHEEL_MANIFEST_NAME = "wheels_manifest.json"
+
+
 def find_local_wheels_dir():
     """查找本地deps目录中的whl文件"""
     project_root = Path(project_root_dir)
     deps_dir = project_root / "deps"
 
-    if deps_dir.exists() and any(deps_dir.glob("*.whl")):
-        whl_count = len(list(deps_dir.glob("*.whl")))
+    whl_count = len(list(deps_dir.glob("*.whl"))) if deps_dir.exists() else 0
+    if whl_count:
         logger.info(f"发现本地deps目录包含 {whl_count} 个 whl 文件")
         return deps_dir
 
@@ -188,6 +253,99 @@ def find_local_wheels_dir():
     return None
 
 
+def _file_sha256(path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def read_wheel_manifest(deps_dir: Path, req_path: Path):
+    """
+    读取 download_deps.py 生成的 wheel 清单。
+    清单不存在、无法解析或与当前 requirements.txt 不匹配时返回 None。
+    """
+    manifest_path = deps_dir / WHEEL_MANIFEST_NAME
+    if not manifest_path.exists():
+        logger.debug("本地deps目录中无 wheel 清单")
+        return None
+
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except Exception:
+        logger.exception("读取 wheel 清单失败")
+        return None
+
+    if manifest.get("requirements_sha256") != _file_sha256(req_path):
+        logger.info(f"{req_path.name} 与 wheel 清单不一致，忽略清单")
+        return None
+
+    return manifest
+
+
+def find_missing_wheels(manifest: dict) -> list:
+    """返回清单中尚未以相同版本安装的 wheel"""
+    from importlib import metadata
+
+    missing = []
+    for wheel in manifest.get("wheels", []):
+        try:
+            installed_version = metadata.version(wheel["name"])
+        except metadata.PackageNotFoundError:
+            installed_version = None
+        if installed_version != wheel["version"]:
+            missing.append(wheel)
+    return missing
+
+
+def verify_wheels(deps_dir: Path, wheels: list) -> bool:
+    """校验 wheel 是否存在且 sha256 与清单一致"""
+    for wheel in wheels:
+        whl_path = deps_dir / wheel["file"]
+        if not whl_path.exists():
+            logger.error(f"wheel 文件缺失: {whl_path}")
+            return False
+        if _file_sha256(whl_path) != wheel["sha256"]:
+            logger.error(f"wheel 文件已损坏（sha256 不匹配）: {whl_path}")
+            return False
+    return True
+
+
+def install_wheels_from_manifest(deps_dir: Path, manifest: dict):
+    """
+    按清单只安装缺失的 wheel。
+
+    Returns:
+        True: 已是最新或安装成功
+        False: 安装失败，可回退到完整的本地安装
+        None: wheel 缺失或损坏，本地安装不可用
+    """
+    missing = find_missing_wheels(manifest)
+    if not missing:
+        logger.info("已安装的依赖与本地 wheel 清单一致，跳过 pip 安装")
+        return True
+
+    logger.info(f"需要安装 {len(missing)} 个 wheel: {[w['file'] for w in missing]}")
+    if not verify_wheels(deps_dir, missing):
+        return None
+
+    # 清单包含完整的依赖闭包，直接按文件路径安装，无需 pip 重新解析
+    cmd = [
+        sys.executable,
+        "-m",
+        "pip",
+        "install",
+        "--no-warn-script-location",
+        "--break-system-packages",
+        "--no-index",
+        "--no-deps",
+        *[str(deps_dir / wheel["file"]) for wheel in missing],
+    ]
+    return _run_pip_command(cmd, "按 wheel 清单安装依赖")
+
+
 def _run_pip_command(cmd_args: list, operation_name: str) -> bool:
     try:
         logger.info(f"开始 {operation_name}")
@@ -243,6 +401,17 @@ def install_requirements(req_file="requirements.txt", pip_config=None) -> bool:
 
     # 查找本地deps目录
     deps_dir = find_local_wheels_dir()
+    manifest = read_wheel_manifest(deps_dir, req_path) if deps_dir else None
+    if manifest is not None:
+        result = install_wheels_from_manifest(deps_dir, manifest)
+        if result:
+            return True
+        elif result is None:
+            logger.warning("本地 wheel 不可用，跳过本地安装")
+            deps_dir = None
+        else:
+            logger.warning("按清单安装失败，尝试完整的本地安装")
+
     if deps_dir:
         logger.info(f"使用本地 whl 文件安装，目录: {deps_dir}")
 
@@ -321,14 +490,17 @@ def install_requirements(req_file="requirements.txt", pip_config=None) -> bool:
 
 def check_and_install_dependencies():
     """检查并安装项目依赖"""
-    pip_config = read_pip_config()
+    with startup_timer.phase("read_pip_config"):
+        pip_config = read_pip_config()
     enable_pip_install = pip_config.get("enable_pip_install", True)
 
     logger.info(f"启用 pip 安装依赖: {enable_pip_install}")
 
     if enable_pip_install:
         logger.info("开始安装/更新依赖")
-        if install_requirements(pip_config=pip_config):
+        with startup_timer.phase("install_dependencies"):
+            installed = install_requirements(pip_config=pip_config)
+        if installed:
             logger.info("依赖检查和安装完成")
         else:
             logger.warning("依赖安装失败，程序可能无法正常运行")
@@ -339,25 +511,66 @@ def check_and_install_dependencies():
 ### 核心业务 ###
 
 
+def _report_startup_timing(socket_id: str):
+    """输出启动耗时到日志，并追加写入 debug/startup_timing.jsonl"""
+    logger.info(startup_timer.summary())
+    try:
+        startup_timer.dump(STARTUP_TIMING_FILE, socket_id=socket_id)
+    except OSError as e:
+        logger.warning(f"写入启动耗时记录失败: {e}")
+
+    # 启动阶段发生在 utils 重新导入之前，结束后统一补录到 trace
+    from utils.tracing import tracer
+
+    for phase in startup_timer.phases:
+        if "start" in phase:
+            tracer.complete(
+                phase["name"],
+                phase["start"],
+                phase["ms"] / 1000,
+                cat="startup",
+                pid=phase["pid"],
+            )
+
+
+def _custom_stats_file(socket_id: str) -> Path:
+    """
+    每个设备单独的统计文件，多设备运行时互不覆盖。
+    重启后的进程覆盖同一个文件，不会随重启次数不断增加
+    """
+    name = socket_id
+    worker_name = os.environ.get(LOG_NAME_ENV_KEY)
+    if worker_name:
+        name += f"_{worker_name}"
+    safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    return CUSTOM_STATS_DIR / f"{safe_name}.json"
+
+
+def _force_restart_exit():
+    logger.warning("AgentServer 未能及时关闭，强制退出")
+    # os._exit 不会执行 atexit，先输出限流器中的汇总
+    from utils.logger import flush_log_throttle
+
+    flush_log_throttle()
+    if hasattr(logger, "complete"):
+        logger.complete()
+    os._exit(RESTART_EXIT_CODE)
+
+
 def agent(is_dev_mode=False):
+    global logger
+
     try:
-        # 清理模块缓存
+        # 依赖可能刚刚安装，清理 utils 模块缓存后重新导入，以启用 loguru 等模块
         utils_modules = [
             name for name in list(sys.modules.keys()) if name.startswith("utils")
         ]
         for module_name in utils_modules:
             del sys.modules[module_name]
 
-        # 动态导入 utils 的所有内容
         import utils
-        import importlib
 
-        importlib.reload(utils)
-
-        # 将 utils 的所有公共属性导入到当前命名空间
-        for attr_name in dir(utils):
-            if not attr_name.startswith("_"):
-                globals()[attr_name] = getattr(utils, attr_name)
+        logger = utils.logger
 
         if is_dev_mode:
             from utils.logger import change_console_level
@@ -365,12 +578,23 @@ def agent(is_dev_mode=False):
             change_console_level("DEBUG")
             logger.info("开发模式：日志等级已设置为DEBUG")
 
-        from maa.agent.agent_server import AgentServer
-        from maa.toolkit import Toolkit
+        with startup_timer.phase("import_modules"):
+            from maa.agent.agent_server import AgentServer
+            from maa.toolkit import Toolkit
+
+            # 只注册代理，具体 custom 模块在首次调用时才导入
+            import custom
+
+            custom.register_all()
 
-        import custom
+        # 开发模式下修改 custom 模块后自动热重载
+        if is_dev_mode and os.environ.get("MAA_AGENT_HOT_RELOAD", "1") != "0":
+            from custom.hot_reload import start_hot_reload
 
-        Toolkit.init_option("./")
+            start_hot_reload()
+
+        with startup_timer.phase("toolkit_init_option"):
+            Toolkit.init_option("./")
 
         if len(sys.argv) < 2:
             logger.error("缺少必要的 socket_id 参数")
@@ -379,11 +603,72 @@ def agent(is_dev_mode=False):
         socket_id = sys.argv[-1]
         logger.info(f"socket_id: {socket_id}")
 
-        AgentServer.start_up(socket_id)
+        with startup_timer.phase("agent_server_start_up"):
+            AgentServer.start_up(socket_id)
         logger.info("AgentServer启动")
+        _report_startup_timing(socket_id)
+
+        from utils.stats import stats
+
+        custom_stats_file = _custom_stats_file(socket_id)
+        stats.start_periodic_dump(
+            custom_stats_file,
+            float(os.environ.get(CUSTOM_STATS_INTERVAL_KEY, "300")),
+        )
+
+        from utils.metrics import MetricsExporter
+
+        metrics_exporter = MetricsExporter.from_env({"socket_id": socket_id})
+        if metrics_exporter is not None:
+            metrics_exporter.start()
+
+        from utils.memprof import MemoryProfiler, RssWatchdog
+
+        memory_profiler = MemoryProfiler.from_env()
+        if memory_profiler is not None:
+            memory_profiler.start()
+
+        restart_requested = threading.Event()
+
+        def request_restart(rss):
+            # 关闭 AgentServer 使 join 返回，由主线程完成收尾后以 RESTART_EXIT_CODE 退出
+            restart_requested.set()
+            AgentServer.shut_down()
+            timer = threading.Timer(RESTART_GRACE_SECONDS, _force_restart_exit)
+            timer.daemon = True
+            timer.start()
+
+        rss_watchdog = RssWatchdog.from_env(on_exceed=request_restart)
+        if rss_watchdog is not None:
+            rss_watchdog.start()
+
         AgentServer.join()
-        AgentServer.shut_down()
+        if not restart_requested.is_set():
+            AgentServer.shut_down()
         logger.info("AgentServer关闭")
+
+        if rss_watchdog is not None:
+            rss_watchdog.stop()
+        if memory_profiler is not None:
+            memory_profiler.stop()
+
+        stats.stop()
+        if stats.enabled:
+            stats.dump(custom_stats_file)
+        if metrics_exporter is not None:
+            metrics_exporter.stop()
+
+        from custom.recorder import close_recorder
+        from utils.tracing import tracer
+
+        close_recorder()
+        tracer.close()
+
+        if restart_requested.is_set():
+            logger.info(f"以返回码 {RESTART_EXIT_CODE} 退出，等待重新启动")
+            if hasattr(logger, "complete"):
+                logger.complete()
+            sys.exit(RESTART_EXIT_CODE)
     except ImportError as e:
         logger.error(f"导入模块失败: {e}")
         logger.error("考虑重新配置环境")
@@ -395,17 +680,34 @@ def agent(is_dev_mode=False):
 
 ### 程序入口 ###
 
+PREPARED_ENV_KEY = "MAA_AGENT_PREPARED"
 
-def main():
-    current_version = read_interface_version()
-    is_dev_mode = current_version == "DEBUG"
 
+def is_environment_prepared() -> bool:
+    return os.environ.get(PREPARED_ENV_KEY) == "1"
+
+
+def prepare_environment(is_dev_mode=False):
+    """准备运行环境：按需切换到虚拟环境并安装依赖"""
     # 如果是Linux系统或开发模式，启动虚拟环境
     if sys.platform.startswith("linux") or is_dev_mode:
-        ensure_venv_and_relaunch_if_needed()
+        with startup_timer.phase("venv_check"):
+            ensure_venv_and_relaunch_if_needed()
 
     check_and_install_dependencies()
 
+
+def main():
+    with startup_timer.phase("read_interface_version"):
+        current_version = read_interface_version()
+    is_dev_mode = current_version == "DEBUG"
+
+    if is_environment_prepared():
+        # 由 supervisor 启动时，虚拟环境和依赖已统一准备好
+        logger.info("运行环境已由 supervisor 准备，跳过虚拟环境和依赖检查")
+    else:
+        prepare_environment(is_dev_mode)
+
     if is_dev_mode:
         os.chdir(Path("./assets"))
         logger.info(f"set cwd: {os.getcwd()}")
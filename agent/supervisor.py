@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+多设备 agent 管理器
+
+根据配置文件同时启动多个 agent 进程（每个设备/socket_id 一个），
+共用一次虚拟环境准备和依赖检查，支持绑定 CPU 核心，
+进程异常退出后按退避时间自动重启，并汇总各进程日志和运行状态。
+
+用法:
+    python agent/supervisor.py [配置文件路径，默认 config/supervisor_config.json]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import signal
+import subprocess
+import threading
+from pathlib import Path
+
+# 导入 main 时会切换工作目录到项目根目录并初始化 logger
+import main
+from main import logger, startup_timer, RESTART_EXIT_CODE
+from utils.logger import LOG_NAME_ENV_KEY
+from utils.metrics import METRICS_FILE_ENV_KEY, METRICS_PORT_ENV_KEY
+
+# agent 控制台输出的颜色控制符，以及 "[等级] 消息" 格式（见 utils.logger）
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+CONSOLE_LINE = re.compile(
+    r"^\[(TRACE|DEBUG|INFO|SUCCESS|WARNING|ERROR|CRITICAL)\] (.*)$"
+)
+
+DEFAULT_CONFIG_PATH = Path("./config") / "supervisor_config.json"
+STATUS_FILE = Path(main.project_root_dir) / "debug" / "supervisor_status.json"
+
+DEFAULT_CONFIG = {
+    "workers": [
+        {"name": "device-0", "socket_id": "MAA_AGENT_SOCKET_0", "cpu_affinity": [0]},
+    ],
+    "auto_cpu_affinity": False,
+    "restart": {
+        "enabled": True,
+        "backoff_initial": 1.0,
+        "backoff_max": 60.0,
+        "stable_seconds": 60.0,
+    },
+    "status_interval": 10.0,
+}
+
+
+def read_supervisor_config(config_path: Path) -> dict:
+    if not config_path.exists():
+        config_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump(DEFAULT_CONFIG, f, indent=4, ensure_ascii=False)
+        logger.error(f"未找到配置文件，已生成模板: {config_path}，请修改后重新运行")
+        sys.exit(1)
+
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    restart = {**DEFAULT_CONFIG["restart"], **config.get("restart", {})}
+    return {**DEFAULT_CONFIG, **config, "restart": restart}
+
+
+class Worker:
+    """单个 agent 进程"""
+
+    def __init__(self, name: str, socket_id: str, cpu_affinity=None, index=0):
+        self.name = name
+        self.index = index
+        self.socket_id = socket_id
+        self.cpu_affinity = cpu_affinity
+        self.process = None
+        self.started_at = None
+        self.restarts = 0
+        self.last_exit_code = None
+        self.next_start_at = 0.0
+        self.backoff = None
+        self._reader = None
+
+    def start(self):
+        cmd = [sys.executable, "-u", main.current_file_path, self.socket_id]
+        env = os.environ.copy()
+        env[main.PREPARED_ENV_KEY] = "1"
+        # 每个 agent 写入各自的日志文件，避免多个进程同时轮转、压缩同一个文件
+        env[LOG_NAME_ENV_KEY] = self.name
+        self._set_metrics_env(env)
+
+        preexec_fn = None
+        if self.cpu_affinity and hasattr(os, "sched_setaffinity"):
+            preexec_fn = self._affinity_preexec_fn()
+
+        self.process = subprocess.Popen(
+            cmd,
+            cwd=main.project_root_dir,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+            preexec_fn=preexec_fn,
+        )
+        self.started_at = time.time()
+        logger.info(f"[{self.name}] 已启动，pid: {self.process.pid}")
+
+        if self.cpu_affinity and not hasattr(os, "sched_setaffinity"):
+            self._set_cpu_affinity()
+
+        self._reader = threading.Thread(
+            target=self._forward_output, name=f"reader-{self.name}", daemon=True
+        )
+        self._reader.start()
+
+    def _set_metrics_env(self, env: dict):
+        """
+        指标文件加上 worker 名称（保留 .prom 后缀供 textfile collector 识别），
+        端口按 worker 序号递增，避免多个 agent 覆盖同一个文件或争用同一个端口
+        """
+        textfile = env.get(METRICS_FILE_ENV_KEY)
+        if textfile:
+            path = Path(textfile)
+            env[METRICS_FILE_ENV_KEY] = str(
+                path.with_name(f"{path.stem}.{self.name}{path.suffix}")
+            )
+        port = env.get(METRICS_PORT_ENV_KEY)
+        if port:
+            try:
+                env[METRICS_PORT_ENV_KEY] = str(int(port) + self.index)
+            except ValueError:
+                logger.warning(
+                    f"[{self.name}] {METRICS_PORT_ENV_KEY} 无效: {port}，不启动 HTTP 导出"
+                )
+                del env[METRICS_PORT_ENV_KEY]
+
+    def _affinity_preexec_fn(self):
+        """
+        POSIX 上在子进程 exec 之前绑定 CPU，使启动阶段的导入也在指定核心上运行。
+        fork 后的子进程中不能使用 logger，无效的核心在这里先过滤并记录。
+        """
+        affinity = set(self.cpu_affinity) & os.sched_getaffinity(0)
+        if not affinity:
+            logger.warning(f"[{self.name}] 绑定 CPU 失败: {self.cpu_affinity} 不可用")
+            return None
+        logger.info(f"[{self.name}] 绑定 CPU: {sorted(affinity)}")
+
+        def preexec_fn():
+            try:
+                os.sched_setaffinity(0, affinity)
+            except OSError:
+                pass
+
+        return preexec_fn
+
+    def _set_cpu_affinity(self):
+        """不支持 preexec_fn 的系统（Windows）在进程启动后绑定"""
+        try:
+            import psutil
+
+            psutil.Process(self.process.pid).cpu_affinity(self.cpu_affinity)
+            logger.info(f"[{self.name}] 绑定 CPU: {self.cpu_affinity}")
+        except ImportError:
+            logger.warning(f"[{self.name}] 当前系统绑定 CPU 需要安装 psutil，已跳过")
+        except Exception as e:
+            logger.warning(f"[{self.name}] 绑定 CPU 失败: {e}")
+
+    def _forward_output(self):
+        """将 agent 的输出汇总到 supervisor 的日志中，去掉颜色并保留原日志等级"""
+        for line in iter(self.process.stdout.readline, ""):
+            line = ANSI_ESCAPE.sub("", line).rstrip("\n\r")
+            if not line.strip():
+                continue
+            level = "INFO"
+            match = CONSOLE_LINE.match(line)
+            if match:
+                level, line = match.groups()
+            # logging 回退时没有 trace / success，按 info 记录
+            log = getattr(logger, level.lower(), logger.info)
+            log(f"[{self.name}] {line}")
+
+    def poll(self):
+        if self.process is None:
+            return None
+        return self.process.poll()
+
+    def stop(self, timeout=10.0):
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            logger.warning(f"[{self.name}] 未能在 {timeout}s 内退出，强制结束")
+            self.process.kill()
+            self.process.wait()
+
+    def status(self) -> dict:
+        running = self.process is not None and self.process.poll() is None
+        return {
+            "name": self.name,
+            "socket_id": self.socket_id,
+            "pid": self.process.pid if self.process else None,
+            "running": running,
+            "uptime": round(time.time() - self.started_at, 1) if running else 0,
+            "restarts": self.restarts,
+            "last_exit_code": self.last_exit_code,
+            "cpu_affinity": self.cpu_affinity,
+        }
+
+
+class Supervisor:
+    def __init__(self, config: dict):
+        self.config = config
+        self.restart_config = config["restart"]
+        self.workers = self._create_workers(config)
+        self._stopping = threading.Event()
+
+    @staticmethod
+    def _create_workers(config: dict) -> list:
+        cpu_count = os.cpu_count() or 1
+        workers = []
+        for index, worker_config in enumerate(config["workers"]):
+            cpu_affinity = worker_config.get("cpu_affinity")
+            if cpu_affinity is None and config.get("auto_cpu_affinity"):
+                cpu_affinity = [index % cpu_count]
+            workers.append(
+                Worker(
+                    name=worker_config.get("name", f"device-{index}"),
+                    socket_id=worker_config["socket_id"],
+                    cpu_affinity=cpu_affinity,
+                    index=index,
+                )
+            )
+        return workers
+
+    def _handle_exit(self, worker: Worker, return_code: int):
+        uptime = time.time() - worker.started_at
+        worker.last_exit_code = return_code
+        worker.process = None
+        logger.warning(
+            f"[{worker.name}] 已退出，返回码: {return_code}，运行时长: {uptime:.1f}s"
+        )
+
+        if not self.restart_config["enabled"]:
+            return
+
+        # 稳定运行一段时间后退出，或 agent 主动请求重启时，不计入退避
+        if (
+            uptime >= self.restart_config["stable_seconds"]
+            or return_code == RESTART_EXIT_CODE
+            or worker.backoff is None
+        ):
+            worker.backoff = self.restart_config["backoff_initial"]
+        else:
+            worker.backoff = min(worker.backoff * 2, self.restart_config["backoff_max"])
+
+        worker.next_start_at = time.time() + worker.backoff
+        logger.info(f"[{worker.name}] 将在 {worker.backoff:.1f}s 后重启")
+
+    def write_status(self):
+        status = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+            "supervisor_pid": os.getpid(),
+            "workers": [worker.status() for worker in self.workers],
+        }
+        try:
+            STATUS_FILE.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = STATUS_FILE.with_suffix(".tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(status, f, indent=4, ensure_ascii=False)
+            os.replace(tmp_file, STATUS_FILE)
+        except OSError as e:
+            logger.warning(f"写入 supervisor 状态失败: {e}")
+
+    def run(self):
+        for worker in self.workers:
+            worker.start()
+
+        status_interval = self.config["status_interval"]
+        next_status_at = 0.0
+
+        while not self._stopping.is_set():
+            now = time.time()
+            for worker in self.workers:
+                if worker.process is not None:
+                    return_code = worker.poll()
+                    if return_code is not None:
+                        self._handle_exit(worker, return_code)
+                elif self.restart_config["enabled"] and now >= worker.next_start_at:
+                    worker.restarts += 1
+                    worker.start()
+
+            if not self.restart_config["enabled"] and all(
+                worker.process is None for worker in self.workers
+            ):
+                logger.info("所有 agent 均已退出")
+                break
+
+            if now >= next_status_at:
+                self.write_status()
+                next_status_at = now + status_interval
+
+            self._stopping.wait(0.5)
+
+        logger.info("正在停止所有 agent")
+        for worker in self.workers:
+            worker.stop()
+        self.write_status()
+
+    def stop(self, *_):
+        self._stopping.set()
+
+
+def supervise():
+    config_path = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CONFIG_PATH
+
+    with startup_timer.phase("read_interface_version"):
+        is_dev_mode = main.read_interface_version() == "DEBUG"
+
+    # 所有 agent 共用一次虚拟环境准备和依赖检查
+    main.prepare_environment(is_dev_mode)
+
+    config = read_supervisor_config(config_path)
+    if not config["workers"]:
+        logger.error("配置文件中没有 worker")
+        sys.exit(1)
+
+    supervisor = Supervisor(config)
+    signal.signal(signal.SIGINT, supervisor.stop)
+    signal.signal(signal.SIGTERM, supervisor.stop)
+
+    logger.info(f"启动 {len(supervisor.workers)} 个 agent")
+    supervisor.run()
+    logger.info("supervisor 已退出")
+
+
+if __name__ == "__main__":
+    supervise()
@@ -1,44 +1,383 @@
 import os
+import re
+import atexit
 import sys
+import json
+import time
+import threading
+import traceback
+from contextlib import nullcontext
+
+# 各日志等级对应的数值，与 loguru / logging 一致
+_LEVEL_NO = {
+    "TRACE": 5,
+    "DEBUG": 10,
+    "INFO": 20,
+    "SUCCESS": 25,
+    "WARNING": 30,
+    "ERROR": 40,
+    "CRITICAL": 50,
+}
+
+# 日志文件名后缀，supervisor 为每个 agent 设置，使多个进程不会写入同一个日志文件
+LOG_NAME_ENV_KEY = "MAA_AGENT_LOG_NAME"
+
+# production 方案下当前使用的限流器
+_throttle = None
+
+# 是否输出 JSON Lines 格式的日志
+_json_log = False
+
+# 当前所有输出中最低的日志等级，低于该等级的日志会被全部丢弃
+_min_level_no = _LEVEL_NO["DEBUG"]
+
+# 日志配置方案，可通过环境变量 MAA_AGENT_LOG_PROFILE 选择
+# default:    文件记录 DEBUG 以上（用于排查问题），is_enabled("DEBUG") 因此始终为真；
+#             不需要 DEBUG 日志时设置 MAA_AGENT_FILE_LOG_LEVEL=INFO 或使用 production
+# production: 无人值守运行，文件默认只记录 INFO 以上，合并重复日志并按调用位置限流，
+#             带变量值的异常回溯只在每种异常第一次出现时写入 {date}.exceptions.log
+_PROFILES = {
+    "default": {
+        "file_level": "DEBUG",
+        "throttle": False,
+    },
+    "production": {
+        "file_level": "INFO",
+        "throttle": True,
+        "repeat_window": 60.0,  # 相同日志在该时间窗口内只输出一次（秒）
+        "site_rate": 20,  # 每个调用位置每秒最多输出的日志条数
+    },
+}
+
+
+class LogThrottle:
+    """合并重复日志并按调用位置限流，供 loguru patcher 和 filter 使用"""
+
+    # 最多跟踪的不同日志条数，超过后新的日志不再参与合并，直到定期清理释放空间
+    max_entries = 10000
+
+    def __init__(self, repeat_window=60.0, site_rate=20):
+        self.repeat_window = repeat_window
+        self.site_rate = site_rate
+        self._lock = threading.Lock()
+        # (位置, 等级, 消息) -> [窗口开始时间, 窗口内被合并的次数]
+        self._repeats = {}
+        # 位置 -> [当前秒, 当前秒已输出条数, 被限流丢弃的条数]
+        self._sites = {}
+        self._seen_exceptions = set()
+        self._emit = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def patch(self, record):
+        if record["extra"].get("_throttle_summary") or record["extra"].get("_sink"):
+            # flush 输出的汇总，以及 log_duration 的耗时记录不参与合并和限流
+            return
+
+        site = (record["name"], record["function"], record["line"])
+        key = (site, record["level"].name, record["message"])
+        now = time.monotonic()
+        notes = []
+        suppressed = False
+
+        with self._lock:
+            repeat = self._repeats.get(key)
+            if repeat is not None and now - repeat[0] < self.repeat_window:
+                repeat[1] += 1
+                suppressed = True
+            else:
+                if repeat is not None and repeat[1]:
+                    notes.append(f"过去 {now - repeat[0]:.0f}s 内重复 {repeat[1]} 次")
+                if repeat is not None or len(self._repeats) < self.max_entries:
+                    self._repeats[key] = [now, 0]
+
+            if not suppressed:
+                second = int(now)
+                counter = self._sites.get(site)
+                if counter is None or counter[0] != second:
+                    dropped = counter[2] if counter is not None else 0
+                    counter = self._sites[site] = [second, 0, dropped]
+                if counter[1] >= self.site_rate:
+                    counter[2] += 1
+                    suppressed = True
+                else:
+                    counter[1] += 1
+                    if counter[2]:
+                        notes.append(f"该位置已限流丢弃 {counter[2]} 条")
+                        counter[2] = 0
+
+            exception = record["exception"]
+            if not suppressed and exception is not None:
+                exception_key = (site, exception.type)
+                if exception_key not in self._seen_exceptions:
+                    self._seen_exceptions.add(exception_key)
+                    record["extra"]["_first_exception"] = True
+
+        record["extra"]["_suppressed"] = suppressed
+        if notes:
+            record["message"] += f"（{'，'.join(notes)}）"
+
+    def flush(self, force=False) -> list:
+        """
+        清理已过期的记录，返回其中尚未输出的汇总 [(等级, 消息)]。
+        否则相同日志不再出现时，重复次数和限流丢弃的条数永远不会被输出。
+        force 为 True 时（关闭时）不论是否过期全部输出。
+        """
+        now = time.monotonic()
+        second = int(now)
+        summaries = []
+        with self._lock:
+            for key, (start, count) in list(self._repeats.items()):
+                if not force and now - start < self.repeat_window:
+                    continue
+                del self._repeats[key]
+                if count:
+                    (name, function, line), level, message = key
+                    summaries.append(
+                        (
+                            level,
+                            f"{name}:{function}:{line} | {message}"
+                            f"（过去 {now - start:.0f}s 内重复 {count} 次）",
+                        )
+                    )
+            for site, (site_second, _, dropped) in list(self._sites.items()):
+                if not force and site_second == second:
+                    continue
+                del self._sites[site]
+                if dropped:
+                    name, function, line = site
+                    summaries.append(
+                        ("WARNING", f"{name}:{function}:{line} | 已限流丢弃 {dropped} 条")
+                    )
+        return summaries
+
+    def start(self, emit):
+        """启动定期清理线程，emit(等级, 消息) 用于输出汇总"""
+        self._emit = emit
+        self._thread = threading.Thread(
+            target=self._run, name="log-throttle", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(self.repeat_window):
+            self._emit_summaries(self.flush())
+
+    def stop(self):
+        """停止清理线程并输出所有未输出的汇总"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._emit_summaries(self.flush(force=True))
+
+    def _emit_summaries(self, summaries):
+        if self._emit is None:
+            return
+        for level, message in summaries:
+            self._emit(level, message)
+
+    @staticmethod
+    def filter(record):
+        return not record["extra"].get("_suppressed", False)
+
+    @staticmethod
+    def filter_first_exception(record):
+        return record["extra"].get("_first_exception", False)
+
 
 try:
     from loguru import logger as _logger
 
-    def setup_logger(log_dir="debug/custom", console_level="INFO"):
+    def _json_format(record):
+        """将日志记录格式化为一行 JSON"""
+        extra = record["extra"]
+        data = {
+            "time": record["time"].isoformat(timespec="milliseconds"),
+            "level": record["level"].name,
+            "module": record["name"],
+            "function": record["function"],
+            "line": record["line"],
+            "task_id": extra.get("task_id"),
+            "node": extra.get("node"),
+            "duration_ms": extra.get("duration_ms"),
+            "message": record["message"],
+        }
+        if record["exception"] is not None:
+            data["exception"] = "".join(
+                traceback.format_exception(*record["exception"])
+            )
+        extra["_json"] = json.dumps(data, ensure_ascii=False, default=str)
+        return "{extra[_json]}\n"
+
+    def setup_logger(
+        log_dir="debug/custom",
+        console_level="INFO",
+        json_log=None,
+        file_level=None,
+        profile=None,
+    ):
         """设置 loguru logger
 
         Args:
             log_dir: 日志文件目录
             console_level: 控制台输出等级 (DEBUG, INFO, WARNING, ERROR)
+            json_log: 是否额外输出 JSON Lines 格式的日志，默认读取环境变量 MAA_AGENT_JSON_LOG
+            file_level: 日志文件等级，默认读取环境变量 MAA_AGENT_FILE_LOG_LEVEL，
+                未设置时由 profile 决定
+            profile: 日志配置方案 (default, production)，默认读取环境变量 MAA_AGENT_LOG_PROFILE
         """
+        global _min_level_no, _throttle, _json_log
+
+        if profile is None:
+            profile = os.environ.get("MAA_AGENT_LOG_PROFILE", "default")
+        profile_config = _PROFILES.get(profile, _PROFILES["default"])
+        if json_log is None:
+            json_log = os.environ.get("MAA_AGENT_JSON_LOG", "") not in ("", "0")
+        if file_level is None:
+            file_level = os.environ.get(
+                "MAA_AGENT_FILE_LOG_LEVEL", profile_config["file_level"]
+            ).upper()
+
+        log_name = re.sub(r"[^\w.-]", "_", os.environ.get(LOG_NAME_ENV_KEY, ""))
+        file_stem = f"{log_dir}/{{time:YYYY-MM-DD}}"
+        if log_name:
+            file_stem += f".{log_name}"
+
+        # 重新配置前先输出旧的限流器中未输出的汇总
+        flush_log_throttle()
+
         os.makedirs(log_dir, exist_ok=True)
         _logger.remove()
 
+        if profile_config["throttle"]:
+            throttle = LogThrottle(
+                profile_config["repeat_window"], profile_config["site_rate"]
+            )
+            _logger.configure(patcher=throttle.patch)
+            log_filter = throttle.filter
+            throttle.start(_emit_throttle_summary)
+            _throttle = throttle
+        else:
+            throttle = None
+            _logger.configure(patcher=None)
+            log_filter = None
+
+        def sink_filter(sink):
+            """extra 中 _sink 指定了其它输出的日志（见 log_duration）不写入该输出"""
+
+            def filter(record):
+                target = record["extra"].get("_sink")
+                if target is not None and target != sink:
+                    return False
+                return log_filter is None or log_filter(record)
+
+            return filter
+
         _logger.add(
             sys.stderr,
             format="[<level>{level}</level>] <level>{message}</level>",
             colorize=True,
             level=console_level,
+            backtrace=throttle is None,
+            diagnose=throttle is None,
+            filter=sink_filter("text"),
         )
         _logger.add(
-            f"{log_dir}/{{time:YYYY-MM-DD}}.log",
+            f"{file_stem}.log",
             rotation="00:00",  # midnight
             retention="2 weeks",
             compression="zip",
-            level="DEBUG",
+            level=file_level,
             format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} | {message}",
             encoding="utf-8",
             enqueue=True,
-            backtrace=True,  # 包含完整的异常回溯信息
-            diagnose=True,  # 包含变量值信息
+            backtrace=throttle is None,  # 包含完整的异常回溯信息
+            diagnose=throttle is None,  # 包含变量值信息
+            filter=sink_filter("text"),
+        )
+        if throttle is not None:
+            # 每种异常第一次出现时，单独记录带变量值的完整回溯
+            _logger.add(
+                f"{file_stem}.exceptions.log",
+                rotation="00:00",
+                retention="2 weeks",
+                compression="zip",
+                level="ERROR",
+                format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} | {message}",
+                encoding="utf-8",
+                enqueue=True,
+                backtrace=True,
+                diagnose=True,
+                filter=throttle.filter_first_exception,
+            )
+        if json_log:
+            # 结构化日志，便于工具按行解析，task_id/node/duration_ms 来自 bind 或 contextualize
+            _logger.add(
+                f"{file_stem}.jsonl",
+                rotation="00:00",
+                retention="2 weeks",
+                compression="zip",
+                level=file_level,
+                format=_json_format,
+                encoding="utf-8",
+                enqueue=True,
+                filter=sink_filter("json"),
+            )
+
+        _json_log = json_log
+        _min_level_no = min(
+            _LEVEL_NO.get(console_level, 0), _LEVEL_NO.get(file_level, 0)
         )
         return _logger
 
+    def _emit_throttle_summary(level, message):
+        _logger.bind(_throttle_summary=True).log(level, message)
+
+    def flush_log_throttle():
+        """停止当前的限流器并输出未输出的重复次数和限流丢弃条数，退出时自动调用"""
+        global _throttle
+
+        throttle, _throttle = _throttle, None
+        if throttle is not None:
+            throttle.stop()
+
+    atexit.register(flush_log_throttle)
+
     def change_console_level(level="DEBUG"):
         """动态修改控制台日志等级"""
         setup_logger(console_level=level)
         _logger.info(f"控制台日志等级已更改为: {level}")
 
+    def log_context(**fields):
+        """在上下文内的所有日志中附加字段，如 task_id、node"""
+        return _logger.contextualize(**fields)
+
+    def log_duration(message, duration_ms):
+        """
+        记录一次耗时，duration_ms 写入 JSON 日志的同名字段。
+        开启 JSON 日志时总是以 INFO 写入 JSON 日志，控制台和文本日志只在 DEBUG 启用时记录
+        """
+        if _json_log:
+            _logger.bind(duration_ms=duration_ms, _sink="json").opt(depth=1).info(
+                message
+            )
+        if is_enabled("DEBUG"):
+            sink = "text" if _json_log else None
+            _logger.bind(duration_ms=duration_ms, _sink=sink).opt(depth=1).debug(
+                message
+            )
+
+    def is_enabled(level="DEBUG") -> bool:
+        """
+        判断该等级的日志是否会被任一输出记录。
+        热点路径中构造开销较大的日志前先调用，避免格式化最终被丢弃的字符串:
+
+            if is_enabled("DEBUG"):
+                logger.debug(f"...")
+        """
+        return _LEVEL_NO.get(level, 0) >= _min_level_no
+
     logger = setup_logger()
 except ImportError:
     import logging
@@ -47,3 +386,15 @@ except ImportError:
         format="%(asctime)s | %(levelname)s | %(message)s", level=logging.INFO
     )
     logger = logging
+
+    def log_context(**fields):
+        return nullcontext()
+
+    def flush_log_throttle():
+        pass
+
+    def is_enabled(level="DEBUG") -> bool:
+        return logging.getLogger().isEnabledFor(_LEVEL_NO.get(level, 0))
+
+    def log_duration(message, duration_ms):
+        logging.debug(message)
@@ -0,0 +1,317 @@
+"""
+长时间运行时的内存分析
+
+MemoryProfiler（MAA_AGENT_MEMPROF=1 开启）:
+    使用 tracemalloc 定期拍摄快照，与上一次快照对比，
+    输出增长最多的分配位置，并按 custom 类名 / 第三方包归类，
+    同时记录各 custom 类中容器类属性（如 Count.record）的长度，
+    每次的报告追加写入 debug/memprof/{pid}.jsonl。
+    tracemalloc 会使分配变慢，仅在排查问题时开启。
+
+RssWatchdog（设置 MAA_AGENT_RSS_LIMIT_MB 开启）:
+    定期检查进程 RSS，超过上限时记录警告；
+    MAA_AGENT_RSS_ACTION=restart 时调用 on_exceed 回调，由 main 优雅关闭并以
+    RESTART_EXIT_CODE 退出，交给 supervisor 重新启动。
+"""
+
+import gc
+import os
+import sys
+import json
+import time
+import inspect
+import threading
+import linecache
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Optional
+
+from .logger import logger
+
+MEMPROF_ENV_KEY = "MAA_AGENT_MEMPROF"
+MEMPROF_INTERVAL_ENV_KEY = "MAA_AGENT_MEMPROF_INTERVAL"
+MEMPROF_FRAMES_ENV_KEY = "MAA_AGENT_MEMPROF_FRAMES"
+RSS_LIMIT_ENV_KEY = "MAA_AGENT_RSS_LIMIT_MB"
+RSS_ACTION_ENV_KEY = "MAA_AGENT_RSS_ACTION"
+RSS_INTERVAL_ENV_KEY = "MAA_AGENT_RSS_INTERVAL"
+
+DEFAULT_REPORT_DIR = "debug/memprof"
+
+# 快照中忽略的分配位置
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def get_rss() -> Optional[int]:
+    """当前进程的常驻内存（字节），无法获取时返回 None"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+def _custom_class_ranges() -> dict:
+    """已导入的 custom 模块中各个类的源码范围，文件名 -> [(起始行, 结束行, 类名)]"""
+    ranges = defaultdict(list)
+    for module_name, module in list(sys.modules.items()):
+        if not module_name.startswith("custom.") or module is None:
+            continue
+        for name, cls in vars(module).items():
+            if not inspect.isclass(cls) or cls.__module__ != module_name:
+                continue
+            try:
+                lines, start = inspect.getsourcelines(cls)
+                filename = inspect.getsourcefile(cls)
+            except (OSError, TypeError):
+                continue
+            ranges[filename].append((start, start + len(lines) - 1, name))
+    return ranges
+
+
+def _custom_containers() -> dict:
+    """custom 类中容器类属性的长度，如 {"Count.record": 12}"""
+    sizes = {}
+    for module_name, module in list(sys.modules.items()):
+        if not module_name.startswith("custom.") or module is None:
+            continue
+        for name, cls in vars(module).items():
+            if not inspect.isclass(cls) or cls.__module__ != module_name:
+                continue
+            for attr, value in vars(cls).items():
+                if not attr.startswith("__") and isinstance(value, (dict, list, set)):
+                    sizes[f"{name}.{attr}"] = len(value)
+    return sizes
+
+
+def _package_of(filename: str) -> str:
+    """根据文件路径推断所属的第三方包"""
+    parts = Path(filename).parts
+    for marker in ("site-packages", "dist-packages"):
+        if marker in parts:
+            index = parts.index(marker)
+            if index + 1 < len(parts):
+                return parts[index + 1].split(".")[0]
+    return Path(filename).stem
+
+
+class MemoryProfiler:
+    def __init__(self, interval=600.0, frames=10, top=20, report_dir=None):
+        self.interval = interval
+        self.frames = frames
+        self.top = top
+        report_dir = Path(report_dir or DEFAULT_REPORT_DIR)
+        self.report_path = report_dir / f"{os.getpid()}.jsonl"
+        self._previous = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls) -> Optional["MemoryProfiler"]:
+        if os.environ.get(MEMPROF_ENV_KEY, "") in ("", "0"):
+            return None
+        return cls(
+            interval=float(os.environ.get(MEMPROF_INTERVAL_ENV_KEY, "600")),
+            frames=int(os.environ.get(MEMPROF_FRAMES_ENV_KEY, "10")),
+        )
+
+    def _owner(self, traceback, class_ranges) -> str:
+        """从最近的调用帧开始，找到第一个属于 custom 类或第三方包的帧"""
+        package = None
+        for frame in reversed(traceback):
+            for start, end, name in class_ranges.get(frame.filename, ()):
+                if start <= frame.lineno <= end:
+                    return name
+            if package is None and (
+                "site-packages" in frame.filename or "dist-packages" in frame.filename
+            ):
+                package = _package_of(frame.filename)
+        return package or _package_of(traceback[-1].filename)
+
+    def snapshot(self) -> dict:
+        """拍摄快照并与上一次对比，返回报告"""
+        # 先回收循环引用，快照中只保留仍然存活的对象
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+        class_ranges = _custom_class_ranges()
+
+        owners = defaultdict(lambda: [0, 0])
+        for stat in snapshot.statistics("traceback"):
+            owner = owners[self._owner(stat.traceback, class_ranges)]
+            owner[0] += stat.size
+            owner[1] += stat.count
+
+        report = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+            "pid": os.getpid(),
+            "rss": get_rss(),
+            "traced": current,
+            "traced_peak": peak,
+            "owners": {
+                name: {"size": size, "count": count}
+                for name, (size, count) in sorted(
+                    owners.items(), key=lambda item: -item[1][0]
+                )[: self.top]
+            },
+            "containers": _custom_containers(),
+            "growth": [],
+        }
+
+        if self._previous is not None:
+            for diff in snapshot.compare_to(self._previous, "lineno")[: self.top]:
+                if diff.size_diff <= 0:
+                    continue
+                frame = diff.traceback[-1]
+                report["growth"].append(
+                    {
+                        "site": f"{frame.filename}:{frame.lineno}",
+                        "size_diff": diff.size_diff,
+                        "count_diff": diff.count_diff,
+                        "size": diff.size,
+                    }
+                )
+        self._previous = snapshot
+        return report
+
+    def _write(self, report: dict):
+        try:
+            self.report_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.report_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(report, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"写入内存分析报告失败: {e}")
+
+    def run_once(self) -> dict:
+        report = self.snapshot()
+        self._write(report)
+        top_owners = ", ".join(
+            f"{name} {info['size'] / 1024 / 1024:.1f}MB"
+            for name, info in list(report["owners"].items())[:5]
+        )
+        logger.info(
+            f"[memprof] 追踪内存 {report['traced'] / 1024 / 1024:.1f}MB，"
+            f"RSS {(report['rss'] or 0) / 1024 / 1024:.1f}MB，主要来源: {top_owners}"
+        )
+        for growth in report["growth"][:5]:
+            logger.info(
+                f"[memprof] 增长 {growth['size_diff'] / 1024:+.1f}KB "
+                f"({growth['count_diff']:+d} 个对象): {growth['site']}"
+            )
+        return report
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("内存分析失败")
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._thread = threading.Thread(
+            target=self._loop, name="memprof", daemon=True
+        )
+        self._thread.start()
+        logger.info(
+            f"已开启内存分析，间隔 {self.interval}s，报告写入 {self.report_path}"
+        )
+
+    def stop(self):
+        """写入最后一次报告并停止追踪"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self.run_once()
+        tracemalloc.stop()
+        self._thread = None
+
+
+class RssWatchdog:
+    """
+    Args:
+        limit_mb: RSS 上限（MB）
+        action: log 只记录警告；restart 调用 on_exceed
+        on_exceed: 超过上限时的回调，只会调用一次
+    """
+
+    def __init__(
+        self,
+        limit_mb: float,
+        action: str = "log",
+        interval: float = 30.0,
+        on_exceed: Optional[Callable[[int], None]] = None,
+    ):
+        self.limit = int(limit_mb * 1024 * 1024)
+        self.action = action
+        self.interval = interval
+        self.on_exceed = on_exceed
+        self.triggered = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, on_exceed=None) -> Optional["RssWatchdog"]:
+        limit = os.environ.get(RSS_LIMIT_ENV_KEY)
+        if not limit:
+            return None
+        return cls(
+            float(limit),
+            os.environ.get(RSS_ACTION_ENV_KEY, "log"),
+            float(os.environ.get(RSS_INTERVAL_ENV_KEY, "30")),
+            on_exceed,
+        )
+
+    def check(self) -> bool:
+        rss = get_rss()
+        if rss is None or rss <= self.limit:
+            return False
+
+        logger.warning(
+            f"RSS {rss / 1024 / 1024:.1f}MB 超过上限 {self.limit / 1024 / 1024:.0f}MB"
+        )
+        if self.action == "restart" and not self.triggered:
+            self.triggered = True
+            if self.on_exceed is not None:
+                logger.warning("内存超限，准备重启 agent")
+                self.on_exceed(rss)
+        return True
+
+    def _loop(self):
+        last_warning = 0.0
+        while not self._stop.wait(self.interval):
+            rss = get_rss()
+            if rss is None or rss <= self.limit:
+                continue
+            # 只记录日志时，每 10 分钟最多警告一次
+            if self.action == "restart" or time.monotonic() - last_warning >= 600:
+                last_warning = time.monotonic()
+                self.check()
+
+    def start(self):
+        if get_rss() is None:
+            logger.warning("无法获取进程 RSS，内存看门狗未启动")
+            return
+        self._thread = threading.Thread(
+            target=self._loop, name="rss-watchdog", daemon=True
+        )
+        self._thread.start()
+        logger.info(
+            f"已开启内存看门狗，上限 {self.limit / 1024 / 1024:.0f}MB，超限时: {self.action}"
+        )
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,250 @@
+"""
+Prometheus 格式的指标导出
+
+    MAA_AGENT_METRICS_FILE=/path/to/maa.prom   定期写入文本文件（供 node_exporter textfile collector 采集）
+    MAA_AGENT_METRICS_INTERVAL=15              文本文件写入间隔（秒）
+    MAA_AGENT_METRICS_PORT=9464                在 127.0.0.1 上提供 http://127.0.0.1:端口/metrics
+
+由 supervisor 启动时，文件名加上 worker 名称（如 maa.device-0.prom），端口按 worker 序号递增。
+
+指标在导出线程中按需收集，只读取 utils.stats 等已有的统计，不会阻塞识别线程。
+其它模块可通过 register_collector 注册自己的指标，如 Count 的计数值。
+"""
+
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .logger import logger
+from .stats import stats
+
+METRICS_FILE_ENV_KEY = "MAA_AGENT_METRICS_FILE"
+METRICS_INTERVAL_ENV_KEY = "MAA_AGENT_METRICS_INTERVAL"
+METRICS_PORT_ENV_KEY = "MAA_AGENT_METRICS_PORT"
+
+PREFIX = "maa_agent_"
+_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Dict[str, str]
+Sample = Tuple[str, Labels, float]
+
+
+class MetricFamily:
+    def __init__(self, name: str, metric_type: str, help_text: str):
+        self.name = PREFIX + name
+        self.type = metric_type
+        self.help = help_text
+        self.samples: List[Sample] = []
+
+    def add(self, value: float, suffix: str = "", **labels):
+        self.samples.append((self.name + suffix, labels, value))
+        return self
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render(families: Iterable[MetricFamily], const_labels: Labels = None) -> str:
+    """渲染为 Prometheus 文本格式"""
+    lines = []
+    for family in families:
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.type}")
+        for name, labels, value in family.samples:
+            labels = {**(const_labels or {}), **labels}
+            if labels:
+                label_text = ",".join(
+                    f'{key}="{_escape(value)}"' for key, value in labels.items()
+                )
+                lines.append(f"{name}{{{label_text}}} {value}")
+            else:
+                lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# 名称 -> 返回 MetricFamily 列表的函数，同名重复注册时覆盖（便于热重载）
+_collectors: Dict[str, Callable[[], List[MetricFamily]]] = {}
+
+
+def register_collector(name: str, collector: Callable[[], List[MetricFamily]]):
+    _collectors[name] = collector
+
+
+_QUANTILES = (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms"))
+
+
+def _collect_custom_stats() -> List[MetricFamily]:
+    calls = MetricFamily("custom_calls_total", "counter", "custom 调用次数")
+    latency = MetricFamily("custom_latency_seconds", "summary", "custom 调用耗时")
+    inner = MetricFamily(
+        "custom_run_recognition_seconds_total",
+        "counter",
+        "custom 调用中在 context.run_recognition 内的总耗时",
+    )
+    for name, summary in stats.summary().items():
+        kind = summary["kind"]
+        calls.add(summary["hits"], name=name, kind=kind, outcome="hit")
+        calls.add(summary["misses"], name=name, kind=kind, outcome="miss")
+        calls.add(summary["errors"], name=name, kind=kind, outcome="error")
+
+        total = summary["latency"]
+        if total["count"]:
+            for quantile, key in _QUANTILES:
+                latency.add(total[key] / 1000, name=name, quantile=quantile)
+        latency.add(total.get("sum_ms", 0) / 1000, "_sum", name=name)
+        latency.add(total["count"], "_count", name=name)
+        inner.add(summary["run_recognition"].get("sum_ms", 0) / 1000, name=name)
+    return [calls, latency, inner]
+
+
+def _read_cpu_seconds() -> float:
+    times = os.times()
+    return times.user + times.system
+
+
+def _collect_process() -> List[MetricFamily]:
+    from .memprof import get_rss
+
+    families = [
+        MetricFamily("process_cpu_seconds_total", "counter", "进程 CPU 时间").add(
+            round(_read_cpu_seconds(), 3)
+        ),
+        MetricFamily("process_threads", "gauge", "进程线程数").add(
+            threading.active_count()
+        ),
+        MetricFamily("process_start_time_seconds", "gauge", "进程启动时间").add(
+            round(stats.started_at, 3)
+        ),
+    ]
+    rss = get_rss()
+    if rss is not None:
+        families.append(
+            MetricFamily("process_resident_memory_bytes", "gauge", "进程 RSS").add(rss)
+        )
+    return families
+
+
+register_collector("custom_stats", _collect_custom_stats)
+register_collector("process", _collect_process)
+
+
+def collect() -> List[MetricFamily]:
+    families = []
+    for name, collector in list(_collectors.items()):
+        try:
+            families.extend(collector())
+        except Exception as e:
+            logger.debug(f"收集指标 {name} 失败: {e}")
+    return families
+
+
+class MetricsExporter:
+    def __init__(
+        self,
+        const_labels: Labels = None,
+        textfile: Optional[str] = None,
+        interval: float = 15.0,
+        port: Optional[int] = None,
+    ):
+        self.const_labels = const_labels or {}
+        self.textfile = textfile
+        self.interval = interval
+        self.port = port
+        self._stop = threading.Event()
+        self._threads = []
+        self._server = None
+
+    @classmethod
+    def from_env(cls, const_labels: Labels = None) -> Optional["MetricsExporter"]:
+        textfile = os.environ.get(METRICS_FILE_ENV_KEY) or None
+        port = os.environ.get(METRICS_PORT_ENV_KEY) or None
+        if port is not None:
+            try:
+                port = int(port)
+            except ValueError:
+                logger.warning(f"{METRICS_PORT_ENV_KEY} 无效: {port}，不启动 HTTP 导出")
+                port = None
+        if textfile is None and port is None:
+            return None
+        return cls(
+            const_labels,
+            textfile,
+            float(os.environ.get(METRICS_INTERVAL_ENV_KEY, "15")),
+            port,
+        )
+
+    def render(self) -> str:
+        return render(collect(), self.const_labels)
+
+    def write_textfile(self):
+        # 先写临时文件再替换，避免采集到写了一半的文件
+        tmp_path = f"{self.textfile}.{os.getpid()}.tmp"
+        try:
+            directory = os.path.dirname(self.textfile)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(tmp_path, self.textfile)
+        except OSError as e:
+            logger.warning(f"写入指标文件失败: {e}")
+
+    def _textfile_loop(self):
+        while True:
+            self.write_textfile()
+            if self._stop.wait(self.interval):
+                break
+
+    def _start_http(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", _CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        # 只监听本机地址
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics-http", daemon=True
+        )
+        thread.start()
+        self._threads.append(thread)
+        logger.info(f"指标地址: http://127.0.0.1:{self._server.server_port}/metrics")
+
+    def start(self):
+        if self.textfile:
+            thread = threading.Thread(
+                target=self._textfile_loop, name="metrics-textfile", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+            logger.info(f"指标每 {self.interval}s 写入 {self.textfile}")
+        if self.port is not None:
+            try:
+                self._start_http()
+            except OSError as e:
+                logger.warning(f"无法在端口 {self.port} 上提供指标: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.textfile:
+            # 关闭前写入最终值
+            self.write_textfile()
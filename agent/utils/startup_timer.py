@@ -0,0 +1,92 @@
+import os
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class StartupTimer:
+    """
+    记录 agent 启动各阶段耗时。
+
+    通过虚拟环境重新启动时，已记录的阶段经环境变量传递给新进程，
+    最终由新进程统一输出完整的启动耗时。
+    """
+
+    ENV_KEY = "MAA_AGENT_STARTUP_TIMING"
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.phases = []
+        self._load_inherited()
+
+    def _load_inherited(self):
+        """读取重新启动前的进程传递过来的阶段记录"""
+        inherited = os.environ.pop(self.ENV_KEY, None)
+        if not inherited:
+            return
+        try:
+            data = json.loads(inherited)
+        except ValueError:
+            return
+
+        self.started_at = data.get("started_at", self.started_at)
+        self.phases = data.get("phases", [])
+
+        # 重新启动前未结束的阶段，在新进程中结束
+        pending = data.get("pending")
+        if pending:
+            self._add(pending["name"], time.time() - pending["start"])
+
+    def _add(self, name: str, seconds: float):
+        self.phases.append(
+            {
+                "name": name,
+                "ms": round(seconds * 1000, 3),
+                "pid": os.getpid(),
+                "start": round(time.time() - seconds, 6),
+            }
+        )
+
+    @contextmanager
+    def phase(self, name: str):
+        """记录一个阶段的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - start)
+
+    def export_env(self, pending: str = None):
+        """
+        将已记录的阶段写入环境变量，供重新启动后的进程继承。
+
+        Args:
+            pending: 跨越重新启动的阶段名称，在新进程创建计时器时结束
+        """
+        data = {"started_at": self.started_at, "phases": self.phases}
+        if pending:
+            data["pending"] = {"name": pending, "start": time.time()}
+        os.environ[self.ENV_KEY] = json.dumps(data)
+
+    def total_ms(self) -> float:
+        return round((time.time() - self.started_at) * 1000, 3)
+
+    def summary(self) -> str:
+        parts = [f"{phase['name']} {phase['ms']:.1f}ms" for phase in self.phases]
+        return f"启动耗时 {self.total_ms():.1f}ms: " + " | ".join(parts)
+
+    def dump(self, path, **extra):
+        """以 JSON Lines 格式追加写入本次启动的耗时记录"""
+        record = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+            "pid": os.getpid(),
+            "total_ms": self.total_ms(),
+            "phases": self.phases,
+            **extra,
+        }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
@@ -0,0 +1,222 @@
+import os
+import json
+import math
+import time
+import threading
+from pathlib import Path
+
+from .logger import logger
+
+# 每个 2 的幂区间再均分的桶数，相对误差约 1 / _SUB_BUCKETS
+_SUB_BUCKETS = 16
+
+
+class LatencyHistogram:
+    """
+    HDR 风格的对数分桶延迟直方图（单位微秒）
+
+    每个 2 的幂区间均分为 16 个桶，记录为 O(1)，
+    分位数的相对误差约 6%，内存占用与样本数无关。
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    @staticmethod
+    def _bucket(value_us: float) -> int:
+        if value_us < 1:
+            return 0
+        exponent = int(value_us).bit_length() - 1
+        sub = int((value_us / (1 << exponent) - 1) * _SUB_BUCKETS)
+        return 1 + exponent * _SUB_BUCKETS + sub
+
+    @staticmethod
+    def _bucket_upper(bucket: int) -> float:
+        if bucket == 0:
+            return 1.0
+        exponent, sub = divmod(bucket - 1, _SUB_BUCKETS)
+        return (1 << exponent) * (1 + (sub + 1) / _SUB_BUCKETS)
+
+    def record(self, value_us: float):
+        bucket = self._bucket(value_us)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value_us
+        if value_us < self.min:
+            self.min = value_us
+        if value_us > self.max:
+            self.max = value_us
+
+    def percentile(self, percent: float) -> float:
+        if not self.count:
+            return 0.0
+        threshold = self.count * percent / 100
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= threshold:
+                return min(self._bucket_upper(bucket), self.max)
+        return self.max
+
+    def copy(self) -> "LatencyHistogram":
+        histogram = LatencyHistogram()
+        histogram.counts = dict(self.counts)
+        histogram.count = self.count
+        histogram.total = self.total
+        histogram.min = self.min
+        histogram.max = self.max
+        return histogram
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {"count": 0, "sum_ms": 0.0}
+        return {
+            "count": self.count,
+            "sum_ms": round(self.total / 1000, 3),
+            "mean_ms": round(self.total / self.count / 1000, 3),
+            "min_ms": round(self.min / 1000, 3),
+            "p50_ms": round(self.percentile(50) / 1000, 3),
+            "p95_ms": round(self.percentile(95) / 1000, 3),
+            "p99_ms": round(self.percentile(99) / 1000, 3),
+            "max_ms": round(self.max / 1000, 3),
+        }
+
+
+class CustomStats:
+    """单个 custom 的调用统计"""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.calls = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        # 整体耗时、其中在 context.run_recognition 中的耗时，以及剩余的自身 Python 耗时
+        self.total = LatencyHistogram()
+        self.inner = LatencyHistogram()
+        self.own = LatencyHistogram()
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, inner_seconds: float, hit: bool, error: bool):
+        total_us = seconds * 1e6
+        inner_us = inner_seconds * 1e6
+        with self._lock:
+            self.calls += 1
+            if error:
+                self.errors += 1
+            elif hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.total.record(total_us)
+            self.inner.record(inner_us)
+            self.own.record(max(total_us - inner_us, 0.0))
+
+    def summary(self) -> dict:
+        # 只在锁内复制数据，计算分位数时不阻塞正在记录的识别线程
+        with self._lock:
+            counters = (self.calls, self.hits, self.misses, self.errors)
+            total, inner, own = self.total.copy(), self.inner.copy(), self.own.copy()
+        calls, hits, misses, errors = counters
+        return {
+            "kind": self.kind,
+            "calls": calls,
+            "hits": hits,
+            "misses": misses,
+            "errors": errors,
+            "latency": total.summary(),
+            "run_recognition": inner.summary(),
+            "own": own.summary(),
+        }
+
+
+class StatsRegistry:
+    def __init__(self):
+        self.enabled = os.environ.get("MAA_AGENT_STATS", "1") != "0"
+        self.started_at = time.time()
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._dump_thread = None
+        self._stop = threading.Event()
+
+    def get(self, name: str, kind: str) -> CustomStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.get(name)
+                if stats is None:
+                    stats = self._stats[name] = CustomStats(name, kind)
+        return stats
+
+    def record(
+        self,
+        name: str,
+        kind: str,
+        seconds: float,
+        inner_seconds: float = 0.0,
+        hit: bool = True,
+        error: bool = False,
+    ):
+        self.get(name, kind).record(seconds, inner_seconds, hit, error)
+
+    def summary(self) -> dict:
+        with self._lock:
+            items = list(self._stats.items())
+        return {name: stats.summary() for name, stats in sorted(items)}
+
+    def log_summary(self):
+        for name, summary in self.summary().items():
+            latency = summary["latency"]
+            if not summary["calls"]:
+                continue
+            logger.info(
+                f"[stats] {name}: 调用 {summary['calls']} 次，命中 {summary['hits']}，"
+                f"未命中 {summary['misses']}，异常 {summary['errors']}，"
+                f"p50 {latency['p50_ms']}ms / p95 {latency['p95_ms']}ms / p99 {latency['p99_ms']}ms，"
+                f"run_recognition 平均 {summary['run_recognition'].get('mean_ms', 0)}ms"
+            )
+
+    def dump(self, path):
+        """输出统计摘要到日志，并写入 JSON 文件"""
+        self.log_summary()
+        data = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started_at, 1),
+            "customs": self.summary(),
+        }
+        path = Path(path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"写入 custom 统计失败: {e}")
+
+    def start_periodic_dump(self, path, interval: float):
+        """在后台线程中定期输出统计摘要"""
+        if interval <= 0 or self._dump_thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                self.dump(path)
+
+        self._dump_thread = threading.Thread(
+            target=run, name="custom-stats-dump", daemon=True
+        )
+        self._dump_thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+# 全局统计，由 custom registry 记录
+stats = StatsRegistry()
@@ -1,5 +1,5 @@
-from datetime import datetime, timedelta
-import pytz
+import threading
+from datetime import datetime, timedelta, time as dt_time
 
 
 def ms_timestamp_diff_to_dhm(timestamp1_ms, timestamp2_ms):
@@ -30,65 +30,139 @@ def ms_timestamp_diff_to_dhm(timestamp1_ms, timestamp2_ms):
     return f"{days}天-{hours}时-{minutes}分"
 
 
-def is_current_period(timestamp_ms, timezone="Asia/Shanghai"):
-    """
-    判断毫秒级时间戳是否在当前周和当前月
+# 服务器区域对应的时区
+SERVER_TIMEZONES = {
+    "official": "Asia/Shanghai",
+    "bilibili": "Asia/Shanghai",
+}
 
-    参数:
-        timestamp_ms: 毫秒级时间戳
-        timezone: 时区字符串，默认为"Asia/Shanghai"（北京时间）
+# 每日/每周/每月的重置时间（时）
+RESET_HOUR = 5
 
-    返回:
-        tuple: (is_current_week, is_current_month)
+
+class ResetCalendar:
     """
+    服务器重置周期日历
 
-    tz = pytz.timezone(timezone)
-    timestamp_datetime = datetime.fromtimestamp(timestamp_ms / 1000.0, tz)
-    now = datetime.now(tz)
+    每天 RESET_HOUR 点重置，每周从周一、每月从 1 号的 RESET_HOUR 点开始。
+    当前的日、周、月周期边界会缓存到下一次重置为止，
+    并支持对毫秒时间戳数组进行向量化判断。
+    """
 
-    # 计算当前周的开始（本周或上周一05:00:00）
-    # Python中，weekday()返回0-6，0是周一，6是周日
-    days_since_monday = now.weekday()  # 距离最近过去的周一的天数
+    def __init__(self, timezone="Asia/Shanghai", reset_hour=RESET_HOUR):
+        # pytz 体积较大，延迟到首次使用时导入
+        import pytz
 
-    # 计算到本周一的天数
-    week_start = now.replace(hour=5, minute=0, second=0, microsecond=0) - timedelta(
-        days=days_since_monday
-    )
+        self.tz = pytz.timezone(timezone)
+        self.reset_hour = reset_hour
+        # (日开始, 日结束, 周开始, 周结束, 月开始, 月结束)，单位毫秒
+        self._windows = None
 
-    # 如果当前时间早于周一5点，则使用上周一作为周期开始
-    if now.weekday() == 0 and now.hour < 5:  # 如果是周一且不到5点
-        week_start = week_start - timedelta(days=7)  # 使用上周一
+    def _boundary_ms(self, date) -> int:
+        local = self.tz.localize(datetime.combine(date, dt_time(self.reset_hour)))
+        return int(local.timestamp() * 1000)
 
-    # 计算下周一05:00:00作为本周结束
-    week_end = week_start + timedelta(days=7)
+    def _compute_windows(self, now_ms: int) -> tuple:
+        now = datetime.fromtimestamp(now_ms / 1000.0, self.tz)
+        # 重置时间之前仍属于前一天的周期
+        reset_date = (now - timedelta(hours=self.reset_hour)).date()
 
-    # 计算当前月的开始（当月1号05:00:00）
-    if now.day == 1 and now.hour < 5:
-        # 如果是1号但不到5点，使用上个月1号作为开始
-        if now.month == 1:
-            month_start = datetime(now.year - 1, 12, 1, 5, 0, 0, 0, tzinfo=tz)
+        week_date = reset_date - timedelta(days=reset_date.weekday())
+        month_date = reset_date.replace(day=1)
+        if month_date.month == 12:
+            next_month_date = month_date.replace(year=month_date.year + 1, month=1)
         else:
-            month_start = datetime(now.year, now.month - 1, 1, 5, 0, 0, 0, tzinfo=tz)
-    else:
-        # 否则使用本月1号
-        month_start = now.replace(day=1, hour=5, minute=0, second=0, microsecond=0)
-        # 如果已经过了1号5点，但当前日期小于1号，则需要往前调整一个月
-        if now.day < 1 or (now.day == 1 and now.hour < 5):
-            if month_start.month == 1:
-                month_start = month_start.replace(year=month_start.year - 1, month=12)
-            else:
-                month_start = month_start.replace(month=month_start.month - 1)
-
-    # 计算下个月1号05:00:00作为当月结束
-    if month_start.month == 12:
-        month_end = datetime(month_start.year + 1, 1, 1, 5, 0, 0, 0, tzinfo=tz)
-    else:
-        month_end = datetime(
-            month_start.year, month_start.month + 1, 1, 5, 0, 0, 0, tzinfo=tz
+            next_month_date = month_date.replace(month=month_date.month + 1)
+
+        return (
+            self._boundary_ms(reset_date),
+            self._boundary_ms(reset_date + timedelta(days=1)),
+            self._boundary_ms(week_date),
+            self._boundary_ms(week_date + timedelta(days=7)),
+            self._boundary_ms(month_date),
+            self._boundary_ms(next_month_date),
+        )
+
+    def windows(self, now_ms=None) -> tuple:
+        """
+        返回当前的周期边界 (日开始, 日结束, 周开始, 周结束, 月开始, 月结束)，单位毫秒。
+        只有跨过下一次重置时间才重新计算。
+        """
+        if now_ms is None:
+            now_ms = int(datetime.now().timestamp() * 1000)
+
+        windows = self._windows
+        if windows is None or not (windows[0] <= now_ms < windows[1]):
+            windows = self._compute_windows(now_ms)
+            self._windows = windows
+        return windows
+
+    def is_current_period(self, timestamp_ms, now_ms=None) -> tuple:
+        """判断单个毫秒时间戳是否在当前周和当前月，返回 (is_current_week, is_current_month)"""
+        _, _, week_start, week_end, month_start, month_end = self.windows(now_ms)
+        return (
+            week_start <= timestamp_ms < week_end,
+            month_start <= timestamp_ms < month_end,
+        )
+
+    def is_current_day(self, timestamp_ms, now_ms=None) -> bool:
+        day_start, day_end = self.windows(now_ms)[:2]
+        return day_start <= timestamp_ms < day_end
+
+    def classify(self, timestamps_ms, now_ms=None) -> tuple:
+        """
+        向量化判断毫秒时间戳数组是否在当前日、周、月
+
+        参数:
+            timestamps_ms: 毫秒时间戳的数组或序列
+
+        返回:
+            tuple: (is_current_day, is_current_week, is_current_month)，均为布尔数组
+        """
+        import numpy as np
+
+        timestamps = np.asarray(timestamps_ms, dtype=np.int64)
+        day_start, day_end, week_start, week_end, month_start, month_end = (
+            self.windows(now_ms)
+        )
+        return (
+            (timestamps >= day_start) & (timestamps < day_end),
+            (timestamps >= week_start) & (timestamps < week_end),
+            (timestamps >= month_start) & (timestamps < month_end),
         )
 
-    # 判断是否在当前周和当前月
-    is_current_week = week_start <= timestamp_datetime < week_end
-    is_current_month = month_start <= timestamp_datetime < month_end
 
-    return is_current_week, is_current_month
+_calendars = {}
+_calendars_lock = threading.Lock()
+
+
+def get_calendar(region="Asia/Shanghai", reset_hour=RESET_HOUR) -> ResetCalendar:
+    """
+    获取服务器区域或时区对应的重置日历（同一参数共用一个实例）
+
+    参数:
+        region: SERVER_TIMEZONES 中的服务器区域，或时区字符串
+    """
+    timezone = SERVER_TIMEZONES.get(region, region)
+    key = (timezone, reset_hour)
+    calendar = _calendars.get(key)
+    if calendar is None:
+        with _calendars_lock:
+            calendar = _calendars.get(key)
+            if calendar is None:
+                calendar = _calendars[key] = ResetCalendar(timezone, reset_hour)
+    return calendar
+
+
+def is_current_period(timestamp_ms, timezone="Asia/Shanghai"):
+    """
+    判断毫秒级时间戳是否在当前周和当前月
+
+    参数:
+        timestamp_ms: 毫秒级时间戳
+        timezone: 时区字符串，默认为"Asia/Shanghai"（北京时间）
+
+    返回:
+        tuple: (is_current_week, is_current_month)
+    """
+    return get_calendar(timezone).is_current_period(timestamp_ms)
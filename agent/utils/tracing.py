@@ -0,0 +1,205 @@
+"""
+Chrome / Perfetto trace-event 导出
+
+设置环境变量 MAA_AGENT_TRACE=1 后，agent 中的关键阶段以 Complete 事件（ph="X"）
+写入 debug/trace/{时间}_{pid}.json，可直接拖入 chrome://tracing 或 ui.perfetto.dev 查看。
+
+    from utils.tracing import tracer
+
+    with tracer.span("MultiRecognition", cat="recognition", node=node_name) as span:
+        ...
+        span.args["hit"] = True
+
+未开启时 span() 返回共享的空上下文，开销仅为一次属性判断。
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+
+TRACE_ENV_KEY = "MAA_AGENT_TRACE"
+TRACE_DIR_ENV_KEY = "MAA_AGENT_TRACE_DIR"
+DEFAULT_TRACE_DIR = "debug/trace"
+
+# 缓冲的事件数超过该值时立即写入文件，否则由后台线程定期写入
+_FLUSH_EVENTS = 2000
+_FLUSH_INTERVAL = 2.0
+
+
+class _NullSpan(nullcontext):
+    args = {}
+
+    def __enter__(self):
+        return self
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer._emit(
+            {
+                "name": self.name,
+                "cat": self.cat,
+                "ph": "X",
+                "ts": self.tracer._ts(self.start),
+                "dur": round((end - self.start) * 1e6, 3),
+                "pid": self.tracer.pid,
+                "tid": threading.get_native_id(),
+                "args": self.args,
+            }
+        )
+        return False
+
+
+class Tracer:
+    def __init__(self, path=None):
+        self.enabled = path is not None
+        self.path = Path(path) if path is not None else None
+        self.pid = os.getpid()
+        # perf_counter 与 Unix 时间的对应关系，使不同进程的事件落在同一时间轴上
+        self._origin_wall = time.time()
+        self._origin_perf = time.perf_counter()
+        self._events = []
+        self._named_threads = set()
+        self._lock = threading.Lock()
+        self._file = None
+        self._first = True
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        if os.environ.get(TRACE_ENV_KEY, "") in ("", "0"):
+            return cls()
+        trace_dir = Path(os.environ.get(TRACE_DIR_ENV_KEY) or DEFAULT_TRACE_DIR)
+        file_name = f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.json"
+        return cls(trace_dir / file_name)
+
+    def _ts(self, perf: float) -> float:
+        return round((self._origin_wall + perf - self._origin_perf) * 1e6, 3)
+
+    def span(self, name: str, cat: str = "agent", **args):
+        """记录一个耗时区间，args 会显示在事件详情中"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, cat, args)
+
+    def complete(
+        self,
+        name: str,
+        start: float,
+        seconds: float,
+        cat: str = "agent",
+        pid: int = None,
+        **args,
+    ):
+        """补录一个已结束的区间，start 为 Unix 时间（秒）"""
+        if not self.enabled:
+            return
+        self._emit(
+            {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": round(start * 1e6, 3),
+                "dur": round(seconds * 1e6, 3),
+                "pid": pid or self.pid,
+                "tid": pid or self.pid,
+                "args": args,
+            }
+        )
+
+    def _emit(self, event: dict):
+        with self._lock:
+            tid = event["tid"]
+            if tid not in self._named_threads:
+                self._named_threads.add(tid)
+                thread_name = (
+                    threading.current_thread().name
+                    if event["pid"] == self.pid
+                    else "startup"
+                )
+                self._events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": event["pid"],
+                        "tid": tid,
+                        "args": {"name": thread_name},
+                    }
+                )
+            self._events.append(event)
+            if self._thread is None:
+                # 第一次记录事件时才创建文件和写入线程
+                self._thread = threading.Thread(
+                    target=self._flush_loop, name="trace-writer", daemon=True
+                )
+                self._thread.start()
+            if len(self._events) < _FLUSH_EVENTS:
+                return
+            events, self._events = self._events, []
+        self._write(events)
+
+    def _write(self, events: list):
+        if not events:
+            return
+        lines = [json.dumps(e, ensure_ascii=False, default=str) for e in events]
+        with self._lock:
+            try:
+                if self._file is None:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    self._file = open(self.path, "w", encoding="utf-8")
+                    self._file.write("[\n")
+                if not self._first:
+                    self._file.write(",\n")
+                self._file.write(",\n".join(lines))
+                self._file.flush()
+                self._first = False
+            except OSError:
+                # 无法写入时关闭追踪，不影响 agent 运行
+                self.enabled = False
+
+    def _take_events(self) -> list:
+        with self._lock:
+            events, self._events = self._events, []
+        return events
+
+    def _flush_loop(self):
+        while not self._stop.wait(_FLUSH_INTERVAL):
+            self._write(self._take_events())
+
+    def close(self):
+        """写入剩余事件并补全 JSON 数组"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._write(self._take_events())
+        with self._lock:
+            if self._file is not None:
+                self._file.write("\n]\n")
+                self._file.close()
+                self._file = None
+        self.enabled = False
+
+
+tracer = Tracer.from_env()
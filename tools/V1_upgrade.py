@@ -1,6 +1,13 @@
-from math import e
 import os
+import sys
 import json
+import difflib
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# 已转换为 V2 的文件内容哈希，内容未变化的文件下次直接跳过
+DEFAULT_CACHE_PATH = os.path.join(os.getcwd(), "debug", "v1_upgrade_cache.json")
 
 
 def get_unique_resource_paths():
@@ -111,8 +118,15 @@ def process_node(node):
     for field in action_fields:
         if field in node:
             action_params[field] = node.pop(field)
+    # 已经是 V2 写法时，只将残留的 V1 字段合并到 param 中
+    if isinstance(original_action_type, dict):
+        if action_params:
+            original_action_type["param"] = {
+                **action_params,
+                **original_action_type.get("param", {}),
+            }
     # 当 type 和 action_params 都为空时，不写入action 字段
-    if original_action_type or action_params:
+    elif original_action_type or action_params:
         node["action"] = {
             **(
                 {"type": original_action_type}
@@ -131,8 +145,14 @@ def process_node(node):
         if field in node:
             recognition_params[field] = node.pop(field)
 
+    if isinstance(original_recognition_type, dict):
+        if recognition_params:
+            original_recognition_type["param"] = {
+                **recognition_params,
+                **original_recognition_type.get("param", {}),
+            }
     # 当 type 和 recognition_params 都为空时，不写入 recognition 字段
-    if original_recognition_type or recognition_params:
+    elif original_recognition_type or recognition_params:
         node["recognition"] = {
             **(
                 {"type": original_recognition_type}
@@ -161,78 +181,169 @@ def process_pipeline_override(pipeline_override):
     return pipeline_override
 
 
-def traverse_and_modify(obj):
+def iter_pipeline_overrides(interface):
+    """
+    遍历 interface.json 中可能出现 pipeline_override 的位置：task、option 的 cases 和 advanced。
+
+    :param interface: interface.json 的内容
+    :return: 包含 pipeline_override 字段的对象
     """
-    递归遍历对象，处理其中的 pipeline_override 字段。
+    for task in interface.get("task", []):
+        yield task
+    for option in interface.get("option", {}).values():
+        yield from option.get("cases", [])
+    for advanced in interface.get("advanced", {}).values():
+        yield advanced
 
-    :param obj: 要遍历的对象
-    :return: 处理后的对象
+
+def convert_data(data, is_interface):
     """
-    if isinstance(obj, dict):
-        if "pipeline_override" in obj:
-            obj["pipeline_override"] = process_pipeline_override(
-                obj["pipeline_override"]
-            )
-        for key, value in obj.items():
-            obj[key] = traverse_and_modify(value)
-    elif isinstance(obj, list):
-        for index, item in enumerate(obj):
-            obj[index] = traverse_and_modify(item)
-    return obj
-
-
-def modify_json_file(file_path):
+    将 JSON 内容中每个节点的 action 和 recognition 字段转换为 V2 写法。
+
+    :param data: pipeline 文件或 interface.json 的内容
+    :param is_interface: 是否为 interface.json
+    :return: 转换后的内容
     """
-    读取指定路径的 JSON 文件，将其中每个节点的 action 和 recognition 字段进行替换。
+    if not isinstance(data, dict):
+        return data
+    if is_interface:
+        for obj in iter_pipeline_overrides(data):
+            if isinstance(obj, dict) and "pipeline_override" in obj:
+                obj["pipeline_override"] = process_pipeline_override(
+                    obj["pipeline_override"]
+                )
+    else:
+        for key in list(data.keys()):
+            if isinstance(data[key], dict):
+                data[key] = process_node(data[key])
+    return data
+
+
+def convert_file(file_path):
+    """
+    在子进程中读取并转换 JSON 文件，不写入。
 
     :param file_path: JSON 文件的路径
-    :return: 若操作成功返回 True，否则返回 False
+    :return: (文件路径, 转换后的文本或 None（无需修改）, 原文本, 错误信息)
     """
     try:
         with open(file_path, "r", encoding="utf-8") as file:
-            data = json.load(file)
-
-        if "interface.json" in file_path:
-            data = traverse_and_modify(data)
-        else:
-            if isinstance(data, dict):
-                for key in list(data.keys()):
-                    if isinstance(data[key], dict):
-                        data[key] = process_node(data[key])
+            text = file.read()
 
-        with open(file_path, "w", encoding="utf-8") as file:
-            json.dump(data, file, ensure_ascii=False, indent=4)
+        is_interface = os.path.basename(file_path) == "interface.json"
+        original = json.loads(text)
+        converted = convert_data(json.loads(text), is_interface)
+        # 内容未变化时保留原有格式，不重新写入
+        if converted == original:
+            return file_path, None, text, None
 
-        return True
+        new_text = json.dumps(converted, ensure_ascii=False, indent=4)
+        return file_path, new_text, text, None
     except Exception as e:
-        print(f"处理文件 {file_path} 时出错: {e}")
-        return False
+        return file_path, None, None, str(e)
+
+
+def converter_version():
+    """转换规则的版本，脚本修改后缓存失效"""
+    with open(os.path.abspath(__file__), "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, "r", encoding="utf-8") as file:
+            cache = json.load(file)
+        if cache.get("version") == converter_version():
+            return set(cache.get("hashes", []))
+    except (OSError, ValueError):
+        pass
+    return set()
+
+
+def save_cache(cache_path, hashes):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(
+            {"version": converter_version(), "hashes": sorted(hashes)}, file, indent=4
+        )
+    os.replace(tmp_path, cache_path)
+
+
+def file_digest(file_path):
+    with open(file_path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
 
 
 def main():
-    # 获取唯一资源路径
-    resource_paths = get_unique_resource_paths()
-    for path in resource_paths:
-        # 获取每个路径下 pipeline 文件夹内的文件路径
-        pipeline_files = get_pipeline_files(path)
-        for file in pipeline_files:
-            if file.endswith(".json"):
-                # 修改 JSON 文件
-                success = modify_json_file(file)
-                if success:
-                    print(f"成功修改文件: {file}")
-                else:
-                    print(f"修改文件失败: {file}")
-
-    # 处理 interface.json 文件
-    current_dir = os.path.join(os.getcwd(), "assets")
-    interface_file_path = os.path.join(current_dir, "interface.json")
+    parser = argparse.ArgumentParser(description="将 pipeline 从 V1 写法升级到 V2")
+    parser.add_argument("--dry-run", action="store_true", help="只输出 diff，不修改文件")
+    parser.add_argument("-j", "--jobs", type=int, help="并行处理的进程数")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="哈希缓存文件路径")
+    parser.add_argument("--no-cache", action="store_true", help="不使用哈希缓存")
+    args = parser.parse_args()
+
+    # 获取唯一资源路径下所有 pipeline 文件，以及 interface.json
+    files = [
+        file
+        for path in get_unique_resource_paths()
+        for file in get_pipeline_files(path)
+        if file.endswith(".json")
+    ]
+    interface_file_path = os.path.join(os.getcwd(), "assets", "interface.json")
     if os.path.exists(interface_file_path):
-        success = modify_json_file(interface_file_path)
-        if success:
-            print(f"成功修改文件: {interface_file_path}")
-        else:
-            print(f"修改文件失败: {interface_file_path}")
+        files.append(interface_file_path)
+
+    cache = set() if args.no_cache else load_cache(args.cache)
+    # 当前仍存在的文件内容哈希，用于更新缓存
+    hashes = {}
+    pending = []
+    for file in files:
+        digest = file_digest(file)
+        hashes[file] = digest
+        if digest not in cache:
+            pending.append(file)
+
+    print(f"共 {len(files)} 个文件，{len(files) - len(pending)} 个命中缓存")
+
+    changed = failed = 0
+    if pending:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            results = executor.map(convert_file, pending, chunksize=32)
+            for file_path, new_text, text, error in results:
+                if error is not None:
+                    failed += 1
+                    hashes.pop(file_path, None)
+                    print(f"处理文件 {file_path} 时出错: {error}")
+                    continue
+                if new_text is None:
+                    continue
+
+                changed += 1
+                if args.dry_run:
+                    sys.stdout.writelines(
+                        difflib.unified_diff(
+                            text.splitlines(keepends=True),
+                            new_text.splitlines(keepends=True),
+                            fromfile=file_path,
+                            tofile=file_path,
+                        )
+                    )
+                    continue
+
+                with open(file_path, "w", encoding="utf-8") as file:
+                    file.write(new_text)
+                hashes[file_path] = file_digest(file_path)
+                print(f"成功修改文件: {file_path}")
+
+    action = "需要修改" if args.dry_run else "修改"
+    print(f"{action} {changed} 个文件，失败 {failed} 个")
+
+    if not args.no_cache and not args.dry_run:
+        save_cache(args.cache, set(hashes.values()))
+
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,5 @@
+"""
+agent 离线性能测试
+
+在没有模拟器的环境中测量 agent 各部分的耗时，用于验证优化效果。
+"""
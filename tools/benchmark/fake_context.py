@@ -0,0 +1,169 @@
+"""
+maa.context.Context / Tasker 的本地替身
+
+只实现 agent/custom 中用到的接口，用于在没有模拟器和 MaaFramework 运行时的环境中调用 custom:
+  - run_recognition: 按节点名返回预设的识别结果，可设置模拟耗时
+  - override_pipeline: 记录每次覆盖的内容
+  - tasker.get_task_detail: 返回指定长度的合成节点历史
+  - tasker.controller.cached_image: 返回固定的截图
+"""
+
+import json
+import time
+import itertools
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+Box = Optional[List[int]]
+
+# 默认截图尺寸，与模拟器 1280x720 一致（BGR 三通道）
+DEFAULT_IMAGE_SHAPE = (720, 1280, 3)
+
+
+def make_image(shape=DEFAULT_IMAGE_SHAPE, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=shape, dtype=np.uint8)
+
+
+def make_reco_detail(box: Box, name: str = "") -> Optional[SimpleNamespace]:
+    """构造 RecognitionDetail，box 为 None 时表示识别失败"""
+    if box is None:
+        return None
+    return SimpleNamespace(name=name, box=list(box), hit=True, algorithm="Fake")
+
+
+def make_task_history(
+    length: int,
+    task_id: int = 1,
+    named: Optional[Dict[str, Box]] = None,
+    entry: str = "Benchmark",
+) -> SimpleNamespace:
+    """
+    构造 TaskDetail，包含 length 个合成节点，named 中的节点追加在历史末尾
+
+    合成节点交替识别成功/失败，名称为 History{i}
+    """
+    nodes = []
+    for index in range(length):
+        box = [index % 1000, index % 700, 40, 20] if index % 2 == 0 else None
+        reco = SimpleNamespace(box=box) if box is not None else None
+        nodes.append(SimpleNamespace(name=f"History{index}", recognition=reco))
+    for name, box in (named or {}).items():
+        reco = SimpleNamespace(box=list(box)) if box is not None else None
+        nodes.append(SimpleNamespace(name=name, recognition=reco))
+    return SimpleNamespace(
+        task_id=task_id,
+        entry=entry,
+        nodes=nodes,
+        status=SimpleNamespace(_status=3000),
+    )
+
+
+def _is_box_sequence(value) -> bool:
+    return isinstance(value, (list, tuple)) and any(
+        item is None or isinstance(item, (list, tuple)) for item in value
+    )
+
+
+class FakeTasker:
+    def __init__(self, image: Optional[np.ndarray] = None, history_length: int = 0):
+        self.controller = SimpleNamespace(
+            cached_image=image if image is not None else make_image()
+        )
+        self.task_details: Dict[int, SimpleNamespace] = {}
+        self.history_length = history_length
+        self.get_task_detail_calls = 0
+
+    def set_history(self, task_id: int, length: int, named: Dict[str, Box] = None):
+        self.task_details[task_id] = make_task_history(length, task_id, named)
+
+    def get_task_detail(self, task_id: int) -> SimpleNamespace:
+        self.get_task_detail_calls += 1
+        detail = self.task_details.get(task_id)
+        if detail is None:
+            detail = self.task_details[task_id] = make_task_history(
+                self.history_length, task_id
+            )
+        return detail
+
+
+class FakeContext:
+    """
+    Args:
+        results: 节点名 -> 识别框，或识别框序列（按调用顺序循环返回），None 表示识别失败
+        default: 未在 results 中的节点返回的识别框
+        latency: 每次 run_recognition 模拟的框架耗时（秒）
+        tasker: 使用的 FakeTasker，默认新建
+    """
+
+    def __init__(
+        self,
+        results: Dict[str, Union[Box, Iterable[Box]]] = None,
+        default: Box = None,
+        latency: float = 0.0,
+        tasker: Optional[FakeTasker] = None,
+    ):
+        self._results = {}
+        for name, value in (results or {}).items():
+            if _is_box_sequence(value):
+                self._results[name] = itertools.cycle(value)
+            else:
+                self._results[name] = itertools.repeat(value)
+        self.default = default
+        self.latency = latency
+        self.tasker = tasker if tasker is not None else FakeTasker()
+        self.overrides: List[dict] = []
+        self.recognition_calls = 0
+
+    def run_recognition(self, entry: str, image, pipeline_override: dict = None):
+        self.recognition_calls += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        results = self._results.get(entry)
+        box = next(results) if results is not None else self.default
+        return make_reco_detail(box, entry)
+
+    def override_pipeline(self, pipeline_override: dict) -> bool:
+        self.overrides.append(pipeline_override)
+        return True
+
+    def override_next(self, name: str, next_list: List[str]) -> bool:
+        self.overrides.append({name: {"next": next_list}})
+        return True
+
+
+def make_analyze_arg(
+    param: dict,
+    node_name: str = "BenchmarkNode",
+    task_id: int = 1,
+    image: Optional[np.ndarray] = None,
+    name: str = "",
+) -> SimpleNamespace:
+    """构造 CustomRecognition.AnalyzeArg"""
+    return SimpleNamespace(
+        task_detail=SimpleNamespace(task_id=task_id),
+        node_name=node_name,
+        custom_recognition_name=name,
+        custom_recognition_param=json.dumps(param),
+        image=image if image is not None else make_image(),
+        roi=[0, 0, 0, 0],
+    )
+
+
+def make_run_arg(
+    param: dict,
+    node_name: str = "BenchmarkNode",
+    task_id: int = 1,
+    name: str = "",
+) -> SimpleNamespace:
+    """构造 CustomAction.RunArg"""
+    return SimpleNamespace(
+        task_detail=SimpleNamespace(task_id=task_id),
+        node_name=node_name,
+        custom_action_name=name,
+        custom_action_param=json.dumps(param),
+        reco_detail=None,
+        box=[0, 0, 0, 0],
+    )
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测量日志等级关闭时，热点路径中 debug 日志的开销
+
+模拟 MultiRecognition 单帧内的 debug 日志（识别结果、表达式转换、ROI 标准化等），
+对比直接调用 logger.debug(f"...") 与先判断 is_enabled("DEBUG") 两种写法。
+
+用法:
+    python tools/benchmark/logging_overhead.py [--frames N]
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.stdout.reconfigure(encoding="utf-8")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "agent"))
+
+from utils.logger import setup_logger, is_enabled
+
+NODES = [f"Node{i}" for i in range(10)]
+ROIS = [[i * 10, i * 20, 100 + i, 50 + i] for i in range(10)]
+EXPRESSION = " AND ".join(f"${i}" for i in range(10))
+
+
+def frame_unguarded(logger):
+    for index, (node, roi) in enumerate(zip(NODES, ROIS)):
+        logger.debug(f"{node}(${index}): {roi}")
+    eval_expression = EXPRESSION.replace("$", "True_")
+    logger.debug(f"表达式转换: {EXPRESSION} -> {eval_expression}")
+    logger.debug(f"ROI表达式转换: UNION($0,$1) -> UNION({ROIS[0]},{ROIS[1]})")
+    logger.debug(f"全屏ROI标准化: 原始尺寸(1920x1080) -> 缩放尺寸(1280x720)")
+    logger.debug(f"MultiRecognition识别成功，返回ROI: {ROIS[0]}")
+
+
+def frame_guarded(logger):
+    for index, (node, roi) in enumerate(zip(NODES, ROIS)):
+        if is_enabled("DEBUG"):
+            logger.debug(f"{node}(${index}): {roi}")
+    eval_expression = EXPRESSION.replace("$", "True_")
+    if is_enabled("DEBUG"):
+        logger.debug(f"表达式转换: {EXPRESSION} -> {eval_expression}")
+    if is_enabled("DEBUG"):
+        logger.debug(f"ROI表达式转换: UNION($0,$1) -> UNION({ROIS[0]},{ROIS[1]})")
+    if is_enabled("DEBUG"):
+        logger.debug(f"全屏ROI标准化: 原始尺寸(1920x1080) -> 缩放尺寸(1280x720)")
+    if is_enabled("DEBUG"):
+        logger.debug(f"MultiRecognition识别成功，返回ROI: {ROIS[0]}")
+
+
+def measure(func, logger, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        func(logger)
+    return (time.perf_counter() - start) / frames * 1e6
+
+
+def run(frames=20000) -> dict:
+    with tempfile.TemporaryDirectory() as log_dir:
+        logger = setup_logger(
+            log_dir=log_dir, console_level="INFO", json_log=False, file_level="INFO"
+        )
+        unguarded_us = measure(frame_unguarded, logger, frames)
+        guarded_us = measure(frame_guarded, logger, frames)
+        logger.remove()
+
+    return {
+        "frames": frames,
+        "unguarded_us_per_frame": round(unguarded_us, 3),
+        "guarded_us_per_frame": round(guarded_us, 3),
+        "saved_us_per_frame": round(unguarded_us - guarded_us, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量关闭 DEBUG 时 debug 日志的开销")
+    parser.add_argument("--frames", type=int, default=20000, help="模拟帧数")
+    args = parser.parse_args()
+
+    result = run(args.frames)
+    print(f"直接调用 logger.debug(f\"...\"): {result['unguarded_us_per_frame']:.2f} us/帧")
+    print(f"先判断 is_enabled(\"DEBUG\"):     {result['guarded_us_per_frame']:.2f} us/帧")
+    print(f"每帧节省: {result['saved_us_per_frame']:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+回放 agent 录制的识别调用（MAA_AGENT_RECORD=1 生成的 debug/recordings/*.jsonl）
+
+按录制顺序将每次调用交给当前 agent/custom 中的代码执行，
+其中的 run_recognition / get_task_detail 返回录制时的结果，
+报告每次调用的耗时以及与录制时输出不一致的调用。
+
+用法:
+    python tools/benchmark/replay.py 录制文件.jsonl [--repeat N] [--output 结果.json]
+                                     [--show-diffs N]
+
+同一名称的 custom 在整个回放中复用同一个实例（与 agent 中一致），
+因此 Count 等有状态的 custom 需要从 agent 启动时开始的完整录制才能得到一致的结果。
+"""
+
+import sys
+import json
+import argparse
+import tempfile
+from collections import defaultdict, deque
+from pathlib import Path
+from time import perf_counter
+from types import SimpleNamespace
+
+sys.stdout.reconfigure(encoding="utf-8")
+BENCHMARK_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCHMARK_DIR.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "agent"))
+sys.path.insert(0, str(BENCHMARK_DIR))
+
+from fake_context import FakeContext, FakeTasker, make_reco_detail
+from run import percentile
+
+
+class ReplayContext(FakeContext):
+    """返回录制结果的 Context，优先按节点名匹配，找不到时按调用顺序取下一条"""
+
+    def __init__(self, calls: list):
+        super().__init__(tasker=ReplayTasker(calls))
+        self._recognitions = deque(c for c in calls if c["type"] == "run_recognition")
+        self.unmatched = 0
+
+    def run_recognition(self, entry: str, image, pipeline_override: dict = None):
+        self.recognition_calls += 1
+        for call in self._recognitions:
+            if call["entry"] == entry:
+                self._recognitions.remove(call)
+                break
+        else:
+            # Count 等每个实例生成的节点名不同，按顺序匹配
+            if not self._recognitions:
+                self.unmatched += 1
+                return None
+            call = self._recognitions.popleft()
+        return make_reco_detail(call["box"], entry)
+
+
+class ReplayTasker(FakeTasker):
+    def __init__(self, calls: list):
+        super().__init__()
+        self._details = deque(
+            c["result"] for c in calls if c["type"] == "get_task_detail"
+        )
+
+    def get_task_detail(self, task_id: int):
+        self.get_task_detail_calls += 1
+        if not self._details:
+            return None
+        data = self._details[0]
+        if len(self._details) > 1:
+            self._details.popleft()
+        if data is None:
+            return None
+        nodes = [
+            SimpleNamespace(
+                name=node["name"],
+                recognition=(
+                    SimpleNamespace(box=node["box"])
+                    if node["box"] is not None
+                    else None
+                ),
+            )
+            for node in data["nodes"]
+        ]
+        return SimpleNamespace(
+            task_id=data["task_id"],
+            entry=data["entry"],
+            nodes=nodes,
+            status=SimpleNamespace(_status=data["status"]),
+        )
+
+
+def load_session(path: Path) -> list:
+    from custom.recorder import decode_image
+
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            record["image"] = decode_image(record["image"])
+            records.append(record)
+    records.sort(key=lambda r: r["seq"])
+    return records
+
+
+def make_argv(record: dict) -> SimpleNamespace:
+    return SimpleNamespace(
+        task_detail=SimpleNamespace(task_id=record["task_id"]),
+        node_name=record["node"],
+        custom_recognition_name=record["name"],
+        custom_recognition_param=record["param"],
+        image=record["image"],
+        roi=record["roi"],
+    )
+
+
+def replay(records: list) -> tuple:
+    """回放一遍，返回 (每次调用的结果列表, 输出不一致的调用列表)"""
+    from custom.recorder import encode_result
+    from custom.registry import CUSTOM_RECOGNITIONS, load_custom_class
+
+    instances = {}
+    results = []
+    diffs = []
+    for record in records:
+        name = record["name"]
+        if name not in instances:
+            if name not in CUSTOM_RECOGNITIONS:
+                print(f"跳过未注册的识别: {name}")
+                instances[name] = None
+            else:
+                instances[name] = load_custom_class(CUSTOM_RECOGNITIONS[name])()
+        instance = instances[name]
+        if instance is None:
+            continue
+
+        context = ReplayContext(record["calls"])
+        argv = make_argv(record)
+        start = perf_counter()
+        output = encode_result(instance.analyze(context, argv))
+        elapsed = perf_counter() - start
+
+        results.append((record, elapsed))
+        if output != record["result"] or context.unmatched:
+            diffs.append(
+                {
+                    "seq": record["seq"],
+                    "name": name,
+                    "node": record["node"],
+                    "recorded": record["result"],
+                    "replayed": output,
+                    "unmatched_recognitions": context.unmatched,
+                }
+            )
+    return results, diffs
+
+
+def summarize(results: list) -> dict:
+    by_name = defaultdict(list)
+    recorded = defaultdict(list)
+    for record, elapsed in results:
+        by_name[record["name"]].append(elapsed * 1000)
+        recorded[record["name"]].append(record["duration_ms"])
+
+    summary = {}
+    for name, samples in sorted(by_name.items()):
+        samples.sort()
+        summary[name] = {
+            "calls": len(samples),
+            "mean_ms": round(sum(samples) / len(samples), 3),
+            "p50_ms": round(percentile(samples, 50), 3),
+            "p95_ms": round(percentile(samples, 95), 3),
+            "p99_ms": round(percentile(samples, 99), 3),
+            "max_ms": round(samples[-1], 3),
+            # 录制时的耗时包含框架真实识别，仅供参考
+            "recorded_mean_ms": round(
+                sum(recorded[name]) / len(recorded[name]), 3
+            ),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放录制的自定义识别调用")
+    parser.add_argument("session", type=Path, help="录制文件（.jsonl）")
+    parser.add_argument("--repeat", type=int, default=1, help="回放次数，取最后一次的耗时")
+    parser.add_argument("--output", type=Path, help="将结果写入 JSON 文件")
+    parser.add_argument(
+        "--show-diffs", type=int, default=10, help="最多打印的不一致调用数"
+    )
+    args = parser.parse_args()
+
+    from utils.logger import setup_logger
+
+    setup_logger(
+        log_dir=tempfile.mkdtemp(prefix="maa_replay_log_"),
+        console_level="WARNING",
+        file_level="INFO",
+    )
+
+    records = load_session(args.session)
+    print(f"已读取 {len(records)} 次调用: {args.session}")
+
+    for _ in range(max(1, args.repeat)):
+        # 每次回放重新导入 custom，避免 Count 等的类状态影响下一次回放
+        for module_name in [m for m in sys.modules if m.startswith("custom.")]:
+            del sys.modules[module_name]
+        results, diffs = replay(records)
+
+    summary = summarize(results)
+    for name, item in summary.items():
+        print(
+            f"{name:<20} {item['calls']:>6} 次  平均 {item['mean_ms']:>8.3f} ms  "
+            f"p50 {item['p50_ms']:>8.3f}  p95 {item['p95_ms']:>8.3f}  "
+            f"p99 {item['p99_ms']:>8.3f}  (录制时平均 {item['recorded_mean_ms']} ms)"
+        )
+
+    if diffs:
+        print(f"\n{len(diffs)} 次调用的输出与录制时不一致:")
+        for diff in diffs[: args.show_diffs]:
+            print(
+                f"  #{diff['seq']} {diff['name']}({diff['node']}): "
+                f"{diff['recorded']} -> {diff['replayed']}"
+            )
+    else:
+        print("\n所有调用的输出与录制时一致")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"session": str(args.session), "summary": summary, "diffs": diffs},
+                f,
+                indent=4,
+                ensure_ascii=False,
+            )
+        print(f"结果已写入 {args.output}")
+
+    if diffs:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
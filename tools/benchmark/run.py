@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线 benchmark：使用 Context/Tasker 替身调用 custom，无需模拟器
+
+用法:
+    python tools/benchmark/run.py [-k 名称片段] [--latency 秒] [--output 结果.json]
+                                  [--baseline baseline.json] [--threshold 0.2]
+                                  [--save-baseline]
+
+--baseline 指定的基线文件存在时，逐项对比平均耗时，变慢超过 threshold 的场景视为退化，返回码为 1。
+--save-baseline 将本次结果写入基线文件。
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import importlib.util
+from pathlib import Path
+
+sys.stdout.reconfigure(encoding="utf-8")
+BENCHMARK_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCHMARK_DIR.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "agent"))
+sys.path.insert(0, str(BENCHMARK_DIR))
+
+DEFAULT_BASELINE = BENCHMARK_DIR / "baseline.json"
+DEFAULT_OUTPUT = PROJECT_ROOT / "debug" / "benchmark.json"
+
+
+def percentile(sorted_samples, percent):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(len(sorted_samples) * percent / 100))
+    return sorted_samples[index]
+
+
+def measure(func, iterations: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    clock = time.perf_counter
+    for _ in range(iterations):
+        start = clock()
+        func()
+        samples.append(clock() - start)
+    samples.sort()
+
+    total = sum(samples)
+    return {
+        "iterations": iterations,
+        "mean_us": round(total / iterations * 1e6, 3),
+        "p50_us": round(percentile(samples, 50) * 1e6, 3),
+        "p95_us": round(percentile(samples, 95) * 1e6, 3),
+        "p99_us": round(percentile(samples, 99) * 1e6, 3),
+        "max_us": round(samples[-1] * 1e6, 3),
+        "ops_per_sec": round(iterations / total, 1) if total else None,
+    }
+
+
+def run(names, latency: float, scale: float) -> dict:
+    from scenarios import SCENARIOS
+
+    results = {}
+    for name in names:
+        scenario = SCENARIOS[name]
+        missing = [m for m in scenario.requires if importlib.util.find_spec(m) is None]
+        if missing:
+            print(f"跳过 {name}: 缺少 {', '.join(missing)}")
+            continue
+
+        iterations = max(1, int(scenario.iterations * scale))
+        func = scenario.setup(latency)
+        result = measure(func, iterations, warmup=max(1, iterations // 10))
+        result["description"] = scenario.description
+        results[name] = result
+        print(
+            f"{name:<28} 平均 {result['mean_us']:>10.2f} us  "
+            f"p50 {result['p50_us']:>10.2f}  p95 {result['p95_us']:>10.2f}  "
+            f"p99 {result['p99_us']:>10.2f}"
+        )
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """对比平均耗时，返回退化的场景名称列表"""
+    regressions = []
+    print(f"\n与基线对比（退化阈值 {threshold:.0%}）:")
+    for name, result in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            print(f"{name:<28} 基线中无此场景")
+            continue
+        ratio = result["mean_us"] / base["mean_us"] if base["mean_us"] else 1.0
+        mark = ""
+        if ratio > 1 + threshold:
+            mark = "  <-- 退化"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            mark = "  <-- 提升"
+        print(
+            f"{name:<28} {base['mean_us']:>10.2f} -> {result['mean_us']:>10.2f} us"
+            f"  ({ratio:.2f}x){mark}"
+        )
+    return regressions
+
+
+def main():
+    from scenarios import SCENARIOS
+
+    parser = argparse.ArgumentParser(description="custom 离线 benchmark")
+    parser.add_argument("-k", dest="keyword", help="只运行名称包含该字符串的场景")
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="模拟每次 run_recognition 的框架耗时（秒），默认 0 只测量 Python 代码",
+    )
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="迭代次数倍率，默认 1.0"
+    )
+    parser.add_argument(
+        "--output", type=Path, default=DEFAULT_OUTPUT, help="结果输出路径"
+    )
+    parser.add_argument(
+        "--baseline", type=Path, default=DEFAULT_BASELINE, help="基线文件路径"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="平均耗时变慢超过该比例视为退化"
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="将本次结果保存为基线"
+    )
+    args = parser.parse_args()
+
+    # 只输出警告以上的日志，与正式运行时的日志开销一致
+    from utils.logger import setup_logger
+
+    log_dir = tempfile.mkdtemp(prefix="maa_benchmark_log_")
+    setup_logger(log_dir=log_dir, console_level="WARNING", file_level="INFO")
+
+    names = [n for n in SCENARIOS if not args.keyword or args.keyword in n]
+    if not names:
+        print(f"没有匹配 {args.keyword} 的场景")
+        sys.exit(1)
+
+    data = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "latency": args.latency,
+            "scale": args.scale,
+        },
+        "scenarios": run(names, args.latency, args.scale),
+    }
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+    print(f"\n结果已写入 {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        print(f"基线已保存至 {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"基线文件 {args.baseline} 不存在，使用 --save-baseline 生成")
+        return
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("meta", {}).get("latency") != args.latency:
+        print("警告: 基线与本次的 --latency 不同，对比结果仅供参考")
+    if compare(data["scenarios"], baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
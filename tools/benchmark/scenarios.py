@@ -0,0 +1,231 @@
+"""
+benchmark 场景
+
+每个场景的 setup 返回一个无参函数，执行一次被测操作。
+参数形状尽量贴近实际 pipeline 中的写法（嵌套 ROI 表达式、多操作数逻辑、较长的任务历史等）。
+"""
+
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from fake_context import (
+    FakeContext,
+    FakeTasker,
+    make_analyze_arg,
+    make_image,
+    make_run_arg,
+)
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    setup: Callable[[float], Callable[[], object]]
+    # 单轮迭代次数，耗时较长的场景适当减少
+    iterations: int = 2000
+    requires: List[str] = field(default_factory=list)
+
+
+def _box(index: int) -> List[int]:
+    return [100 + index * 37 % 900, 80 + index * 53 % 500, 60, 40]
+
+
+def _multi(param: dict, results: dict, latency: float, tasker: FakeTasker = None):
+    from custom.reco.general import MultiRecognition
+
+    recognition = MultiRecognition()
+    context = FakeContext(results, latency=latency, tasker=tasker)
+    argv = make_analyze_arg(param, node_name="BenchmarkMulti")
+    return lambda: recognition.analyze(context, argv)
+
+
+def setup_multi_and(latency: float):
+    nodes = [f"Node{i}" for i in range(3)]
+    param = {"nodes": nodes, "logic": {"type": "AND"}, "return": "$0"}
+    return _multi(param, {name: _box(i) for i, name in enumerate(nodes)}, latency)
+
+
+def setup_multi_custom_10(latency: float):
+    nodes = [f"Node{i}" for i in range(10)]
+    # 约一半节点识别失败，表达式仍然成立
+    results = {name: (_box(i) if i % 2 == 0 else None) for i, name in enumerate(nodes)}
+    param = {
+        "nodes": nodes,
+        "logic": {
+            "type": "CUSTOM",
+            "expression": "($0 AND ($2 OR $1)) AND NOT ($3 AND $5) AND "
+            "($4 OR $7) AND ($6 OR ($8 AND NOT $9))",
+        },
+        "return": "UNION(OFFSET(INTERSECTION(UNION($0,$2),UNION($4,$6)),-10,-10,20,20),"
+        "OFFSET(UNION($6,$8),5,5,-10,-10))",
+    }
+    return _multi(param, results, latency)
+
+
+def setup_multi_external(history_length: int):
+    def setup(latency: float):
+        nodes = ["Node0", "Node1"]
+        tasker = FakeTasker()
+        tasker.set_history(
+            1,
+            history_length,
+            named={"PrevTitle": [300, 40, 680, 60], "PrevButton": None},
+        )
+        param = {
+            "nodes": nodes,
+            "logic": {
+                "type": "CUSTOM",
+                "expression": "($0 OR $1) AND {PrevTitle} AND NOT {PrevButton}",
+            },
+            "return": "UNION(INTERSECTION({PrevTitle},[0,0,0,0]),OFFSET($0,0,-20,0,20))",
+        }
+        return _multi(param, {"Node0": _box(0), "Node1": None}, latency, tasker)
+
+    return setup
+
+
+def setup_count(latency: float):
+    from custom.reco.general import Count
+
+    recognition = Count()
+    context = FakeContext(default=_box(1), latency=latency)
+    argv = make_analyze_arg(
+        {
+            "target": 2**62,
+            "recognition": {
+                "type": "TemplateMatch",
+                "param": {"template": "button.png", "roi": [0, 0, 640, 360]},
+            },
+        },
+        node_name="BenchmarkCount",
+    )
+
+    def run():
+        result = recognition.analyze(context, argv)
+        # 避免记录覆盖列表无限增长
+        context.overrides.clear()
+        return result
+
+    return run
+
+
+def setup_screenshot(latency: float):
+    from custom.action.general import Screenshot
+
+    save_dir = tempfile.mkdtemp(prefix="maa_benchmark_")
+    action = Screenshot()
+    context = FakeContext(tasker=FakeTasker(image=make_image()), latency=latency)
+    argv = make_run_arg({"save_dir": save_dir}, node_name="BenchmarkScreenshot")
+
+    def run():
+        result = action.run(context, argv)
+        for name in os.listdir(save_dir):
+            os.remove(os.path.join(save_dir, name))
+        return result
+
+    return run
+
+
+def setup_node_override(latency: float):
+    from custom.action.general import NodeOverride
+
+    action = NodeOverride()
+    context = FakeContext(latency=latency)
+    argv = make_run_arg(
+        {
+            f"Node{i}": {
+                "enabled": i % 2 == 0,
+                "roi": _box(i),
+                "next": [f"Node{i + 1}", f"Node{i + 2}"],
+            }
+            for i in range(5)
+        },
+        node_name="BenchmarkOverride",
+    )
+
+    def run():
+        result = action.run(context, argv)
+        context.overrides.clear()
+        return result
+
+    return run
+
+
+def setup_time_is_current_period(latency: float):
+    from utils.time import is_current_period
+
+    now_ms = int(np.datetime64("now", "ms").astype(np.int64))
+    timestamps = [now_ms - i * 3_600_000 for i in range(64)]
+    state = {"index": 0}
+
+    def run():
+        state["index"] = (state["index"] + 1) % len(timestamps)
+        return is_current_period(timestamps[state["index"]], "Asia/Shanghai")
+
+    return run
+
+
+def setup_time_classify(latency: float):
+    from utils.time import get_calendar
+
+    calendar = get_calendar("official")
+    now_ms = int(np.datetime64("now", "ms").astype(np.int64))
+    rng = np.random.default_rng(0)
+    timestamps = now_ms - rng.integers(0, 90 * 86_400_000, size=100_000)
+    return lambda: calendar.classify(timestamps)
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario(
+            "multi_and_3",
+            "MultiRecognition，3 个节点 AND，返回 $0",
+            setup_multi_and,
+        ),
+        Scenario(
+            "multi_custom_10",
+            "MultiRecognition，10 操作数自定义逻辑，嵌套 UNION/INTERSECTION/OFFSET",
+            setup_multi_custom_10,
+        ),
+        Scenario(
+            "multi_external_100",
+            "MultiRecognition，引用外部节点，任务历史 100 个节点",
+            setup_multi_external(100),
+        ),
+        Scenario(
+            "multi_external_5000",
+            "MultiRecognition，引用外部节点，任务历史 5000 个节点",
+            setup_multi_external(5000),
+            iterations=500,
+        ),
+        Scenario("count", "Count，TemplateMatch 识别", setup_count),
+        Scenario(
+            "screenshot",
+            "Screenshot，1280x720 截图编码并写入 PNG",
+            setup_screenshot,
+            iterations=50,
+            requires=["PIL"],
+        ),
+        Scenario("node_override", "NodeOverride，覆盖 5 个节点", setup_node_override),
+        Scenario(
+            "time_is_current_period",
+            "utils.time.is_current_period 单个时间戳",
+            setup_time_is_current_period,
+            iterations=20000,
+            requires=["pytz"],
+        ),
+        Scenario(
+            "time_classify_100k",
+            "ResetCalendar.classify 10 万个时间戳",
+            setup_time_classify,
+            iterations=50,
+            requires=["pytz"],
+        ),
+    ]
+}
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统计 agent 启动时的模块导入耗时（基于 python -X importtime）
+
+用法:
+    python tools/ci/check_import_time.py [--budget 预算文件] [--top N]
+
+按顶层包汇总累计导入耗时并输出报告，超出预算或导入了
+禁止在启动阶段导入的模块（如 PIL、pytz）时返回非零退出码。
+"""
+
+import re
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+working_dir = Path(__file__).parent.parent.parent
+agent_dir = working_dir / "agent"
+default_budget_file = Path(__file__).parent / "import_time_budget.json"
+
+# 模拟 main.py 在 AgentServer.start_up 之前执行的导入
+STARTUP_IMPORTS = (
+    "import utils; "
+    "from maa.agent.agent_server import AgentServer; "
+    "from maa.toolkit import Toolkit; "
+    "import custom"
+)
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure_import_time(statement: str) -> list:
+    """在子进程中执行导入语句，返回 (模块名, 自身耗时us, 累计耗时us, 嵌套层级) 列表"""
+    cmd = [sys.executable, "-X", "importtime", "-c", statement]
+    result = subprocess.run(
+        cmd, cwd=agent_dir, capture_output=True, text=True, encoding="utf-8"
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        raise RuntimeError(f"执行导入失败，返回码: {result.returncode}")
+
+    records = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        level = (len(indent) - 1) // 2
+        records.append((module, int(self_us), int(cumulative_us), level))
+    return records
+
+
+def summarize(records: list) -> dict:
+    """按顶层包汇总累计耗时"""
+    packages = {}
+    for module, _, cumulative_us, level in records:
+        if level != 0:
+            continue
+        package = module.split(".")[0]
+        packages[package] = packages.get(package, 0) + cumulative_us
+    return packages
+
+
+def load_budget(budget_file: Path) -> dict:
+    if not budget_file.exists():
+        return {}
+    with open(budget_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="统计 agent 启动导入耗时")
+    parser.add_argument(
+        "--budget", default=str(default_budget_file), help="导入耗时预算文件"
+    )
+    parser.add_argument("--top", type=int, default=15, help="显示耗时最高的前 N 个包")
+    parser.add_argument("--json", help="将报告写入指定的 JSON 文件")
+    args = parser.parse_args()
+
+    records = measure_import_time(STARTUP_IMPORTS)
+    packages = summarize(records)
+    total_ms = sum(packages.values()) / 1000
+    imported = {module for module, _, _, _ in records}
+
+    print(f"启动导入总耗时: {total_ms:.1f} ms，共导入 {len(imported)} 个模块")
+    print(f"{'包':<24}{'累计耗时(ms)':>14}")
+    for package, cumulative_us in sorted(
+        packages.items(), key=lambda item: item[1], reverse=True
+    )[: args.top]:
+        print(f"{package:<24}{cumulative_us / 1000:>14.1f}")
+
+    if args.json:
+        report = {
+            "total_ms": round(total_ms, 3),
+            "packages_ms": {k: round(v / 1000, 3) for k, v in packages.items()},
+            "modules": sorted(imported),
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+
+    budget = load_budget(Path(args.budget))
+    passed = True
+
+    total_budget_ms = budget.get("total_ms")
+    if total_budget_ms is not None and total_ms > total_budget_ms:
+        print(f"❌ 启动导入耗时 {total_ms:.1f} ms 超出预算 {total_budget_ms} ms")
+        passed = False
+
+    for package, package_budget_ms in budget.get("packages_ms", {}).items():
+        package_ms = packages.get(package, 0) / 1000
+        if package_ms > package_budget_ms:
+            print(f"❌ {package} 导入耗时 {package_ms:.1f} ms 超出预算 {package_budget_ms} ms")
+            passed = False
+
+    for module in budget.get("forbidden", []):
+        if module in imported:
+            print(f"❌ 启动阶段不应导入 {module}，请改为延迟导入")
+            passed = False
+
+    if passed:
+        print("✅ 导入耗时检查通过")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
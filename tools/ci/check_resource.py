@@ -1,37 +1,134 @@
 import sys
+import time
+import argparse
 
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-from maa.resource import Resource
-from maa.tasker import Tasker, LoggingLevelEnum
+sys.path.insert(0, str(Path(__file__).resolve().parent))
 
+from resource_utils import bundle_label, interface_bundles
 
-def check(dirs: List[Path]) -> bool:
-    resource = Resource()
+# 资源集名称 -> 按加载顺序排列的资源目录
+Bundles = Dict[str, List[Path]]
+
+
+def load_interface_bundles(interface_path: Path) -> Bundles:
+    """interface.json 中的每个 resource 预设作为一个独立的资源集"""
+    return {
+        f"{name} ({bundle_label(dirs)})": dirs
+        for name, dirs in interface_bundles(interface_path).items()
+    }
+
+
+def check_bundle(
+    name: str, dirs: List[Path], verbose: bool = False
+) -> Tuple[str, bool, list, Optional[str]]:
+    """
+    在独立的 Resource 中依次加载资源目录，在子进程中执行
 
-    print(f"Checking {len(dirs)} directories...")
+    Returns:
+        (资源集名称, 是否成功, [(目录, 耗时秒数, 是否成功)], 错误信息)
+    """
+    from maa.resource import Resource
+    from maa.tasker import Tasker, LoggingLevelEnum
 
+    # 多个进程的日志会交错输出，默认只输出错误
+    Tasker.set_stdout_level(
+        LoggingLevelEnum.All if verbose else LoggingLevelEnum.Error
+    )
+
+    resource = Resource()
+    timings = []
     for dir in dirs:
-        print(f"Checking {dir}...")
-        status = resource.post_bundle(dir).wait().status
-        if not status.succeeded:
-            print(f"Failed to check {dir}.")
-            return False
+        start = time.perf_counter()
+        try:
+            status = resource.post_bundle(dir).wait().status
+        except Exception as e:
+            timings.append((str(dir), time.perf_counter() - start, False))
+            return name, False, timings, f"{type(e).__name__}: {e}"
+
+        succeeded = status.succeeded
+        timings.append((str(dir), time.perf_counter() - start, succeeded))
+        if not succeeded:
+            return name, False, timings, f"Failed to load {dir}"
+
+    return name, True, timings, None
 
-    print("All directories checked.")
-    return True
+
+def check(
+    bundles: Bundles, jobs: Optional[int] = None, verbose: bool = False
+) -> bool:
+    print(f"Checking {len(bundles)} resource bundles...")
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs or min(len(bundles), 8)) as executor:
+        futures = {
+            executor.submit(check_bundle, name, dirs, verbose): name
+            for name, dirs in bundles.items()
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # 子进程异常退出（如 MaaFramework 崩溃）
+                result = (futures[future], False, [], f"{type(e).__name__}: {e}")
+            results.append(result)
+
+            name, succeeded, timings, error = result
+            total = sum(seconds for _, seconds, _ in timings)
+            print(f"[{'OK' if succeeded else 'FAILED'}] {name} ({total:.2f}s)")
+            for dir, seconds, dir_succeeded in timings:
+                mark = "" if dir_succeeded else "  <-- failed"
+                print(f"    {dir}: {seconds:.2f}s{mark}")
+
+    failures = [result for result in results if not result[1]]
+    print(
+        f"Checked {len(results)} bundles in {time.perf_counter() - start:.2f}s, "
+        f"{len(failures)} failed."
+    )
+    for name, _, _, error in failures:
+        print(f"  {name}: {error}")
+
+    return not failures
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python check_resource.py <directory>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Check that resource bundles load in MaaFramework"
+    )
+    parser.add_argument(
+        "dirs",
+        nargs="*",
+        type=Path,
+        help="resource directories loaded in order as a single bundle",
+    )
+    parser.add_argument(
+        "--interface",
+        type=Path,
+        action="append",
+        default=[],
+        help="interface.json whose resource presets are each checked as a bundle",
+    )
+    parser.add_argument("-j", "--jobs", type=int, help="number of worker processes")
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="show all MaaFramework logs"
+    )
+    args = parser.parse_args()
 
-    Tasker.set_stdout_level(LoggingLevelEnum.All)
+    bundles = {}
+    if args.dirs:
+        bundles[bundle_label(args.dirs)] = args.dirs
+    for interface_path in args.interface:
+        bundles.update(load_interface_bundles(interface_path))
+
+    if not bundles:
+        parser.print_usage()
+        sys.exit(1)
 
-    dirs = [Path(arg) for arg in sys.argv[1:]]
-    if not check(dirs):
+    if not check(bundles, args.jobs, args.verbose):
         sys.exit(1)
 
 
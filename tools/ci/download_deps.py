@@ -2,15 +2,26 @@
 # -*- coding: utf-8 -*-
 """
 下载Python依赖到deps目录的脚本
-自动检测当前平台并下载对应架构的wheel文件
+默认自动检测当前平台并下载对应架构的wheel文件到deps目录
+
+可以通过 --platform / --python-version 指定多个目标并发下载，
+此时每个目标下载到 deps目录/<平台>[-py<版本>] 子目录。
+所有 wheel 保存在按内容寻址的共享缓存中，各目录中的文件链接到缓存。
 """
 
 import os
 import sys
-import subprocess
+import json
+import shutil
+import hashlib
 import argparse
 import platform
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 sys.stdout.reconfigure(encoding="utf-8")
 
@@ -66,121 +77,303 @@ def get_platform_tag():
     return platform_tag
 
 
-def download_dependencies(deps_dir, platform_tag):
-    """下载依赖到指定目录"""
-    # 创建deps目录
-    deps_path = Path(deps_dir)
-    deps_path.mkdir(parents=True, exist_ok=True)
-
-    print(f"开始下载平台 {platform_tag} 的依赖到 {deps_dir}")
-
-    # 从requirements.txt读取依赖
-    requirements_file = Path("requirements.txt")
-    if not requirements_file.exists():
-        print("错误: requirements.txt 文件不存在")
+@dataclass
+class Target:
+    platform_tag: str
+    python_version: Optional[str]
+    deps_dir: Path
+    # 自动检测的平台在找不到对应 wheel 时回退到不指定平台下载
+    fallback: bool = False
+
+    @property
+    def name(self):
+        if self.python_version:
+            return f"{self.platform_tag}-py{self.python_version}"
+        return self.platform_tag
+
+
+def pip_download(dest, platform_tag, python_version, requirements_file, sources):
+    """执行一次 pip download，返回 (是否成功, 输出)"""
+    cmd = [
+        sys.executable,
+        "-m",
+        "pip",
+        "download",
+        "-r",
+        str(requirements_file),
+        "-d",
+        str(dest),
+        "--only-binary=:all:",
+        "--disable-pip-version-check",
+    ]
+    if platform_tag:
+        cmd += ["--platform", platform_tag]
+    if python_version:
+        cmd += ["--python-version", python_version]
+    cmd += sources
+
+    output = f"执行命令: {' '.join(cmd)}\n"
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    output += result.stdout
+    if result.stderr:
+        output += f"警告信息:\n{result.stderr}"
+    return result.returncode == 0, output
+
+
+class WheelCache:
+    """
+    按内容寻址的 wheel 缓存
+
+    blobs/<sha256> 保存 wheel 内容，wheels/<文件名> 链接到对应的 blob，
+    作为 pip 的 --find-links 避免重复下载。各平台的输出目录同样链接到 blob，
+    py3-none-any 等平台无关的 wheel 在多个平台之间只保存一份。
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.blobs_dir = self.cache_dir / "blobs"
+        self.wheels_dir = self.cache_dir / "wheels"
+        self.staging_dir = self.cache_dir / "staging"
+        for path in (self.blobs_dir, self.wheels_dir, self.staging_dir):
+            path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def add(self, wheel_file):
+        """将下载的 wheel 移入缓存，返回 blob 路径"""
+        digest = file_sha256(wheel_file)
+        blob = self.blobs_dir / digest
+        with self._lock:
+            if blob.exists():
+                wheel_file.unlink()
+            else:
+                os.replace(wheel_file, blob)
+            link_file(blob, self.wheels_dir / wheel_file.name)
+        return blob
+
+
+def link_file(source, target):
+    """硬链接文件，跨文件系统等情况回退为复制"""
+    if target.exists():
+        if target.samefile(source):
+            return
+        target.unlink()
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def download_target(target, cache, requirements_file, sources):
+    """
+    下载一个平台 / Python 版本组合的依赖，并链接到输出目录
+
+    Returns:
+        (是否成功, 输出)
+    """
+    staging = cache.staging_dir / target.name
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    # 优先使用缓存中已有的 wheel
+    sources = [*sources, "--find-links", str(cache.wheels_dir)]
+    ok, output = pip_download(
+        staging, target.platform_tag, target.python_version, requirements_file, sources
+    )
+    if (
+        not ok
+        and target.fallback
+        and (
+            "Could not find a version" in output
+            or "No matching distribution" in output
+        )
+    ):
+        output += "某些包可能不支持当前平台，尝试通用下载策略...\n"
+        ok, fallback_output = pip_download(
+            staging, None, target.python_version, requirements_file, sources
+        )
+        output += fallback_output
+    if not ok:
+        shutil.rmtree(staging, ignore_errors=True)
+        return False, output
+
+    target.deps_dir.mkdir(parents=True, exist_ok=True)
+    names = set()
+    for wheel_file in sorted(staging.glob("*.whl")):
+        blob = cache.add(wheel_file)
+        link_file(blob, target.deps_dir / wheel_file.name)
+        names.add(wheel_file.name)
+    shutil.rmtree(staging, ignore_errors=True)
+
+    # 删除上次下载后已不再需要的 wheel
+    for wheel_file in target.deps_dir.glob("*.whl"):
+        if wheel_file.name not in names:
+            wheel_file.unlink()
+
+    output += f"\n下载的wheel文件 ({len(names)} 个):\n"
+    output += "".join(f"  {name}\n" for name in sorted(names))
+    output += f"依赖下载完成到: {target.deps_dir}\n"
+    return True, output
+
+
+def download_dependencies(targets, cache_dir, requirements_file, sources, jobs=None):
+    """并发下载所有目标的依赖，返回是否全部成功"""
+    if not Path(requirements_file).exists():
+        print(f"错误: {requirements_file} 文件不存在")
         return False
 
-    # 首先尝试下载平台特定的wheel文件
-    try:
-        cmd = [
-            sys.executable,
-            "-m",
-            "pip",
-            "download",
-            "-r",
-            str(requirements_file),
-            "-d",
-            str(deps_path),
-            "--platform",
-            platform_tag,
-            "--only-binary=:all:",
-        ]
-
-        print(f"执行命令: {' '.join(cmd)}")
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-        print(result.stdout)
-
-        if result.stderr:
-            print("警告信息:")
-            print(result.stderr)
-
-        # 列出下载的文件
-        whl_files = list(deps_path.glob("*.whl"))
-        print(f"\n下载的wheel文件 ({len(whl_files)} 个):")
-        for whl_file in whl_files:
-            print(f"  {whl_file.name}")
-
-        print(f"依赖下载完成到: {deps_path}")
-        return True
-
-    except subprocess.CalledProcessError as e:
-        print(f"平台特定下载失败: {e}")
-        if e.stderr and (
-            "Could not find a version" in e.stderr
-            or "No matching distribution" in e.stderr
-        ):
-            print("某些包可能不支持当前平台，尝试通用下载策略...")
-
-            # 回退到通用下载策略（不指定平台）
+    cache = WheelCache(cache_dir)
+    success = True
+    with ThreadPoolExecutor(max_workers=jobs or len(targets)) as executor:
+        futures = {
+            executor.submit(
+                download_target, target, cache, requirements_file, sources
+            ): target
+            for target in targets
+        }
+        for future in as_completed(futures):
+            target = futures[future]
             try:
-                cmd_fallback = [
-                    sys.executable,
-                    "-m",
-                    "pip",
-                    "download",
-                    "-r",
-                    str(requirements_file),
-                    "-d",
-                    str(deps_path),
-                    "--only-binary=:all:",
-                ]
-
-                print(f"执行回退命令: {' '.join(cmd_fallback)}")
-                result = subprocess.run(
-                    cmd_fallback, check=True, capture_output=True, text=True
-                )
-                print(result.stdout)
-
-                if result.stderr:
-                    print("警告信息:")
-                    print(result.stderr)
-
-                # 列出下载的文件
-                whl_files = list(deps_path.glob("*.whl"))
-                print(f"\n下载的wheel文件 ({len(whl_files)} 个):")
-                for whl_file in whl_files:
-                    print(f"  {whl_file.name}")
-
-                print(f"通用策略下载完成到: {deps_path}")
-                return True
-
-            except subprocess.CalledProcessError as e2:
-                print(f"通用策略也失败: {e2}")
-                if e2.stdout:
-                    print("stdout:", e2.stdout)
-                if e2.stderr:
-                    print("stderr:", e2.stderr)
-                return False
-        else:
-            if e.stdout:
-                print("stdout:", e.stdout)
-            if e.stderr:
-                print("stderr:", e.stderr)
-            return False
+                ok, output = future.result()
+            except Exception as e:
+                ok, output = False, f"{type(e).__name__}: {e}\n"
+            # 各目标的输出在完成后整体打印，避免交错
+            print(f"===== {target.name} {'成功' if ok else '失败'} =====")
+            print(output)
+            if ok:
+                write_wheel_manifest(target.deps_dir, requirements_file)
+            success &= ok
+    return success
+
+
+def file_sha256(path):
+    """计算文件的 sha256"""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def parse_wheel_filename(filename):
+    """解析 wheel 文件名: {name}-{version}(-{build})?-{python}-{abi}-{platform}.whl"""
+    parts = filename[: -len(".whl")].split("-")
+    if len(parts) not in (5, 6):
+        raise ValueError(f"无法解析的 wheel 文件名: {filename}")
+    name, version = parts[0], parts[1]
+    python_tag, abi_tag, platform_tag = parts[-3:]
+    return {
+        "name": name.replace("_", "-").lower(),
+        "version": version,
+        "python_tag": python_tag,
+        "abi_tag": abi_tag,
+        "platform_tag": platform_tag,
+    }
+
+
+def write_wheel_manifest(deps_dir, requirements_file="requirements.txt"):
+    """
+    生成 wheels_manifest.json，记录每个 wheel 的名称、版本、平台标签和 sha256，
+    agent 启动时据此快速判断是否需要安装，并在安装前校验 wheel 完整性
+    """
+    deps_path = Path(deps_dir)
+    wheels = []
+    for whl_file in sorted(deps_path.glob("*.whl")):
+        wheel = parse_wheel_filename(whl_file.name)
+        wheel["file"] = whl_file.name
+        wheel["size"] = whl_file.stat().st_size
+        wheel["sha256"] = file_sha256(whl_file)
+        wheels.append(wheel)
+
+    manifest = {
+        "requirements_sha256": file_sha256(requirements_file),
+        "wheels": wheels,
+    }
+    manifest_path = deps_path / "wheels_manifest.json"
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4, ensure_ascii=False)
+
+    print(f"已生成 wheel 清单: {manifest_path} ({len(wheels)} 个 wheel)")
+    return manifest_path
+
+
+def build_targets(deps_dir, platforms, python_versions):
+    """平台与 Python 版本的所有组合，只有一个目标时直接下载到 deps目录"""
+    if not platforms:
+        platforms = [get_platform_tag()]
+        fallback = True
+    else:
+        fallback = False
+
+    combinations = [
+        (platform_tag, python_version)
+        for platform_tag in platforms
+        for python_version in (python_versions or [None])
+    ]
+    deps_path = Path(deps_dir)
+    targets = []
+    for platform_tag, python_version in combinations:
+        target = Target(platform_tag, python_version, deps_path, fallback)
+        if len(combinations) > 1:
+            target.deps_dir = deps_path / target.name
+        targets.append(target)
+    return targets
 
 
 def main():
     parser = argparse.ArgumentParser(description="下载Python依赖到deps目录")
     parser.add_argument("--deps-dir", default="deps", help="依赖下载目录 (默认: deps)")
+    parser.add_argument(
+        "--platform",
+        action="append",
+        default=[],
+        help="目标平台标签，可指定多个 (默认: 自动检测当前平台)",
+    )
+    parser.add_argument(
+        "--python-version",
+        action="append",
+        default=[],
+        help="目标 Python 版本，如 3.12，可指定多个 (默认: 当前解释器)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=os.path.join(".cache", "wheels"),
+        help="共享的 wheel 缓存目录 (默认: .cache/wheels)",
+    )
+    parser.add_argument(
+        "--requirements", default="requirements.txt", help="依赖列表文件"
+    )
+    parser.add_argument("--index-url", help="PyPI 镜像或本地索引地址")
+    parser.add_argument(
+        "--find-links",
+        action="append",
+        default=[],
+        help="额外的 wheel 目录或页面，可指定多个",
+    )
+    parser.add_argument(
+        "--no-index", action="store_true", help="不访问索引，只使用 --find-links"
+    )
+    parser.add_argument("-j", "--jobs", type=int, help="并发下载的目标数")
 
     args = parser.parse_args()
 
+    sources = []
+    if args.index_url:
+        sources += ["--index-url", args.index_url]
+    for find_links in args.find_links:
+        sources += ["--find-links", find_links]
+    if args.no_index:
+        sources.append("--no-index")
+
     try:
-        # 自动检测平台
-        platform_tag = get_platform_tag()
+        targets = build_targets(args.deps_dir, args.platform, args.python_version)
+        for target in targets:
+            print(f"开始下载 {target.name} 的依赖到 {target.deps_dir}")
 
         # 下载依赖
-        success = download_dependencies(args.deps_dir, platform_tag)
+        success = download_dependencies(
+            targets, args.cache_dir, args.requirements, sources, args.jobs
+        )
 
         if success:
             print("✅ 依赖下载成功")
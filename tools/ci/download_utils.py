@@ -0,0 +1,390 @@
+"""
+CI 脚本共用的下载工具
+
+- 下载结果保存在按内容寻址的本地缓存中（默认 .cache/downloads，可通过环境变量
+  MAA_DOWNLOAD_CACHE 修改），以 URL 和 sha256 为索引，重复运行时直接复用
+- 中断的下载保留为 .part 文件，重试或下次运行时通过 HTTP Range 续传
+- 指定 sha256 时校验下载内容，缓存中内容校验一致时无需访问网络；
+  未指定时每次通过 ETag / Last-Modified 确认缓存是否仍然有效
+- 缓存中的文件每次使用前都会重新计算哈希，损坏的文件会被删除并重新下载
+- tar 归档边下载边解压到临时目录，zip 需要读取末尾的目录，下载完成后再解压；
+  校验通过后才移入目标目录
+"""
+
+import io
+import os
+import json
+import time
+import shutil
+import hashlib
+import tarfile
+import tempfile
+import zipfile
+import http.client
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+CACHE_DIR = Path(
+    os.environ.get("MAA_DOWNLOAD_CACHE", os.path.join(".cache", "downloads"))
+)
+CHUNK_SIZE = 1024 * 1024
+RETRIES = 3
+TIMEOUT = 60
+
+# 用于安装 pip 的 wheel，固定版本和 sha256，代替未固定内容的 get-pip.py。
+# URL 与 sha256 均取自 https://pypi.org/pypi/pip/json 及 https://pypi.org/simple/pip/，
+# 升级时从这两处复制对应版本 py3-none-any.whl 的值
+# wheel 可以直接运行: python pip-*.whl/pip install pip-*.whl
+PIP_WHEEL_URL = (
+    "https://files.pythonhosted.org/packages/f3/6e/"
+    "1736e5b4ae2b778ef2f81c47d797de9f891d4d8acb047a24ca37a60294dd/"
+    "pip-26.2.1-py3-none-any.whl"
+)
+PIP_WHEEL_SHA256 = "71138adf1f4ca900cdb7d289c21b7494329f2332b6d85f0e1c42108c0384ed3e"
+
+
+class ChecksumError(Exception):
+    pass
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DownloadCache:
+    """
+    blobs/<sha256>          下载的文件内容
+    urls/<URL 的 sha256>.json  URL 对应的 blob 以及 ETag / Last-Modified
+    partial/<URL 的 sha256>.part  未完成的下载
+    """
+
+    def __init__(self, cache_dir=None):
+        self.root = Path(cache_dir or CACHE_DIR)
+        self.blobs_dir = self.root / "blobs"
+        self.urls_dir = self.root / "urls"
+        self.partial_dir = self.root / "partial"
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def blob(self, sha256: str) -> Path:
+        return self.blobs_dir / sha256
+
+    def partial(self, url: str) -> Path:
+        return self.partial_dir / f"{self._key(url)}.part"
+
+    def _meta_path(self, url: str, partial: bool) -> Path:
+        directory = self.partial_dir if partial else self.urls_dir
+        return directory / f"{self._key(url)}.json"
+
+    def load_meta(self, url: str, partial: bool = False) -> dict:
+        path = self._meta_path(url, partial)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_meta(self, url: str, meta: dict, partial: bool = False):
+        path = self._meta_path(url, partial)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=4)
+
+    def verified_blob(self, sha256: str) -> Optional[Path]:
+        """内容与 sha256 一致的 blob，不一致（损坏或被修改）时删除并返回 None"""
+        blob = self.blob(sha256)
+        if not blob.is_file():
+            return None
+        if file_sha256(blob) != sha256:
+            print(f"缓存文件已损坏，重新下载: {blob}")
+            blob.unlink()
+            return None
+        return blob
+
+    def lookup(
+        self, url: str, sha256: Optional[str] = None
+    ) -> Tuple[Optional[Path], dict]:
+        """不访问网络查找缓存，返回 (blob 路径, URL 的缓存信息)"""
+        if sha256:
+            return self.verified_blob(sha256), {}
+        meta = self.load_meta(url)
+        if meta.get("sha256") and self.verified_blob(meta["sha256"]):
+            return self.blob(meta["sha256"]), meta
+        return None, {}
+
+    def store(self, url: str, part: Path, sha256: str, headers) -> Path:
+        """将完成的下载移入 blobs，并记录 URL 对应的内容"""
+        blob = self.blob(sha256)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(part, blob)
+        self.save_meta(
+            url,
+            {
+                "url": url,
+                "sha256": sha256,
+                "size": blob.stat().st_size,
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+            },
+        )
+        partial_meta = self._meta_path(url, partial=True)
+        if partial_meta.exists():
+            partial_meta.unlink()
+        return blob
+
+
+class _TeeReader(io.RawIOBase):
+    """读取 HTTP 响应的同时写入缓存文件并计算哈希，供 tarfile 流式解压"""
+
+    def __init__(self, response, out, digest):
+        self.response = response
+        self.out = out
+        self.digest = digest
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self.response.readinto(buffer)
+        if count:
+            chunk = memoryview(buffer)[:count]
+            self.out.write(chunk)
+            self.digest.update(chunk)
+        return count
+
+
+def _fetch(
+    url: str,
+    sha256: Optional[str],
+    cache: DownloadCache,
+    cached_meta: dict,
+    consume: Optional[Callable] = None,
+) -> Tuple[Path, bool]:
+    """
+    执行一次 HTTP 请求
+
+    Returns:
+        (blob 路径, 是否已经由 consume 边下载边处理)
+    """
+    part = cache.partial(url)
+    part.parent.mkdir(parents=True, exist_ok=True)
+    offset = part.stat().st_size if part.exists() else 0
+
+    headers = {}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        # 服务器上的文件已经变化时返回完整内容，而不是续传
+        validator = cache.load_meta(url, partial=True).get("validator")
+        if validator:
+            headers["If-Range"] = validator
+    elif cached_meta:
+        if cached_meta.get("etag"):
+            headers["If-None-Match"] = cached_meta["etag"]
+        if cached_meta.get("last_modified"):
+            headers["If-Modified-Since"] = cached_meta["last_modified"]
+
+    try:
+        response = urllib.request.urlopen(
+            urllib.request.Request(url, headers=headers), timeout=TIMEOUT
+        )
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            print("服务器上的文件未变化，使用缓存。")
+            return cache.blob(cached_meta["sha256"]), False
+        if e.code == 416 and offset:
+            # 续传的起始位置无效，丢弃未完成的文件后重新下载
+            part.unlink()
+            return _fetch(url, sha256, cache, cached_meta, consume)
+        raise
+
+    with response:
+        digest = hashlib.sha256()
+        if offset and response.status == 206:
+            print(f"从 {offset} 字节处继续下载。")
+            with open(part, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            mode = "ab"
+        else:
+            offset = 0
+            mode = "wb"
+        validator = response.headers.get("ETag") or response.headers.get(
+            "Last-Modified"
+        )
+        cache.save_meta(url, {"url": url, "validator": validator}, partial=True)
+
+        length = response.headers.get("Content-Length")
+        expected = offset + int(length) if length else None
+
+        streamed = False
+        consume_error = None
+        with open(part, mode) as out:
+            if consume is not None and not offset:
+                reader = _TeeReader(response, out, digest)
+                try:
+                    consume(io.BufferedReader(reader, CHUNK_SIZE))
+                    streamed = True
+                except Exception as e:
+                    # 连接中断时 tarfile 只会报告数据不完整，先确认是否为下载中断
+                    consume_error = e
+            # 读取剩余内容（包括流式处理未读取的尾部）
+            for chunk in iter(lambda: response.read(CHUNK_SIZE), b""):
+                out.write(chunk)
+                digest.update(chunk)
+            received = out.tell()
+
+    if expected is not None and received < expected:
+        raise http.client.IncompleteRead(b"", expected - received)
+    if consume_error is not None:
+        raise consume_error
+
+    actual = digest.hexdigest()
+    if sha256 and actual != sha256:
+        part.unlink()
+        raise ChecksumError(
+            f"sha256 校验失败: {url}\n  期望 {sha256}\n  实际 {actual}"
+        )
+    return cache.store(url, part, actual, response.headers), streamed
+
+
+def _download(
+    url: str,
+    sha256: Optional[str] = None,
+    cache: Optional[DownloadCache] = None,
+    consume: Optional[Callable] = None,
+) -> Tuple[Path, bool]:
+    cache = cache or DownloadCache()
+    sha256 = sha256.lower() if sha256 else None
+
+    cached, meta = cache.lookup(url, sha256)
+    # 只有内容与指定的 sha256 一致时才直接使用缓存，否则向服务器确认
+    if cached and sha256:
+        print(f"使用缓存: {url}")
+        return cached, False
+
+    for attempt in range(1, RETRIES + 1):
+        try:
+            return _fetch(url, sha256, cache, meta, consume)
+        except urllib.error.HTTPError as e:
+            if e.code < 500 or attempt == RETRIES:
+                raise
+            error = e
+        except (urllib.error.URLError, OSError, http.client.HTTPException) as e:
+            if attempt == RETRIES:
+                raise
+            error = e
+        print(f"下载中断: {error}，{attempt} 秒后重试（已下载的部分会续传）")
+        time.sleep(attempt)
+
+
+def download(
+    url: str,
+    sha256: Optional[str] = None,
+    cache: Optional[DownloadCache] = None,
+) -> Path:
+    """下载到缓存并返回缓存中的文件路径，文件不应被修改"""
+    return _download(url, sha256, cache)[0]
+
+
+def download_to(
+    url: str,
+    dest_path,
+    sha256: Optional[str] = None,
+    cache: Optional[DownloadCache] = None,
+) -> Path:
+    """下载并复制到指定路径"""
+    blob = download(url, sha256, cache)
+    os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+    shutil.copyfile(blob, dest_path)
+    return Path(dest_path)
+
+
+def _extract_tar(tar: tarfile.TarFile, dest_dir):
+    # 新版本 Python 支持过滤归档中的危险路径
+    if hasattr(tarfile, "data_filter"):
+        tar.extractall(dest_dir, filter="data")
+    else:
+        tar.extractall(dest_dir)
+
+
+def extract_archive(path, dest_dir, url: Optional[str] = None):
+    """解压 zip 或 tar (tar.gz, tar.xz, tar.bz2) 文件"""
+    name = url or str(path)
+    if name.endswith(".zip"):
+        with zipfile.ZipFile(path, "r") as zip_ref:
+            zip_ref.extractall(dest_dir)
+    else:
+        # 'r:*' 会自动检测压缩格式
+        with tarfile.open(path, "r:*") as tar_ref:
+            _extract_tar(tar_ref, dest_dir)
+
+
+def _reset_dir(path: Path):
+    if path.exists():
+        shutil.rmtree(path)
+    path.mkdir(parents=True)
+
+
+def _move_contents(source_dir: Path, dest_dir: Path):
+    """将 source_dir 中的内容移入 dest_dir，覆盖同名的文件和目录"""
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    for entry in source_dir.iterdir():
+        target = dest_dir / entry.name
+        if target.is_dir() and not target.is_symlink():
+            shutil.rmtree(target)
+        elif target.exists() or target.is_symlink():
+            target.unlink()
+        os.replace(entry, target)
+
+
+def download_and_extract(
+    url: str,
+    dest_dir,
+    sha256: Optional[str] = None,
+    cache: Optional[DownloadCache] = None,
+) -> Path:
+    """
+    下载并解压归档，tar 归档在下载的同时解压
+
+    先解压到 dest_dir 旁的临时目录，下载完成且 sha256 校验通过后才移入 dest_dir，
+    校验失败时抛出 ChecksumError，dest_dir 不会被修改。
+    """
+    dest_dir = Path(dest_dir)
+    dest_dir.parent.mkdir(parents=True, exist_ok=True)
+    # 与 dest_dir 在同一文件系统，移动时无需复制
+    staging_dir = Path(
+        tempfile.mkdtemp(prefix=f".{dest_dir.name}.", dir=dest_dir.parent)
+    )
+    try:
+        consume = None
+        if not url.endswith(".zip"):
+
+            def consume(stream):
+                # 重试时丢弃上一次解压了一部分的内容
+                _reset_dir(staging_dir)
+                with tarfile.open(fileobj=stream, mode="r|*") as tar_ref:
+                    _extract_tar(tar_ref, staging_dir)
+
+        path, streamed = _download(url, sha256, cache, consume)
+        if not streamed:
+            # 缓存命中、续传或 zip 归档，从完整的文件解压
+            _reset_dir(staging_dir)
+            extract_archive(path, staging_dir, url)
+        _move_contents(staging_dir, dest_dir)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    return path
+
+
+def download_pip_wheel(dest_dir) -> Path:
+    """下载固定版本的 pip wheel 到 dest_dir，返回 wheel 路径"""
+    dest_path = Path(dest_dir) / PIP_WHEEL_URL.rsplit("/", 1)[-1]
+    return download_to(PIP_WHEEL_URL, dest_path, sha256=PIP_WHEEL_SHA256)
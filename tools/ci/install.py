@@ -1,8 +1,13 @@
 from pathlib import Path
+from typing import Dict, Union
 
+import io
 import shutil
 import sys
 import json
+import hashlib
+import zipfile
+import compileall
 
 import os
 import sys
@@ -12,79 +17,332 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(script_dir)
 
 from configure import configure_ocr_model
+from resource_utils import Bundle, bundle_label, interface_overrides, iter_templates
 
 working_dir = Path(__file__).parent.parent.parent
 install_path = working_dir / Path("install")
-version = len(sys.argv) > 1 and sys.argv[1] or "v0.0.1"
+positional_args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+version = positional_args and positional_args[0] or "v0.0.1"
+# 将 agent 模块打包为 agent.zip（同时包含源码与字节码，源码供 zipimport 回退和 inspect 读取），
+# 减少首次启动编译和文件访问
+pack_agent_zip = "--agent-zip" in sys.argv
+# 为 interface.json 中的每个 resource 预设生成一个预先叠加好的资源目录
+merge_resource = "--merge-resource" in sys.argv
+# 源文件与安装目录在同一文件系统时使用硬链接代替复制（不要直接修改安装目录中的文件）
+use_hardlink = "--hardlink" in sys.argv
+
+# agent 的入口脚本，始终以源码形式安装
+AGENT_ENTRY_SCRIPTS = ["main.py", "supervisor.py"]
+AGENT_ZIP_NAME = "agent.zip"
+
+# 每个安装目标的清单：安装路径 -> 源文件的哈希、大小与修改时间，用于增量安装
+MANIFEST_DIR = working_dir / ".cache" / "install"
+
+# 安装目标中的文件：相对路径 -> 源文件，或直接生成的文件内容
+InstallFiles = Dict[str, Union[Path, bytes]]
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tree_files(source_dir: Path, prefix: str = "", ignore=None) -> InstallFiles:
+    """列出目录下的所有文件，ignore 与 shutil.copytree 的参数相同"""
+    files = {}
+    for root, dirs, names in os.walk(source_dir):
+        ignored = ignore(root, dirs + names) if ignore else set()
+        dirs[:] = sorted(d for d in dirs if d not in ignored)
+        for name in sorted(names):
+            if name in ignored:
+                continue
+            path = Path(root) / name
+            files[prefix + path.relative_to(source_dir).as_posix()] = path
+    return files
+
+
+def install_file(source: Union[Path, bytes], target: Path, link_to: Path = None):
+    """link_to 为已安装的相同文件时直接创建硬链接，不再复制一份"""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # 先删除旧文件，避免写入到之前创建的硬链接（即源文件）中
+    if target.is_file() or target.is_symlink():
+        target.unlink()
+
+    if isinstance(source, bytes):
+        target.write_bytes(source)
+        return
+    if link_to is not None:
+        try:
+            os.link(link_to, target)
+            return
+        except OSError:
+            pass
+    if use_hardlink:
+        try:
+            os.link(source, target)
+            return
+        except OSError:
+            # 跨文件系统等情况回退为复制
+            pass
+    shutil.copy2(source, target)
+
+
+def sync_files(name: str, target_dir: Path, files: InstallFiles):
+    """
+    增量安装一个目标：只复制新增或内容变化的文件，并删除上次安装后已不存在的文件
+
+    源文件的大小与修改时间和清单一致时直接跳过，否则比较内容哈希。
+    """
+    manifest_path = MANIFEST_DIR / f"{name}.json"
+    old_entries = {}
+    if manifest_path.exists():
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("target") == str(target_dir.resolve()):
+            old_entries = manifest.get("files", {})
+
+    entries = {}
+    updated = 0
+    # 同一源文件安装到多个位置时（如叠加资源中每个预设的 model），之后的位置硬链接到第一个
+    first_targets = {}
+    for relative, source in files.items():
+        target = target_dir / relative
+        old = old_entries.get(relative)
+
+        link_to = None
+        if isinstance(source, Path):
+            link_to = first_targets.setdefault(source, target)
+            if link_to == target:
+                link_to = None
+
+        if isinstance(source, bytes):
+            entry = {"sha256": hashlib.sha256(source).hexdigest(), "size": len(source)}
+        else:
+            stat = source.stat()
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            if (
+                old
+                and old.get("mtime_ns") == entry["mtime_ns"]
+                and old.get("size") == entry["size"]
+                and target.is_file()
+                and target.stat().st_size == entry["size"]
+            ):
+                entries[relative] = old
+                continue
+            entry["sha256"] = file_sha256(source)
+
+        entries[relative] = entry
+        if (
+            old
+            and old.get("sha256") == entry["sha256"]
+            and target.is_file()
+            and target.stat().st_size == entry["size"]
+        ):
+            continue
+        install_file(source, target, link_to)
+        updated += 1
+
+    removed = 0
+    for relative in old_entries.keys() - entries.keys():
+        target = target_dir / relative
+        if target.is_file():
+            target.unlink()
+            removed += 1
+        # 清理变为空的目录
+        parent = target.parent
+        while parent != target_dir and parent.is_dir() and not any(parent.iterdir()):
+            parent.rmdir()
+            parent = parent.parent
+
+    MANIFEST_DIR.mkdir(parents=True, exist_ok=True)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"target": str(target_dir.resolve()), "files": entries}, f)
+
+    print(
+        f"[{name}] {len(files)} files: {updated} updated, "
+        f"{len(files) - updated} unchanged, {removed} removed"
+    )
 
 
 def install_deps():
-    shutil.copytree(
-        working_dir / "deps" / "bin",
+    sync_files(
+        "deps",
         install_path,
-        ignore=shutil.ignore_patterns(
-            "*MaaDbgControlUnit*",
-            "*MaaThriftControlUnit*",
-            "*MaaWin32ControlUnit*",
-            "*MaaRpc*",
-            "*MaaHttp*",
+        tree_files(
+            working_dir / "deps" / "bin",
+            ignore=shutil.ignore_patterns(
+                "*MaaDbgControlUnit*",
+                "*MaaThriftControlUnit*",
+                "*MaaWin32ControlUnit*",
+                "*MaaRpc*",
+                "*MaaHttp*",
+            ),
         ),
-        dirs_exist_ok=True,
     )
-    shutil.copytree(
-        working_dir / "deps" / "share" / "MaaAgentBinary",
+    sync_files(
+        "MaaAgentBinary",
         install_path / "MaaAgentBinary",
-        dirs_exist_ok=True,
+        tree_files(working_dir / "deps" / "share" / "MaaAgentBinary"),
     )
 
 
-def install_resource():
+def merged_templates(dirs: list, templates: set, files: InstallFiles, prefix: str):
+    """按叠加顺序加入被引用的图片，后加载的目录覆盖先加载的，返回找不到的图片"""
+    missing = []
+    for template in sorted(templates):
+        found = False
+        for resource_dir in dirs:
+            source = resource_dir / "image" / template
+            if source.is_dir():
+                # 目录模板会加载其中的所有图片
+                files.update(tree_files(source, f"{prefix}{template}/"))
+            elif source.is_file():
+                files[prefix + template] = source
+            else:
+                continue
+            found = True
+        if not found:
+            missing.append(template)
+    return missing
 
-    configure_ocr_model()
 
-    shutil.copytree(
-        working_dir / "assets" / "resource",
-        install_path / "resource",
-        dirs_exist_ok=True,
-    )
-    shutil.copy2(
-        working_dir / "assets" / "interface.json",
-        install_path,
+def merged_bundle_files(dirs: list, label: str, extra_templates: set) -> InstallFiles:
+    """
+    将按顺序加载的多个资源目录叠加为一个目录，叠加规则与 MaaFramework 一致:
+    pipeline 合并为一个压缩的 JSON，image 只保留被引用的图片，其余内容（如 model）按顺序覆盖。
+    多个预设共用的 model 等文件由 sync_files 硬链接为同一份，不会重复占用空间
+    """
+    bundle = Bundle(dirs)
+    files = {}
+
+    for resource_dir in bundle.dirs:
+        for entry in resource_dir.iterdir():
+            if entry.name in ("pipeline", "image", "default_pipeline.json"):
+                continue
+            if entry.is_dir():
+                files.update(tree_files(entry, f"{label}/{entry.name}/"))
+            else:
+                files[f"{label}/{entry.name}"] = entry
+
+    def minified(data) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+    files[f"{label}/pipeline/pipeline.json"] = minified(bundle.nodes)
+    if bundle.defaults:
+        files[f"{label}/default_pipeline.json"] = minified(bundle.defaults)
+
+    templates = set(iter_templates([bundle.nodes, bundle.defaults])) | extra_templates
+    missing = merged_templates(bundle.dirs, templates, files, f"{label}/image/")
+    for template in missing:
+        print(f"Warning: template {template} not found in {bundle.label}")
+
+    print(
+        f"Merged {bundle.label}: {len(bundle.nodes)} nodes, "
+        f"{len(templates) - len(missing)} templates"
     )
+    return files
 
-    with open(install_path / "interface.json", "r", encoding="utf-8") as f:
-        interface = json.load(f)
+
+def merged_resource_files(interface: dict) -> InstallFiles:
+    """
+    为每个 resource 预设生成一个叠加后的资源目录，未被预设使用的目录（如 announcement）原样安装，
+    并将预设的 path 改为叠加后的目录
+    """
+    source_dir = working_dir / "assets" / "resource"
+    # interface 中 pipeline_override 引用的图片在运行时才会用到，每个资源集都需要保留
+    extra_templates = set(iter_templates(interface_overrides(interface)))
+
+    files = {}
+    labels = set()
+    used_dirs = set()
+    for preset in interface.get("resource", []):
+        dirs = [
+            Path(path.replace("{PROJECT_DIR}", str(working_dir / "assets")))
+            for path in preset.get("path", [])
+        ]
+        label = bundle_label(dirs)
+        if label not in labels:
+            files.update(merged_bundle_files(dirs, label, extra_templates))
+            labels.add(label)
+        preset["path"] = [f"{{PROJECT_DIR}}/resource/{label}"]
+        used_dirs.update(d.resolve() for d in dirs)
+
+    for entry in source_dir.iterdir():
+        if entry.is_dir() and entry.resolve() not in used_dirs:
+            files.update(tree_files(entry, f"{entry.name}/"))
+
+    return files
+
+
+def install_resource(interface: dict):
+
+    configure_ocr_model()
+
+    if merge_resource:
+        files = merged_resource_files(interface)
+    else:
+        files = tree_files(working_dir / "assets" / "resource")
+    sync_files("resource", install_path / "resource", files)
 
     interface["version"] = version
     interface["custom_title"] = f"M9A {version} | 亿韭韭韭小助手"
 
-    with open(install_path / "interface.json", "w", encoding="utf-8") as f:
-        json.dump(interface, f, ensure_ascii=False, indent=4)
-
 
 def install_chores():
+    files = {}
     for file in ["README.md", "LICENSE", "requirements.txt"]:
-        shutil.copy2(
-            working_dir / file,
-            install_path,
+        files[file] = working_dir / file
+    files.update(
+        tree_files(
+            working_dir / "docs", "docs/", ignore=shutil.ignore_patterns("*.yaml")
         )
-    shutil.copytree(
-        working_dir / "docs",
-        install_path / "docs",
-        dirs_exist_ok=True,
-        ignore=shutil.ignore_patterns("*.yaml"),
     )
+    sync_files("chores", install_path, files)
 
 
-def install_agent():
-    shutil.copytree(
-        working_dir / "agent",
-        install_path / "agent",
-        dirs_exist_ok=True,
-    )
+def compile_agent(agent_dir: Path):
+    """使用当前（目标）解释器预编译 agent 模块"""
+    if not compileall.compile_dir(str(agent_dir), quiet=1):
+        raise RuntimeError(f"预编译 {agent_dir} 失败")
 
-    with open(install_path / "interface.json", "r", encoding="utf-8") as f:
-        interface = json.load(f)
+
+def pack_agent() -> InstallFiles:
+    """入口脚本保留源码，其余模块连同字节码打包为 agent.zip，由 main.py 加入 sys.path"""
+    source_dir = working_dir / "agent"
+    files = {script: source_dir / script for script in AGENT_ENTRY_SCRIPTS}
+
+    # zip 中的时间戳来自源文件，源码未变化时生成的内容相同，不会重新安装
+    buffer = io.BytesIO()
+    with zipfile.PyZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        for package in sorted(source_dir.iterdir()):
+            if not package.is_dir() or not (package / "__init__.py").exists():
+                continue
+            # 同时保留源码：运行时解释器版本与打包时不一致时，zipimport 会回退到源码
+            for source in sorted(package.rglob("*.py")):
+                if "__pycache__" not in source.parts:
+                    zip_file.write(source, source.relative_to(source_dir).as_posix())
+            zip_file.writepy(str(package))
+    files[AGENT_ZIP_NAME] = buffer.getvalue()
+    return files
+
+
+def install_agent(interface: dict):
+    if pack_agent_zip:
+        sync_files("agent", install_path / "agent", pack_agent())
+    else:
+        sync_files(
+            "agent",
+            install_path / "agent",
+            tree_files(
+                working_dir / "agent",
+                ignore=shutil.ignore_patterns("__pycache__", "*.pyc"),
+            ),
+        )
+        # 字节码中记录了源文件的修改时间，未变化的模块不会重新编译
+        compile_agent(install_path / "agent")
 
     if sys.platform.startswith("win"):
         interface["agent"]["child_exec"] = r"{PROJECT_DIR}/python/python.exe"
@@ -95,14 +353,21 @@ def install_agent():
 
     interface["agent"]["child_args"] = ["-u", r"{PROJECT_DIR}/agent/main.py"]
 
-    with open(install_path / "interface.json", "w", encoding="utf-8") as f:
-        json.dump(interface, f, ensure_ascii=False, indent=4)
+
+def install_interface(interface: dict):
+    """interface.json 只在所有修改完成后写入一次，内容不变时不会重写"""
+    data = json.dumps(interface, ensure_ascii=False, indent=4).encode("utf-8")
+    sync_files("interface", install_path, {"interface.json": data})
 
 
 if __name__ == "__main__":
+    with open(working_dir / "assets" / "interface.json", "r", encoding="utf-8") as f:
+        interface = json.load(f)
+
     install_deps()
-    install_resource()
+    install_resource(interface)
     install_chores()
-    install_agent()
+    install_agent(interface)
+    install_interface(interface)
 
     print(f"Install to {install_path} successfully.")
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pipeline 识别开销静态检查
+
+按 interface.json 的 resource 预设叠加资源后，根据 next / interrupt / on_error 构建节点图，
+估算每个节点停留时每一轮（tick）需要执行的识别开销，并按开销从高到低排列。
+
+检查项:
+  no-roi              模板匹配 / OCR 等识别未设置 roi，每次都在全屏上执行
+  long-next           next + interrupt 过长，每一轮都要依次识别
+  unreachable         无法从任何任务入口到达的节点
+  missing-target      跳转到不存在的节点
+  multi-operand       MultiRecognition 中重复、未使用或越界的操作数
+  count-costly        Count 包装了开销较大的识别（每次调用都会 override_pipeline 后重新识别）
+
+开销为相对值：全屏模板匹配一张图记为 10，DirectHit 为 0。
+
+用法:
+    python tools/ci/lint_pipeline.py [--interface assets/interface.json] [--preset 名称]
+                                     [--top N] [--max-next N] [--json 输出.json] [--strict]
+"""
+
+import re
+import sys
+import json
+import argparse
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Set
+
+sys.stdout.reconfigure(encoding="utf-8")
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from resource_utils import (
+    SCREEN_HEIGHT,
+    SCREEN_WIDTH,
+    Bundle,
+    as_list,
+    custom_param,
+    interface_bundles,
+    load_interface,
+    template_paths,
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+DEFAULT_INTERFACE = PROJECT_ROOT / "assets" / "interface.json"
+
+# 各识别类型在全屏上执行一次的相对开销
+RECOGNITION_COST = {
+    "DirectHit": 0.0,
+    "ColorMatch": 4.0,
+    "TemplateMatch": 10.0,
+    "NeuralNetworkClassify": 15.0,
+    "OCR": 30.0,
+    "FeatureMatch": 40.0,
+    "NeuralNetworkDetect": 50.0,
+}
+# 其它自定义识别的默认开销（无法静态分析）
+CUSTOM_COST = 5.0
+# 自定义识别自身的 Python 开销
+CUSTOM_OVERHEAD = 1.0
+# roi 为节点名（使用其它节点的识别结果）时，估计的面积占比
+DYNAMIC_ROI_FRACTION = 0.25
+# 需要设置 roi 的识别类型
+ROI_RECOMMENDED = {
+    "TemplateMatch",
+    "FeatureMatch",
+    "OCR",
+    "NeuralNetworkClassify",
+    "NeuralNetworkDetect",
+}
+# Count 包装的识别开销超过该值时提示
+COUNT_COST_THRESHOLD = 5.0
+
+
+@dataclass
+class Finding:
+    node: str
+    code: str
+    severity: str
+    message: str
+
+
+def roi_fraction(roi) -> float:
+    """roi 占全屏的面积比例"""
+    if isinstance(roi, str):
+        return DYNAMIC_ROI_FRACTION
+    if isinstance(roi, (list, tuple)) and len(roi) == 4:
+        width, height = roi[2], roi[3]
+        if width > 0 and height > 0:
+            return min(1.0, (width * height) / (SCREEN_WIDTH * SCREEN_HEIGHT))
+    return 1.0
+
+
+def is_full_screen(param: dict) -> bool:
+    roi = param.get("roi")
+    return roi is None or (isinstance(roi, list) and roi == [0, 0, 0, 0])
+
+
+class PipelineLinter:
+    def __init__(self, bundle: Bundle, entries: List[str], max_next: int = 8):
+        self.bundle = bundle
+        self.entries = entries
+        self.max_next = max_next
+        self.findings: List[Finding] = []
+        self._cost_cache: Dict[str, float] = {}
+
+    def add(self, node: str, code: str, severity: str, message: str):
+        self.findings.append(Finding(node, code, severity, message))
+
+    # 开销估算
+
+    def recognition_cost(self, reco_type: str, param: dict, stack=()) -> float:
+        if reco_type in ("And", "Or"):
+            key = "all_of" if reco_type == "And" else "any_of"
+            return sum(
+                self._sub_cost(sub, stack) for sub in as_list(param.get(key))
+            )
+
+        if reco_type == "Custom":
+            name = param.get("custom_recognition")
+            custom = custom_param(param, "custom_recognition_param")
+            if name == "MultiRecognition":
+                operands = as_list(custom.get("nodes"))
+                return CUSTOM_OVERHEAD + sum(
+                    self.node_cost(node, stack) for node in operands
+                )
+            if name == "Count":
+                inner = custom.get("recognition", {"type": "DirectHit"})
+                return CUSTOM_OVERHEAD + self._sub_cost(inner, stack)
+            return CUSTOM_COST
+
+        weight = RECOGNITION_COST.get(reco_type, CUSTOM_COST)
+        if reco_type in ("TemplateMatch", "FeatureMatch"):
+            weight *= max(1, len(template_paths(param)))
+        return weight * roi_fraction(param.get("roi"))
+
+    def _sub_cost(self, sub, stack) -> float:
+        """And / Or / Count 中的子识别，可以是节点名或内联的识别"""
+        if isinstance(sub, str):
+            return self.node_cost(sub, stack)
+        if isinstance(sub, dict):
+            return self.recognition_cost(
+                sub.get("type", "DirectHit"), sub.get("param", {}) or {}, stack
+            )
+        return 0.0
+
+    def node_cost(self, name: str, stack=()) -> float:
+        """识别一次该节点的开销"""
+        if name in self._cost_cache:
+            return self._cost_cache[name]
+        if name in stack or name not in self.bundle.nodes:
+            return 0.0
+        reco_type, param = self.bundle.recognition(name)
+        cost = self.recognition_cost(reco_type, param, (*stack, name))
+        self._cost_cache[name] = cost
+        return cost
+
+    def candidates(self, name: str) -> List[str]:
+        """停留在该节点时每一轮需要识别的节点"""
+        return [
+            target
+            for key, target in self.bundle.edges(name)
+            if key in ("next", "interrupt")
+        ]
+
+    def tick_cost(self, name: str) -> float:
+        # 最坏情况下 next 与 interrupt 中的节点全部识别一遍
+        return sum(self.node_cost(target) for target in self.candidates(name))
+
+    # 检查项
+
+    def reachable(self) -> Set[str]:
+        seen = set()
+        stack = [entry for entry in self.entries if entry in self.bundle.nodes]
+        default_on_error = self.bundle.defaults.get("Default", {}).get("on_error")
+        stack.extend(as_list(default_on_error))
+        while stack:
+            name = stack.pop()
+            if name in seen or name not in self.bundle.nodes:
+                continue
+            seen.add(name)
+            stack.extend(target for _, target in self.bundle.edges(name))
+        return seen
+
+    def referenced_by_recognition(self) -> Set[str]:
+        """作为识别操作数被引用的节点（MultiRecognition / And / Or）"""
+        used = set()
+        for name in self.bundle.nodes:
+            reco_type, param = self.bundle.recognition(name)
+            if reco_type in ("And", "Or"):
+                used.update(
+                    s for s in as_list(param.get("all_of", param.get("any_of")))
+                    if isinstance(s, str)
+                )
+            elif (
+                reco_type == "Custom"
+                and param.get("custom_recognition") == "MultiRecognition"
+            ):
+                custom = custom_param(param, "custom_recognition_param")
+                used.update(
+                    n for n in as_list(custom.get("nodes")) if isinstance(n, str)
+                )
+        return used
+
+    def check_graph(self):
+        reachable = self.reachable()
+        used = self.referenced_by_recognition()
+        for name in self.bundle.nodes:
+            for key, target in self.bundle.edges(name):
+                if target not in self.bundle.nodes:
+                    self.add(
+                        name,
+                        "missing-target",
+                        "error",
+                        f"{key} 指向不存在的节点 {target}",
+                    )
+
+            if name not in reachable and name not in used:
+                self.add(name, "unreachable", "info", "无法从任务入口到达")
+
+            candidates = self.candidates(name)
+            if len(candidates) > self.max_next:
+                self.add(
+                    name,
+                    "long-next",
+                    "warning",
+                    f"next + interrupt 共 {len(candidates)} 个节点，"
+                    f"每一轮最多需要识别 {len(candidates)} 次，考虑拆分或调整顺序",
+                )
+
+    def check_roi(self, name: str, reco_type: str, param: dict, where: str = ""):
+        if reco_type in ROI_RECOMMENDED and is_full_screen(param):
+            self.add(
+                name,
+                "no-roi",
+                "warning",
+                f"{where}{reco_type} 未设置 roi，在全屏上识别"
+                f"（估计开销 {self.recognition_cost(reco_type, param):.1f}）",
+            )
+
+    def check_multi(self, name: str, custom: dict):
+        nodes = as_list(custom.get("nodes"))
+        duplicates = sorted({n for n in nodes if nodes.count(n) > 1})
+        if duplicates:
+            self.add(name, "multi-operand", "warning", f"重复的操作数: {duplicates}")
+
+        logic = custom.get("logic", {"type": "AND"})
+        expressions = [str(custom.get("return", ""))]
+        is_custom_logic = logic.get("type", "AND") == "CUSTOM"
+        if is_custom_logic:
+            expressions.append(logic.get("expression", ""))
+        referenced = {int(i) for e in expressions for i in re.findall(r"\$(\d+)", e)}
+
+        # AND / OR 会用到全部操作数，只有自定义表达式可能遗漏
+        if is_custom_logic:
+            unused = [
+                f"${i}({nodes[i]})" for i in range(len(nodes)) if i not in referenced
+            ]
+            if unused:
+                self.add(
+                    name,
+                    "multi-operand",
+                    "warning",
+                    f"表达式中未使用的操作数仍会被识别: {', '.join(unused)}",
+                )
+
+        out_of_range = sorted(i for i in referenced if i >= len(nodes))
+        if out_of_range:
+            self.add(
+                name,
+                "multi-operand",
+                "error",
+                f"引用了不存在的操作数: {['$' + str(i) for i in out_of_range]}",
+            )
+        if len(nodes) > 10:
+            self.add(
+                name,
+                "multi-operand",
+                "warning",
+                "操作数超过 10 个，$1 会与 $10 等前缀冲突，导致表达式替换错误",
+            )
+
+    def check_nodes(self):
+        for name in self.bundle.nodes:
+            reco_type, param = self.bundle.recognition(name)
+            self.check_roi(name, reco_type, param)
+
+            if reco_type != "Custom":
+                continue
+            custom_name = param.get("custom_recognition")
+            custom = custom_param(param, "custom_recognition_param")
+            if custom_name == "MultiRecognition":
+                self.check_multi(name, custom)
+            elif custom_name == "Count":
+                inner = custom.get("recognition", {"type": "DirectHit"})
+                if isinstance(inner, dict):
+                    inner_type = inner.get("type", "DirectHit")
+                    inner_param = inner.get("param", {}) or {}
+                    self.check_roi(name, inner_type, inner_param, "Count 中的 ")
+                    inner_cost = self.recognition_cost(inner_type, inner_param)
+                    if inner_cost >= COUNT_COST_THRESHOLD:
+                        self.add(
+                            name,
+                            "count-costly",
+                            "warning",
+                            f"Count 包装了开销 {inner_cost:.1f} 的 {inner_type}，"
+                            "每次调用都会 override_pipeline 并重新识别，"
+                            "考虑缩小 roi 或将识别放到前置节点",
+                        )
+
+    def run(self) -> List[dict]:
+        self.check_graph()
+        self.check_nodes()
+
+        findings = {}
+        for finding in self.findings:
+            findings.setdefault(finding.node, []).append(asdict(finding))
+
+        ranking = [
+            {
+                "node": name,
+                "tick_cost": round(self.tick_cost(name), 2),
+                "recognition_cost": round(self.node_cost(name), 2),
+                "candidates": len(self.candidates(name)),
+                "source": str(self.bundle.sources.get(name, "")),
+                "findings": findings.get(name, []),
+            }
+            for name in self.bundle.nodes
+        ]
+        ranking.sort(
+            key=lambda item: (
+                -item["tick_cost"],
+                -item["recognition_cost"],
+                item["node"],
+            )
+        )
+        return ranking
+
+
+def print_report(preset: str, bundle: Bundle, ranking: List[dict], top: int):
+    print(f"\n=== {preset} ({bundle.label})，共 {len(ranking)} 个节点 ===")
+    print(f"{'排名':<4} {'每轮开销':>8} {'识别开销':>8} {'候选':>4}  节点")
+    for index, item in enumerate(ranking[:top], 1):
+        print(
+            f"{index:<6} {item['tick_cost']:>10.2f} {item['recognition_cost']:>10.2f} "
+            f"{item['candidates']:>6}  {item['node']}"
+        )
+
+    findings = [f for item in ranking for f in item["findings"]]
+    if not findings:
+        print("未发现问题")
+        return
+    print(f"\n发现 {len(findings)} 个问题（按节点开销排序）:")
+    for finding in findings:
+        print(
+            f"  [{finding['severity']}] {finding['node']}: "
+            f"{finding['code']} - {finding['message']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pipeline 识别开销静态检查")
+    parser.add_argument("--interface", type=Path, default=DEFAULT_INTERFACE)
+    parser.add_argument("--preset", action="append", help="只检查指定的资源预设")
+    parser.add_argument("--top", type=int, default=20, help="输出开销最高的前 N 个节点")
+    parser.add_argument(
+        "--max-next", type=int, default=8, help="next + interrupt 超过该数量时提示"
+    )
+    parser.add_argument("--json", type=Path, help="将完整结果写入 JSON 文件")
+    parser.add_argument("--strict", action="store_true", help="存在 error 时返回 1")
+    args = parser.parse_args()
+
+    interface = load_interface(args.interface)
+    entries = [task["entry"] for task in interface.get("task", []) if "entry" in task]
+
+    results = {}
+    has_error = False
+    for preset, dirs in interface_bundles(args.interface).items():
+        if args.preset and preset not in args.preset:
+            continue
+        bundle = Bundle(dirs)
+        ranking = PipelineLinter(bundle, entries, args.max_next).run()
+        print_report(preset, bundle, ranking, args.top)
+        results[preset] = {"bundle": bundle.label, "nodes": ranking}
+        has_error |= any(
+            f["severity"] == "error" for item in ranking for f in item["findings"]
+        )
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+
+    if args.strict and has_error:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
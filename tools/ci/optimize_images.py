@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模板图片检查与压缩
+
+扫描 assets/resource/*/image 下的模板图片:
+  byte-duplicate      内容完全相同的文件（包括 overlay 中与 base 相同、可以直接删除的图片）
+  pixel-duplicate     编码不同但像素完全相同的文件
+  crop                透明边缘较多，可以裁剪到实际使用区域的模板
+                      （被 green_mask 节点引用的模板，纯绿像素也视为空白）
+  unreferenced        没有被任何 pipeline 节点或 interface pipeline_override 引用的图片
+
+同时统计 PNG 以最优压缩重新保存后可节省的体积，指定 --write 时写回
+（只写回像素完全一致且体积更小的结果）。裁剪会改变匹配框的位置，只输出建议，不会自动修改。
+
+用法:
+    python tools/ci/optimize_images.py [--interface assets/interface.json]
+                                       [--write] [-j N] [--min-crop 0.2]
+                                       [--json 输出.json] [--strict]
+"""
+
+import io
+import sys
+import json
+import hashlib
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from PIL import Image, ImageChops
+
+sys.stdout.reconfigure(encoding="utf-8")
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from resource_utils import (
+    Bundle,
+    interface_bundles,
+    interface_overrides,
+    iter_green_mask_templates,
+    iter_templates,
+    load_interface,
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+DEFAULT_INTERFACE = PROJECT_ROOT / "assets" / "interface.json"
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp")
+
+# green_mask 时不参与匹配的颜色
+MASK_COLOR = (0, 255, 0)
+
+
+def used_bbox(
+    image: Image.Image, green_mask: bool
+) -> Optional[Tuple[int, int, int, int]]:
+    """
+    去掉透明像素后的包围盒，green_mask 为 True 时同时去掉纯绿像素，
+    全部为空白时返回 None，没有可去掉的像素时返回整张图片
+    """
+    mask = None
+    if green_mask:
+        rgb = image.convert("RGB")
+        mask = ImageChops.difference(rgb, Image.new("RGB", rgb.size, MASK_COLOR))
+        mask = mask.convert("L").point(lambda v: 255 if v else 0)
+    if "A" in image.getbands() or "transparency" in image.info:
+        alpha = image.convert("RGBA").getchannel("A")
+        mask = alpha if mask is None else ImageChops.darker(mask, alpha)
+    if mask is None:
+        return (0, 0, image.width, image.height)
+    return mask.getbbox()
+
+
+def analyze_image(path: Path, write: bool, green_mask: bool) -> dict:
+    """在子进程中计算哈希、裁剪区域和重新压缩后的体积"""
+    data = path.read_bytes()
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        width, height = image.size
+        pixels = image.convert("RGBA").tobytes()
+        bbox = used_bbox(image, green_mask)
+
+        optimized_size = len(data)
+        if path.suffix.lower() == ".png":
+            buffer = io.BytesIO()
+            params = {"optimize": True}
+            if "transparency" in image.info:
+                params["transparency"] = image.info["transparency"]
+            image.save(buffer, format="PNG", **params)
+            optimized = buffer.getvalue()
+            # 只接受像素完全一致的结果
+            with Image.open(io.BytesIO(optimized)) as check:
+                same = check.convert("RGBA").tobytes() == pixels
+            if same and len(optimized) < len(data):
+                optimized_size = len(optimized)
+                if write:
+                    path.write_bytes(optimized)
+
+    return {
+        "path": str(path),
+        "size": len(data),
+        "optimized_size": optimized_size,
+        "width": width,
+        "height": height,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "pixels": hashlib.sha256(f"{width}x{height}".encode() + pixels).hexdigest(),
+        "bbox": list(bbox) if bbox else None,
+    }
+
+
+def iter_images(image_dir: Path):
+    for path in sorted(image_dir.rglob("*")):
+        if path.is_file() and path.suffix.lower() in IMAGE_SUFFIXES:
+            yield path
+
+
+def resource_dirs(interface_path: Path, bundles: Dict[str, List[Path]]) -> List[Path]:
+    """interface 预设中的资源目录，以及 resource 下其它带 image 的目录"""
+    dirs = {d.resolve() for paths in bundles.values() for d in paths}
+    resource_root = interface_path.resolve().parent / "resource"
+    if resource_root.is_dir():
+        dirs.update(d.resolve() for d in resource_root.iterdir() if d.is_dir())
+    return sorted(d for d in dirs if (d / "image").is_dir())
+
+
+def resolve_template(dirs: List[Path], template: str) -> List[Path]:
+    """叠加时同名图片以后加载的目录为准，目录模板引用其中的所有图片"""
+    for resource_dir in reversed(dirs):
+        source = (resource_dir / "image" / template).resolve()
+        if source.is_file():
+            return [source]
+        if source.is_dir():
+            return list(iter_images(source))
+    return []
+
+
+def collect_references(
+    bundles: Dict[str, List[Path]], extra: Set[str]
+) -> Dict[Path, Set[str]]:
+    """图片文件 -> 引用它的节点（"预设: 节点名"）"""
+    references = defaultdict(set)
+    for preset, dirs in bundles.items():
+        bundle = Bundle(dirs)
+        users = defaultdict(set)
+        for name, node in bundle.nodes.items():
+            for template in iter_templates(node):
+                users[template].add(f"{preset}: {name}")
+        for template in extra:
+            users[template].add(f"{preset}: interface")
+
+        for template, nodes in users.items():
+            for path in resolve_template(bundle.dirs, template):
+                references[path] |= nodes
+    return references
+
+
+def collect_green_masked(
+    bundles: Dict[str, List[Path]], overrides: List[dict]
+) -> Set[Path]:
+    """被设置了 green_mask: true 的识别引用的图片，纯绿像素在匹配时会被忽略"""
+    masked = set()
+    for dirs in bundles.values():
+        bundle = Bundle(dirs)
+        templates = set(iter_green_mask_templates([bundle.nodes, overrides]))
+        for template in templates:
+            masked.update(resolve_template(bundle.dirs, template))
+    return masked
+
+
+def relative(path: Path) -> str:
+    try:
+        return Path(path).resolve().relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def find_duplicates(images: List[dict], key: str) -> List[List[dict]]:
+    groups = defaultdict(list)
+    for image in images:
+        groups[image[key]].append(image)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def find_redundant_overlays(
+    images: List[dict], bundles: Dict[str, List[Path]]
+) -> List[dict]:
+    """
+    overlay 中与先加载的目录同名且内容相同的图片，叠加后没有任何效果。
+
+    按每个预设的加载顺序比较：图片只与该预设中在它之前最后加载的同名图片比较，
+    且在所有加载了它所在目录的预设中都与之前的图片相同时，才可以删除。
+    """
+    by_path = {Path(image["path"]): image for image in images}
+    verdicts: Dict[Path, bool] = {}
+    for dirs in bundles.values():
+        # 模板名 -> 当前已加载目录中生效的图片内容
+        loaded: Dict[str, str] = {}
+        for resource_dir in dirs:
+            image_dir = resource_dir.resolve() / "image"
+            if not image_dir.is_dir():
+                continue
+            current = {}
+            for path in iter_images(image_dir):
+                image = by_path.get(path)
+                if image is None:
+                    continue
+                name = path.relative_to(image_dir).as_posix()
+                same = loaded.get(name) == image["sha256"]
+                verdicts[path] = verdicts.get(path, True) and same
+                current[name] = image["sha256"]
+            loaded.update(current)
+
+    return [image for path, image in by_path.items() if verdicts.get(path)]
+
+
+def build_report(
+    images: List[dict],
+    references: Dict[Path, Set[str]],
+    bundles: Dict[str, List[Path]],
+    min_crop: float,
+) -> dict:
+    for image in images:
+        image["references"] = sorted(references.get(Path(image["path"]), ()))
+
+    byte_groups = find_duplicates(images, "sha256")
+    # 字节相同的文件像素必然相同，像素重复只保留编码不同的组
+    pixel_groups = [
+        group
+        for group in find_duplicates(images, "pixels")
+        if len({image["sha256"] for image in group}) > 1
+    ]
+
+    redundant = find_redundant_overlays(images, bundles)
+
+    crops = []
+    for image in images:
+        area = image["width"] * image["height"]
+        bbox = image["bbox"]
+        if not area or not bbox:
+            continue
+        used = (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
+        saving = 1 - used / area
+        if saving >= min_crop:
+            crops.append({**image, "saving": round(saving, 3)})
+    crops.sort(key=lambda image: -image["saving"])
+
+    def summarize(image: dict) -> dict:
+        return {
+            "path": relative(image["path"]),
+            "size": image["size"],
+            "references": image["references"],
+        }
+
+    return {
+        "images": len(images),
+        "size": sum(image["size"] for image in images),
+        "optimized_size": sum(image["optimized_size"] for image in images),
+        "byte_duplicates": [[summarize(i) for i in g] for g in byte_groups],
+        "pixel_duplicates": [[summarize(i) for i in g] for g in pixel_groups],
+        "redundant_overlays": [relative(image["path"]) for image in redundant],
+        "crops": [
+            {
+                **summarize(image),
+                "from": [image["width"], image["height"]],
+                "bbox": image["bbox"],
+                "saving": image["saving"],
+            }
+            for image in crops
+        ],
+        "unreferenced": [
+            relative(image["path"]) for image in images if not image["references"]
+        ],
+        "references": {
+            relative(image["path"]): image["references"] for image in images
+        },
+    }
+
+
+def print_report(report: dict, write: bool):
+    saved = report["size"] - report["optimized_size"]
+    print(
+        f"共 {report['images']} 张图片，{report['size'] / 1024:.1f} KiB，"
+        f"重新压缩{'后节省' if write else '可节省'} {saved / 1024:.1f} KiB"
+    )
+
+    def print_groups(title: str, groups: List[List[dict]]):
+        if not groups:
+            return
+        print(f"\n{title}（{len(groups)} 组）:")
+        for group in groups:
+            for image in group:
+                refs = ", ".join(image["references"]) or "未引用"
+                print(f"  {image['path']} ({image['size']} B) <- {refs}")
+            print()
+
+    print_groups("内容完全相同的图片", report["byte_duplicates"])
+    print_groups("像素完全相同的图片", report["pixel_duplicates"])
+
+    if report["redundant_overlays"]:
+        print("overlay 中与先加载的目录同名且相同、可以删除的图片:")
+        for path in report["redundant_overlays"]:
+            print(f"  {path}")
+
+    if report["crops"]:
+        print(f"\n可裁剪的模板（透明 / 纯绿边缘，{len(report['crops'])} 张）:")
+        for image in report["crops"]:
+            width, height = image["from"]
+            left, top, right, bottom = image["bbox"]
+            print(
+                f"  {image['path']}: {width}x{height} -> "
+                f"[{left}, {top}, {right - left}, {bottom - top}]，"
+                f"减少 {image['saving']:.0%} 像素"
+            )
+        print("  裁剪后需要相应调整节点的 roi / target_offset")
+
+    if report["unreferenced"]:
+        print(f"\n未被引用的图片（{len(report['unreferenced'])} 张）:")
+        for path in report["unreferenced"]:
+            print(f"  {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模板图片去重、裁剪检查与压缩")
+    parser.add_argument("--interface", type=Path, default=DEFAULT_INTERFACE)
+    parser.add_argument("--write", action="store_true", help="将重新压缩后更小的 PNG 写回")
+    parser.add_argument("-j", "--jobs", type=int, help="并行处理的进程数")
+    parser.add_argument(
+        "--min-crop",
+        type=float,
+        default=0.2,
+        help="可裁剪像素比例不低于该值时提示",
+    )
+    parser.add_argument("--json", type=Path, help="将完整结果写入 JSON 文件")
+    parser.add_argument("--strict", action="store_true", help="存在重复图片时返回 1")
+    args = parser.parse_args()
+
+    bundles = interface_bundles(args.interface)
+    overrides = interface_overrides(load_interface(args.interface))
+    extra = set(iter_templates(overrides))
+    references = collect_references(bundles, extra)
+    green_masked = collect_green_masked(bundles, overrides)
+    paths = [
+        path
+        for resource_dir in resource_dirs(args.interface, bundles)
+        for path in iter_images(resource_dir / "image")
+    ]
+
+    images = []
+    if paths:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            images = list(
+                executor.map(
+                    analyze_image,
+                    paths,
+                    [args.write] * len(paths),
+                    [path in green_masked for path in paths],
+                    chunksize=16,
+                )
+            )
+
+    report = build_report(images, references, bundles, args.min_crop)
+    print_report(report, args.write)
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+
+    if args.strict and (report["byte_duplicates"] or report["pixel_duplicates"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+资源与 pipeline 的读取工具，供 CI 脚本共用
+
+按 interface.json 中 resource 预设的 path 顺序叠加资源目录，与 MaaFramework 加载资源的方式一致:
+  - 同名节点的字段逐个覆盖
+  - recognition / action 的 type 不变时，param 浅合并；type 变化时整体替换
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# 跳转目标前的修饰符，如 "[JumpBack]NodeName"
+TARGET_PREFIXES = ("[JumpBack]", "[Anchor]")
+
+EDGE_FIELDS = ("next", "interrupt", "on_error")
+
+# 默认截图分辨率（短边缩放到 720）
+SCREEN_WIDTH = 1280
+SCREEN_HEIGHT = 720
+
+
+def load_json(path: Path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_interface(interface_path: Path) -> dict:
+    return load_json(interface_path)
+
+
+def interface_bundles(interface_path: Path) -> Dict[str, List[Path]]:
+    """interface.json 中的 resource 预设，预设名 -> 按加载顺序排列的资源目录"""
+    interface = load_interface(interface_path)
+    project_dir = str(Path(interface_path).parent.resolve())
+    return {
+        preset["name"]: [
+            Path(path.replace("{PROJECT_DIR}", project_dir))
+            for path in preset.get("path", [])
+        ]
+        for preset in interface.get("resource", [])
+    }
+
+
+def bundle_label(dirs: List[Path]) -> str:
+    """资源集的简短名称，如 base+bilibili"""
+    return "+".join(Path(d).name for d in dirs)
+
+
+def iter_pipeline_files(resource_dir: Path) -> Iterator[Path]:
+    pipeline_dir = Path(resource_dir) / "pipeline"
+    if pipeline_dir.is_dir():
+        yield from sorted(pipeline_dir.rglob("*.json"))
+
+
+def _merge_typed(base, overlay):
+    """合并 recognition / action 字段"""
+    if not isinstance(base, dict) or not isinstance(overlay, dict):
+        return overlay
+    if overlay.get("type", base.get("type")) != base.get("type"):
+        return overlay
+    merged = {**base, **overlay}
+    if isinstance(base.get("param"), dict) and isinstance(overlay.get("param"), dict):
+        merged["param"] = {**base["param"], **overlay["param"]}
+    return merged
+
+
+def merge_node(base: dict, overlay: dict) -> dict:
+    merged = dict(base)
+    for key, value in overlay.items():
+        if key in ("recognition", "action") and key in base:
+            merged[key] = _merge_typed(base[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class Bundle:
+    """叠加后的资源集"""
+
+    def __init__(self, dirs: List[Path]):
+        self.dirs = [Path(d) for d in dirs]
+        self.label = bundle_label(self.dirs)
+        self.nodes: Dict[str, dict] = {}
+        # 节点名 -> 最后一次定义该节点的文件
+        self.sources: Dict[str, Path] = {}
+        self.defaults: Dict[str, dict] = {}
+        for resource_dir in self.dirs:
+            self._load(resource_dir)
+
+    def _load(self, resource_dir: Path):
+        default_path = resource_dir / "default_pipeline.json"
+        if default_path.exists():
+            for key, value in load_json(default_path).items():
+                self.defaults[key] = merge_node(self.defaults.get(key, {}), value)
+
+        for path in iter_pipeline_files(resource_dir):
+            for name, data in load_json(path).items():
+                if name.startswith("$") or not isinstance(data, dict):
+                    continue
+                self.nodes[name] = merge_node(self.nodes.get(name, {}), data)
+                self.sources[name] = path
+
+    def field(self, name: str, key: str, default=None):
+        """节点字段，未设置时使用 default_pipeline.json 中 Default 的值"""
+        node = self.nodes.get(name, {})
+        if key in node:
+            return node[key]
+        return self.defaults.get("Default", {}).get(key, default)
+
+    def recognition(self, name: str) -> Tuple[str, dict]:
+        return node_recognition(self.nodes.get(name, {}))
+
+    def action(self, name: str) -> Tuple[str, dict]:
+        return node_action(self.nodes.get(name, {}))
+
+    def edges(self, name: str) -> Iterator[Tuple[str, str]]:
+        """(字段, 目标节点名)，目标已去除 [JumpBack] 等修饰符"""
+        for key in EDGE_FIELDS:
+            for target in as_list(self.field(name, key, [])):
+                target = strip_target(target)
+                if target:
+                    yield key, target
+
+
+def as_list(value) -> list:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def strip_target(target) -> Optional[str]:
+    """跳转目标的节点名，兼容字符串与 {"name": ...} 两种写法"""
+    if isinstance(target, dict):
+        target = target.get("name")
+    if not isinstance(target, str):
+        return None
+    for prefix in TARGET_PREFIXES:
+        if target.startswith(prefix):
+            return target[len(prefix) :]
+    return target
+
+
+# v1 协议中放在节点顶层的识别 / 动作字段
+_V1_ACTION_KEYS = (
+    "target",
+    "target_offset",
+    "begin",
+    "end",
+    "key",
+    "input_text",
+    "package",
+    "custom_action",
+    "custom_action_param",
+)
+
+
+def node_recognition(node: dict) -> Tuple[str, dict]:
+    """节点的识别类型与参数，兼容 v1 / v2 两种写法"""
+    recognition = node.get("recognition", "DirectHit")
+    if isinstance(recognition, dict):
+        return recognition.get("type", "DirectHit"), recognition.get("param", {}) or {}
+    param = {
+        key: value
+        for key, value in node.items()
+        if key not in ("recognition", "action", *EDGE_FIELDS)
+        and key not in _V1_ACTION_KEYS
+    }
+    return recognition, param
+
+
+def node_action(node: dict) -> Tuple[str, dict]:
+    action = node.get("action", "DoNothing")
+    if isinstance(action, dict):
+        return action.get("type", "DoNothing"), action.get("param", {}) or {}
+    param = {key: node[key] for key in _V1_ACTION_KEYS if key in node}
+    return action, param
+
+
+def custom_param(param: dict, key: str) -> dict:
+    """custom_recognition_param / custom_action_param，兼容 JSON 字符串写法"""
+    value = param.get(key, {})
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+
+def template_paths(param: dict) -> List[str]:
+    return [t for t in as_list(param.get("template")) if isinstance(t, str)]
+
+
+def iter_templates(value) -> Iterator[str]:
+    """递归查找 template 字段引用的图片，包括 Count 等自定义参数中内联的识别"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == "template":
+                yield from (t for t in as_list(item) if isinstance(t, str))
+            else:
+                yield from iter_templates(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_templates(item)
+    elif isinstance(value, str) and value.startswith("{") and "template" in value:
+        # custom_recognition_param 可能是 JSON 字符串
+        try:
+            yield from iter_templates(json.loads(value))
+        except ValueError:
+            pass
+
+
+def iter_green_mask_templates(value) -> Iterator[str]:
+    """与 iter_templates 相同，但只返回同一识别中设置了 green_mask: true 的图片"""
+    if isinstance(value, dict):
+        if value.get("green_mask") is True:
+            yield from template_paths(value)
+        for key, item in value.items():
+            if key != "template":
+                yield from iter_green_mask_templates(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_green_mask_templates(item)
+    elif isinstance(value, str) and value.startswith("{") and "green_mask" in value:
+        try:
+            yield from iter_green_mask_templates(json.loads(value))
+        except ValueError:
+            pass
+
+
+def interface_overrides(interface: dict) -> List[dict]:
+    """interface.json 中 task / option / advanced 里的 pipeline_override"""
+    overrides = [
+        task.get("pipeline_override", {}) for task in interface.get("task", [])
+    ]
+    for option in interface.get("option", {}).values():
+        overrides.extend(
+            case.get("pipeline_override", {}) for case in option.get("cases", [])
+        )
+    for advanced in interface.get("advanced", {}).values():
+        overrides.append(advanced.get("pipeline_override", {}))
+    return overrides
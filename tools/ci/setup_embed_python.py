@@ -3,11 +3,13 @@ import sys
 import platform
 import shutil
 import subprocess
-import urllib.request
-import zipfile
-import tarfile
+import urllib.error
 import stat  # 用于在 macOS/Linux 上设置文件权限
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from download_utils import ChecksumError, download_and_extract, download_pip_wheel
+
 sys.stdout.reconfigure(encoding="utf-8")
 print(os.getcwd())
 # --- 配置 ---
@@ -19,52 +21,36 @@ PYTHON_BUILD_STANDALONE_RELEASE_TAG = "20250409"
 
 DEST_DIR = os.path.join("install", "python")  # Python 安装的目标目录
 
+# 归档文件名 -> sha256，填写后校验下载内容，缓存中的文件校验一致时无需访问网络。
+# 修改 PYTHON_VERSION_TARGET 或 PYTHON_BUILD_STANDALONE_RELEASE_TAG 时需要同时更新:
+#   python.org 的 embed 包: 发布页面 https://www.python.org/downloads/release/ 中列出的 SHA256
+#   python-build-standalone: 对应 release 中的 SHA256SUMS
+# 未填写时不校验内容，缓存通过 ETag / Last-Modified 向服务器确认后使用
+PYTHON_ARCHIVE_SHA256 = {}
+
 # --- 辅助函数 ---
 
 
-def download_file(url, dest_path):
-    """下载文件到指定路径"""
-    print(f"正在下载: {url}")
-    print(f"到: {dest_path}")
-    # 确保目标目录存在
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+def download_archive(url, filename, dest_dir):
+    """下载并解压归档，tar 归档边下载边解压，校验通过后才写入 dest_dir"""
+    sha256 = PYTHON_ARCHIVE_SHA256.get(filename)
+    if not sha256:
+        print(f"警告: 未在 PYTHON_ARCHIVE_SHA256 中固定 {filename} 的 sha256，不校验内容")
+
+    print(f"正在下载并解压: {url}")
+    print(f"到: {dest_dir}")
     try:
-        with urllib.request.urlopen(url) as response, open(dest_path, "wb") as out_file:
-            shutil.copyfileobj(response, out_file)
-        print("下载完成。")
+        download_and_extract(url, dest_dir, sha256=sha256)
+        print("下载并解压完成。")
+    except ChecksumError as e:
+        print(f"校验失败: {e}")
+        raise
     except urllib.error.HTTPError as e:
         print(f"HTTP 错误 {e.code}: {e.reason} (URL: {url})")
         raise
     except urllib.error.URLError as e:
         print(f"URL 错误: {e.reason} (URL: {url})")
         raise
-    except Exception as e:
-        print(f"下载过程中发生意外错误: {e}")
-        raise
-
-
-def extract_zip(zip_path, dest_dir):
-    """解压 ZIP 文件"""
-    print(f"正在解压 ZIP: {zip_path} 到 {dest_dir}")
-    with zipfile.ZipFile(zip_path, "r") as zip_ref:
-        zip_ref.extractall(dest_dir)
-    print("ZIP 解压完成。")
-
-
-def extract_tar(tar_path, dest_dir):
-    """解压 TAR (tar.gz, tar.xz, tar.bz2) 文件"""
-    print(f"正在解压 TAR: {tar_path} 到 {dest_dir}")
-    try:
-        # 'r:*' 会自动检测压缩格式
-        with tarfile.open(tar_path, "r:*") as tar_ref:
-            tar_ref.extractall(path=dest_dir)
-        print("TAR 解压完成。")
-    except tarfile.ReadError as e:
-        print(f"Tarfile 读取错误: {e}。文件可能已损坏或不是有效的 TAR 归档。")
-        raise
-    except Exception as e:
-        print(f"TAR 解压过程中发生意外错误: {e}")
-        raise
 
 
 def get_python_executable_path(base_dir, os_type):
@@ -91,29 +77,36 @@ def ensure_pip(python_executable, python_install_dir):
         print("错误: Python 可执行文件未找到，无法安装 pip。")
         return False
 
-    get_pip_url = "https://bootstrap.pypa.io/get-pip.py"
-    # 将 get-pip.py 下载到 Python 安装目录下，执行后再删除
-    get_pip_script_path = os.path.join(python_install_dir, "get-pip.py")
-
-    print(f"正在下载 get-pip.py 从 {get_pip_url}")
+    # 将固定版本的 pip wheel 下载到 Python 安装目录下，安装后再删除
+    print("正在下载 pip wheel...")
     try:
-        download_file(get_pip_url, get_pip_script_path)
+        pip_wheel_path = str(download_pip_wheel(python_install_dir))
     except Exception as e:
-        print(f"下载 get-pip.py 失败: {e}")
+        print(f"下载 pip wheel 失败: {e}")
         return False
 
-    print("正在使用 get-pip.py 安装 pip...")
+    print("正在使用 pip wheel 安装 pip...")
     try:
-        # 在 Python 安装目录下执行 get-pip.py
-        subprocess.run([python_executable, get_pip_script_path], check=True)
+        # wheel 中的 pip 可以直接运行，用它安装自身
+        subprocess.run(
+            [
+                python_executable,
+                os.path.join(pip_wheel_path, "pip"),
+                "install",
+                "--no-index",
+                "--no-warn-script-location",
+                pip_wheel_path,
+            ],
+            check=True,
+        )
         print("pip 安装成功。")
         return True
     except (subprocess.CalledProcessError, OSError) as e:
         print(f"pip 安装失败: {e}")
         return False
     finally:
-        if os.path.exists(get_pip_script_path):
-            os.remove(get_pip_script_path)  # 清理下载的脚本
+        if os.path.exists(pip_wheel_path):
+            os.remove(pip_wheel_path)  # 清理下载的 wheel
 
 
 # --- 主逻辑 ---
@@ -175,17 +168,12 @@ def main():
 
         download_url = f"https://www.python.org/ftp/python/{PYTHON_VERSION_TARGET}/python-{PYTHON_VERSION_TARGET}-embed-{win_arch_suffix}.zip"
         zip_filename = f"python-{PYTHON_VERSION_TARGET}-embed-{win_arch_suffix}.zip"
-        zip_filepath = os.path.join(DEST_DIR, zip_filename)  # 下载到目标目录内再解压
 
         try:
-            download_file(download_url, zip_filepath)
-            extract_zip(zip_filepath, DEST_DIR)
+            download_archive(download_url, zip_filename, DEST_DIR)
         except Exception as e:
             print(f"Windows Python 下载或解压失败: {e}")
             return
-        finally:
-            if os.path.exists(zip_filepath):
-                os.remove(zip_filepath)
 
         # 修改 ._pth 文件
         # pth 文件名格式如: python312._pth for Python 3.12.x
@@ -243,16 +231,12 @@ def main():
         # 文件名格式: cpython-{PYTHON_VERSION}+{RELEASE_TAG_DATE}-{ARCH}-apple-darwin-install_only.tar.gz
         pbs_filename = f"cpython-{PYTHON_VERSION_TARGET}+{PYTHON_BUILD_STANDALONE_RELEASE_TAG}-{pbs_arch}-apple-darwin-install_only.tar.gz"
         download_url = f"https://github.com/indygreg/python-build-standalone/releases/download/{PYTHON_BUILD_STANDALONE_RELEASE_TAG}/{pbs_filename}"
-        tar_filename = pbs_filename  # 使用原始文件名
-        tar_filepath = os.path.join(DEST_DIR, tar_filename)  # 下载到目标目录内
+        # python-build-standalone 的包解压后通常包含一个名为 'python' 的顶层目录
+        # 我们需要将这个 'python' 目录的内容移动到 DEST_DIR
+        temp_extract_dir = os.path.join(DEST_DIR, "_temp_extract")
 
         try:
-            download_file(download_url, tar_filepath)
-            # python-build-standalone 的包解压后通常包含一个名为 'python' 的顶层目录
-            # 我们需要将这个 'python' 目录的内容移动到 DEST_DIR
-            temp_extract_dir = os.path.join(DEST_DIR, "_temp_extract")
-            os.makedirs(temp_extract_dir, exist_ok=True)
-            extract_tar(tar_filepath, temp_extract_dir)
+            download_archive(download_url, pbs_filename, temp_extract_dir)
 
             extracted_python_root = os.path.join(temp_extract_dir, "python")
             if os.path.isdir(extracted_python_root):
@@ -271,9 +255,6 @@ def main():
             if os.path.exists(temp_extract_dir):
                 shutil.rmtree(temp_extract_dir)
             return
-        finally:
-            if os.path.exists(tar_filepath):
-                os.remove(tar_filepath)
 
         # 为 bin 目录下的可执行文件设置执行权限
         bin_dir = os.path.join(DEST_DIR, "bin")
@@ -8,23 +8,35 @@
 
 import os
 import sys
-import urllib.request
 import subprocess
 
+# 嵌入式 Python 的 ._pth 会限制 sys.path，需要手动加入脚本所在目录
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from download_utils import download_pip_wheel
+
 
 def install_pip():
     print("Setting up pip...")
 
-    get_pip_url = "https://bootstrap.pypa.io/get-pip.py"
-    get_pip_path = os.path.join(os.path.dirname(__file__), "get-pip.py")
-
-    print(f"Downloading {get_pip_url}...")
-    urllib.request.urlretrieve(get_pip_url, get_pip_path)
+    print("Downloading pip wheel...")
+    # 固定版本并校验 sha256，缓存中的 wheel 校验一致时不会重新下载
+    pip_wheel_path = str(download_pip_wheel(os.path.dirname(__file__)))
 
     print("Install pip...")
-    subprocess.check_call([sys.executable, get_pip_path, "--no-warn-script-location"])
-
-    os.unlink(get_pip_path)
+    # wheel 中的 pip 可以直接运行，用它安装自身
+    subprocess.check_call(
+        [
+            sys.executable,
+            os.path.join(pip_wheel_path, "pip"),
+            "install",
+            "--no-index",
+            "--no-warn-script-location",
+            pip_wheel_path,
+        ]
+    )
+
+    os.unlink(pip_wheel_path)
 
     print("pip installed.")
 